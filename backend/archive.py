@@ -0,0 +1,239 @@
+import gzip
+import logging
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+from storage import dump_document, load_document
+
+logger = logging.getLogger(__name__)
+
+# One row per archived submission: enough to list and page an archived quiz
+# without opening its files, plus where in the partition file the document is
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archived_submissions (
+    id TEXT PRIMARY KEY,
+    admin_email TEXT NOT NULL,
+    quiz_name TEXT NOT NULL,
+    month TEXT NOT NULL,
+    timestamp TEXT,
+    student_name TEXT,
+    class_name TEXT,
+    section TEXT,
+    link_id TEXT,
+    score REAL,
+    percentage REAL,
+    total_questions INTEGER,
+    member_offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archived_partition ON archived_submissions (admin_email, quiz_name, month, timestamp DESC);
+"""
+
+SUMMARY_COLUMNS = ["student_name", "class_name", "section", "link_id", "score", "percentage", "total_questions"]
+
+
+class SubmissionArchive:
+    """
+    Cold tier for old submissions: gzip-compressed JSONL files partitioned
+    as <root>/<admin>/<quiz>/<YYYY-MM>.jsonl.gz, with a SQLite index of
+    every archived id.
+
+    Each archiving batch is appended to its partition as a separate gzip
+    member, fsynced and indexed before the documents are deleted from
+    storage, so a crash in between only leaves a duplicate copy that the
+    index ignores. The index is the source of truth: a document is archived
+    while its id is indexed, and its row points at the member to read.
+    """
+
+    def __init__(self, root, on_change: Optional[Callable[[str, str], None]] = None, batch_size: int = 1000):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.on_change = on_change
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        conn = self.conn
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(INDEX_SCHEMA)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(str(self.root / "index.db"), timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    def partition_path(self, admin_email: str, quiz_name: str, month: str) -> Path:
+        return self.root / quote(admin_email, safe="@.-_") / quote(quiz_name, safe=".-_") / f"{month}.jsonl.gz"
+
+    def _changed(self, admin_email: str, quiz_name: str):
+        if self.on_change is not None:
+            self.on_change(admin_email, quiz_name)
+
+    # Archiving
+
+    def archive(self, storage, cutoff: datetime, admin_email: Optional[str] = None) -> int:
+        """Move submissions older than cutoff (optionally one admin's) out of storage; returns how many"""
+        if not self._lock.acquire(blocking=False):
+            logger.info("Archiving already running, skipped")
+            return 0
+        try:
+            archived = 0
+            for admin, quiz_name in storage.archive_candidates(cutoff):
+                if admin_email is not None and admin != admin_email:
+                    continue
+                moved = self._archive_quiz(storage, admin, quiz_name, cutoff)
+                if moved:
+                    logger.info("Archived %d submissions of '%s' for %s", moved, quiz_name, admin)
+                    self._changed(admin, quiz_name)
+                archived += moved
+            return archived
+        finally:
+            self._lock.release()
+
+    def _archive_quiz(self, storage, admin_email: str, quiz_name: str, cutoff: datetime) -> int:
+        moved = 0
+        while True:
+            docs = storage.find_submissions_before(admin_email, quiz_name, cutoff, self.batch_size)
+            if not docs:
+                break
+            self._write(admin_email, quiz_name, docs)
+            storage.delete_submissions([str(doc["_id"]) for doc in docs])
+            moved += len(docs)
+            if len(docs) < self.batch_size:
+                break
+        return moved
+
+    def _write(self, admin_email: str, quiz_name: str, docs: List[Dict]):
+        by_month: Dict[str, List[Dict]] = defaultdict(list)
+        for doc in docs:
+            by_month[doc["timestamp"].strftime("%Y-%m")].append(doc)
+
+        rows = []
+        for month, month_docs in by_month.items():
+            path = self.partition_path(admin_email, quiz_name, month)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            member = gzip.compress("".join(dump_document(doc) + "\n" for doc in month_docs).encode("utf-8"))
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+            rows += [
+                (str(doc["_id"]), admin_email, quiz_name, month, doc["timestamp"].isoformat(),
+                 *(doc.get(column) for column in SUMMARY_COLUMNS), offset)
+                for doc in month_docs
+            ]
+        with self.conn:
+            self.conn.executemany(
+                f"""INSERT OR REPLACE INTO archived_submissions
+                    (id, admin_email, quiz_name, month, timestamp, {', '.join(SUMMARY_COLUMNS)}, member_offset)
+                    VALUES ({', '.join('?' for _ in range(len(SUMMARY_COLUMNS) + 6))})""",
+                rows
+            )
+
+    # Queries
+
+    def partitions(self, admin_email: str, quiz_name: Optional[str] = None) -> List[Dict]:
+        sql = """SELECT quiz_name, month, COUNT(*) AS submissions, MIN(timestamp) AS first_submission,
+                        MAX(timestamp) AS latest_submission
+                 FROM archived_submissions WHERE admin_email = ?"""
+        params: list = [admin_email]
+        if quiz_name is not None:
+            sql += " AND quiz_name = ?"
+            params.append(quiz_name)
+        sql += " GROUP BY quiz_name, month ORDER BY quiz_name, month DESC"
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def list_summaries(self, admin_email: str, quiz_name: str, month: Optional[str] = None,
+                       limit: int = 50, skip: int = 0) -> List[Dict]:
+        """Archived submissions of a quiz from the index alone, newest first"""
+        sql = f"SELECT id, month, timestamp, {', '.join(SUMMARY_COLUMNS)} FROM archived_submissions WHERE admin_email = ? AND quiz_name = ?"
+        params: list = [admin_email, quiz_name]
+        if month is not None:
+            sql += " AND month = ?"
+            params.append(month)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        params += [limit, skip]
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def get(self, submission_id: str, admin_email: Optional[str] = None) -> Optional[Dict]:
+        """One archived document, read from its gzip member only"""
+        row = self.conn.execute(
+            "SELECT admin_email, quiz_name, month, member_offset FROM archived_submissions WHERE id = ?",
+            (str(submission_id),)
+        ).fetchone()
+        if row is None or (admin_email is not None and row["admin_email"] != admin_email):
+            return None
+        with open(self.partition_path(row["admin_email"], row["quiz_name"], row["month"]), "rb") as f:
+            f.seek(row["member_offset"])
+            with gzip.GzipFile(fileobj=f) as member:
+                for line in member:
+                    doc = load_document(line)
+                    if str(doc["_id"]) == str(submission_id):
+                        return doc
+        return None
+
+    def iter_documents(self, admin_email: str, quiz_name: str, month: str) -> Iterator[Dict]:
+        """Every archived document of one partition, once each"""
+        ids = {row[0] for row in self.conn.execute(
+            "SELECT id FROM archived_submissions WHERE admin_email = ? AND quiz_name = ? AND month = ?",
+            (admin_email, quiz_name, month)
+        )}
+        path = self.partition_path(admin_email, quiz_name, month)
+        if not ids or not path.exists():
+            return
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                doc = load_document(line)
+                if doc["_id"] in ids:
+                    ids.discard(doc["_id"])
+                    yield doc
+
+    # Restore
+
+    def restore(self, storage, admin_email: str, quiz_name: str, month: Optional[str] = None) -> int:
+        """Put a quiz's archived submissions (or one month of them) back into storage"""
+        restored = 0
+        with self._lock:
+            for partition in self.partitions(admin_email, quiz_name):
+                if month is not None and partition["month"] != month:
+                    continue
+                restored += self._restore_partition(storage, admin_email, quiz_name, partition["month"])
+        if restored:
+            logger.info("Restored %d archived submissions of '%s' for %s", restored, quiz_name, admin_email)
+            self._changed(admin_email, quiz_name)
+        return restored
+
+    def _restore_partition(self, storage, admin_email: str, quiz_name: str, month: str) -> int:
+        batch: List[Dict] = []
+        restored = 0
+        for doc in self.iter_documents(admin_email, quiz_name, month):
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                restored += self._deliver(storage, batch)
+                batch = []
+        if batch:
+            restored += self._deliver(storage, batch)
+        self.partition_path(admin_email, quiz_name, month).unlink(missing_ok=True)
+        return restored
+
+    def _deliver(self, storage, docs: List[Dict]) -> int:
+        # Ids are preserved and delivery skips ones already stored, so a retried restore is harmless
+        ids = [(str(doc["_id"]),) for doc in docs]
+        storage.deliver_submissions(docs)
+        with self.conn:
+            self.conn.executemany("DELETE FROM archived_submissions WHERE id = ?", ids)
+        return len(docs)
+
+    def stats(self) -> Dict:
+        row = self.conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT admin_email || '/' || quiz_name || '/' || month) FROM archived_submissions"
+        ).fetchone()
+        return {"submissions": row[0], "partitions": row[1]}
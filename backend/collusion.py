@@ -0,0 +1,227 @@
+import logging
+import math
+import random
+import time
+from collections import defaultdict
+from datetime import datetime
+from itertools import combinations
+from typing import Dict, List, Optional
+
+from quiz_bank import CompiledQuiz, NO_ANSWER, NO_KEY, OPTION_LETTERS
+from scoring import align_answers
+
+logger = logging.getLogger(__name__)
+
+# 100 MinHash functions split into 20 bands of 5 rows: pairs whose wrong-answer
+# Jaccard similarity is above ~0.55 land in a common bucket with high probability,
+# while typical pairs (around 0.1) almost never do
+NUM_HASHES = 100
+BANDS = 20
+ROWS = NUM_HASHES // BANDS
+HASH_PRIME = (1 << 61) - 1
+# A bucket this large is a common wrong answer pattern, not a signal worth O(k^2) comparisons
+MAX_BUCKET_SIZE = 500
+# Pairs need at least this many identical wrong answers to be reported
+MIN_SHARED_WRONG = 3
+DEFAULT_ALPHA = 0.01
+
+
+class EncodedSheet:
+    """One submission as per-option bitsets over question positions"""
+
+    __slots__ = ("submission_id", "student", "options", "wrong", "answered", "tokens")
+
+    def __init__(self, submission_id: str, student: Dict, codes: bytes, key_codes: bytes):
+        self.submission_id = submission_id
+        self.student = student
+        self.options = [0] * (len(OPTION_LETTERS) + 1)  # index = answer code, 0 unused
+        self.wrong = 0
+        self.answered = 0
+        tokens = []
+        for pos, (code, key) in enumerate(zip(codes, key_codes)):
+            if code == NO_ANSWER or code > len(OPTION_LETTERS):
+                continue
+            bit = 1 << pos
+            self.options[code] |= bit
+            self.answered |= bit
+            if key != NO_KEY and code != key:
+                self.wrong |= bit
+                tokens.append(pos * 8 + code)
+        self.tokens = tokens
+
+    def identical(self, other: "EncodedSheet") -> int:
+        """Bitmask of questions where both chose the same option"""
+        same = 0
+        for mine, theirs in zip(self.options, other.options):
+            same |= mine & theirs
+        return same
+
+
+def _hash_table(universe: int, seed: int) -> List[tuple]:
+    """Per-token MinHash values, precomputed since the token universe is small"""
+    rng = random.Random(seed)
+    params = [(rng.randrange(1, HASH_PRIME), rng.randrange(0, HASH_PRIME)) for _ in range(NUM_HASHES)]
+    return [tuple((a * token + b) % HASH_PRIME for a, b in params) for token in range(universe)]
+
+
+def candidate_pairs(sheets: List[EncodedSheet], seed: int = 7) -> set:
+    """Index pairs that share a MinHash band over their wrong-answer tokens"""
+    if not sheets:
+        return set()
+    universe = max((max(s.tokens) for s in sheets if s.tokens), default=0) + 1
+    table = _hash_table(universe, seed)
+
+    buckets = defaultdict(list)
+    for index, sheet in enumerate(sheets):
+        if len(sheet.tokens) < MIN_SHARED_WRONG:
+            continue
+        signature = tuple(map(min, zip(*[table[token] for token in sheet.tokens])))
+        for band in range(BANDS):
+            buckets[(band, signature[band * ROWS:(band + 1) * ROWS])].append(index)
+
+    pairs = set()
+    for members in buckets.values():
+        if 1 < len(members) <= MAX_BUCKET_SIZE:
+            pairs.update(combinations(members, 2))
+    return pairs
+
+
+def match_probabilities(sheets: List[EncodedSheet], quiz: CompiledQuiz) -> List[float]:
+    """
+    Per question, the chance that two students who both answered it wrong
+    picked the same wrong option if they worked independently, estimated
+    from how often each wrong option was chosen across the link.
+    """
+    counts = [[0] * (len(OPTION_LETTERS) + 1) for _ in range(len(quiz))]
+    for sheet in sheets:
+        for token in sheet.tokens:
+            counts[token >> 3][token & 7] += 1
+    probabilities = []
+    for row in counts:
+        wrong_total = sum(row)
+        probabilities.append(sum(c * c for c in row) / (wrong_total * wrong_total) if wrong_total else 0.0)
+    return probabilities
+
+
+def _capped_distribution(probabilities: List[float], cap: int) -> List[float]:
+    """Poisson binomial P(X = k) for k < cap, with all mass at or above cap pooled in the last slot"""
+    dist = [1.0] + [0.0] * cap
+    for p in probabilities:
+        q = 1 - p
+        dist[cap] += dist[cap - 1] * p
+        for k in range(cap - 1, 0, -1):
+            dist[k] = dist[k] * q + dist[k - 1] * p
+        dist[0] *= q
+    return dist
+
+
+def upper_tail(probabilities: List[float], observed: int) -> float:
+    """
+    P(X >= observed) for X a sum of independent Bernoulli(p) (Poisson binomial),
+    computed exactly in O(n * min(observed, n - observed)) by counting from
+    whichever end is closer.
+    """
+    n = len(probabilities)
+    if observed <= 0:
+        return 1.0
+    if observed > n:
+        return 0.0
+    misses = n - observed
+    if observed <= misses + 1:
+        return min(_capped_distribution(probabilities, observed)[observed], 1.0)
+    # X >= observed  <=>  at most n - observed misses
+    dist = _capped_distribution([1 - p for p in probabilities], misses + 1)
+    return min(sum(dist[:misses + 1]), 1.0)
+
+
+def score_pair(a: EncodedSheet, b: EncodedSheet, probabilities: List[float], quiz: CompiledQuiz) -> Dict:
+    identical = a.identical(b)
+    # Walk a's wrong answers (sorted by position) for the questions both got wrong
+    b_wrong = b.wrong
+    both_wrong = [token >> 3 for token in a.tokens if (b_wrong >> (token >> 3)) & 1]
+    shared = [pos for pos in both_wrong if (identical >> pos) & 1]
+    chances = [probabilities[pos] for pos in both_wrong]
+    expected = sum(chances)
+    variance = sum(p * (1 - p) for p in chances)
+    # A Poisson binomial's median is within 1 of its mean, so at or below
+    # floor(mean) the tail is at least 1/2 and the exact value is not needed
+    p_value = upper_tail(chances, len(shared)) if len(shared) > math.floor(expected) else 1.0
+    return {
+        "shared_wrong_answers": len(shared),
+        "both_wrong": len(both_wrong),
+        "expected_shared_wrong": round(expected, 2),
+        "z_score": round((len(shared) - expected) / math.sqrt(variance), 2) if variance else None,
+        "p_value": p_value,
+        "identical_answers": identical.bit_count(),
+        "both_answered": (a.answered & b.answered).bit_count(),
+        "shared_wrong_questions": [quiz.questions[pos].get("questionNumber") for pos in shared]
+    }
+
+
+def detect(quiz: CompiledQuiz, submissions: List[Dict], alpha: float = DEFAULT_ALPHA, seed: int = 7) -> Dict:
+    """
+    Flag pairs of submissions whose identical wrong answers are too many to be
+    chance. MinHash/LSH proposes candidate pairs; each candidate gets an exact
+    Poisson-binomial tail probability, compared against alpha divided by the
+    number of possible pairs (Bonferroni), since every pair is implicitly tested.
+    """
+    started = time.perf_counter()
+    key_codes = quiz.key_codes
+    sheets = []
+    for doc in submissions:
+        sheet = align_answers(quiz, doc.get("answers") or [])
+        sheets.append(EncodedSheet(str(doc["_id"]), {
+            "name": doc.get("student_name"),
+            "class_name": doc.get("class_name"),
+            "section": doc.get("section")
+        }, bytes(sheet.codes), key_codes))
+
+    pairs = candidate_pairs(sheets, seed)
+    probabilities = match_probabilities(sheets, quiz)
+    possible_pairs = len(sheets) * (len(sheets) - 1) // 2
+    threshold = alpha / possible_pairs if possible_pairs else alpha
+
+    flagged = []
+    for i, j in pairs:
+        a, b = sheets[i], sheets[j]
+        if (a.wrong & b.wrong).bit_count() < MIN_SHARED_WRONG:
+            continue
+        result = score_pair(a, b, probabilities, quiz)
+        if result["shared_wrong_answers"] >= MIN_SHARED_WRONG and result["p_value"] <= threshold:
+            flagged.append({
+                "students": [
+                    {"submission_id": a.submission_id, **a.student},
+                    {"submission_id": b.submission_id, **b.student}
+                ],
+                **result
+            })
+
+    flagged.sort(key=lambda pair: (pair["p_value"], -pair["shared_wrong_answers"]))
+    return {
+        "quiz_name": quiz.name,
+        "quiz_version": quiz.version,
+        "submissions": len(sheets),
+        "possible_pairs": possible_pairs,
+        "candidate_pairs": len(pairs),
+        "p_value_threshold": threshold,
+        "flagged_pairs": flagged,
+        "took_ms": round((time.perf_counter() - started) * 1000, 1),
+        "generated_at": datetime.utcnow().isoformat()
+    }
+
+
+def run_detection(storage, link: Dict, quiz: CompiledQuiz, alpha: float = DEFAULT_ALPHA) -> Optional[Dict]:
+    """Background job: analyse every submission on a link and store the report"""
+    link_id = link["link_id"]
+    try:
+        storage.save_collusion_report(link_id, link["admin_email"], {"status": "running", "link_id": link_id})
+        report = detect(quiz, list(storage.iter_link_submissions(link_id)), alpha)
+        report.update(status="completed", link_id=link_id)
+        storage.save_collusion_report(link_id, link["admin_email"], report)
+        logger.info("Collusion check for link %s: %d flagged of %d candidates (%d submissions, %s ms)", link_id,
+                    len(report["flagged_pairs"]), report["candidate_pairs"], report["submissions"], report["took_ms"])
+        return report
+    except Exception as e:
+        logger.exception("Collusion check failed for link %s", link_id)
+        storage.save_collusion_report(link_id, link["admin_email"], {"status": "failed", "link_id": link_id, "error": str(e)})
+        return None
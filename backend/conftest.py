@@ -0,0 +1,71 @@
+"""
+Shared fixtures for the endpoint tests. main reads its configuration when it
+is imported, so the environment points it at a scratch directory and the
+SQLite backend first; each test then gets a fresh database.
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+SCRATCH = Path(tempfile.mkdtemp(prefix="quizbuzz-tests-"))
+os.environ.update(
+    DATA_DIR=str(SCRATCH / "data"),
+    QUIZ_DIR=str(SCRATCH / "quiz_data"),
+    IMAGES_DIR=str(SCRATCH / "images"),
+    STORAGE_BACKEND="sqlite",
+    SQLITE_PATH=str(SCRATCH / "data" / "quizbuzz.db")
+)
+
+ADMIN = "teacher@school.test"
+QUIZ = "Unit Quiz"
+
+
+def quiz_questions(count: int = 5):
+    """Four-option questions keyed A, B, C, D, A, ..."""
+    return [{
+        "questionNumber": i,
+        "questionText": f"Question {i}",
+        "question_images": [],
+        "option_with_images_": [f"q{i} option {k}" for k in range(4)],
+        "correct_answer": "ABCD"[(i - 1) % 4]
+    } for i in range(1, count + 1)]
+
+
+@pytest.fixture
+def app(tmp_path):
+    """main on a fresh SQLite database with one admin (three students per link) and one quiz file"""
+    import main
+    from response_cache import ResponseCache
+    from storage_sqlite import SQLiteStorage
+
+    storage = SQLiteStorage(str(tmp_path / "quizbuzz.db"))
+    storage.ensure_indexes()
+    plan = {"name": "Test", "student_limit": 3, "max_students": 3}
+    plan["_id"] = storage.save_plan(plan)
+    storage.save_admin({"email": ADMIN, "name": "Teacher", "password_hash": "x", "plan_id": plan["_id"], "is_active": True})
+    (Path(os.environ["QUIZ_DIR"]) / f"{QUIZ}.json").write_text(json.dumps(quiz_questions()))
+
+    previous = main.storage, main.response_cache
+    main.storage = storage
+    main.response_cache = ResponseCache(main.RESPONSE_CACHE_MAX_BYTES)
+    main.quiz_links_storage.clear()
+    main.submission_count_cache.clear()
+    main.student_results.clear()
+    yield main
+    deliver(main)
+    main.storage, main.response_cache = previous
+    storage.close()
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+    return TestClient(app.app)
+
+
+def deliver(main) -> int:
+    """Move everything the submits queued in the outbox into storage"""
+    return main.submission_outbox.drain(main.storage)
@@ -0,0 +1,58 @@
+"""
+Create a plan and an admin user in the configured storage backend.
+
+    python create_admin.py <email> <name> <password> [plan_name] [student_limit]
+
+Mainly for SQLite installs, where there is no database console to seed admins from.
+"""
+import logging
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import bcrypt
+from dotenv import load_dotenv
+
+from storage import create_storage
+
+
+def main():
+    if len(sys.argv) < 4:
+        sys.exit(__doc__)
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    email, name, password = sys.argv[1:4]
+    plan_name = sys.argv[4] if len(sys.argv) > 4 else "basic"
+    student_limit = int(sys.argv[5]) if len(sys.argv) > 5 else 50
+
+    data_dir = Path(os.getenv("DATA_DIR", "/app/data"))
+    storage = create_storage(
+        os.getenv("STORAGE_BACKEND", "mongo"),
+        os.getenv("MONGODB_URI"),
+        os.getenv("MONGODB_DATABASE"),
+        os.getenv("SQLITE_PATH", str(data_dir / "quizbuzz.db"))
+    )
+    if storage is None:
+        sys.exit(1)
+    if storage.get_admin_by_email(email):
+        sys.exit(f"❌ Admin {email} already exists")
+
+    plan_id = storage.save_plan({"name": plan_name, "student_limit": student_limit, "max_students": student_limit})
+    if storage.name == "mongo":
+        from bson import ObjectId
+        plan_id = ObjectId(plan_id)
+    storage.save_admin({
+        "email": email,
+        "name": name,
+        "password_hash": bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()),
+        "plan_id": plan_id,
+        "is_active": True,
+        "created_at": datetime.utcnow()
+    })
+    storage.close()
+    print(f"✅ Created admin {email} on the {plan_name} plan ({student_limit} students)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel for attempt deadlines: one thread and a ring of slots,
+    each tick seconds wide, instead of a timer per student. A key scheduled
+    for time t goes into slot ceil(t / tick) % slots together with its
+    absolute tick, so a slot holds keys for several laps of the ring and
+    only the ones due on the current lap fire.
+
+    Everything due at a tick is handed to on_due as one list, so a whole
+    class hitting the same deadline becomes one batch. Rescheduling a key
+    moves it; cancel() drops it.
+    """
+
+    def __init__(self, on_due: Callable[[List[str]], None], tick: float = 1.0, slots: int = 512):
+        self.on_due = on_due
+        self.tick = tick
+        self._slots: List[Dict[str, int]] = [{} for _ in range(slots)]
+        self._where: Dict[str, int] = {}  # key -> absolute tick
+        self._current = self._tick_of(time.time())
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.fired = 0
+        self.batches = 0
+
+    def _tick_of(self, timestamp: float) -> int:
+        return math.ceil(timestamp / self.tick)
+
+    def schedule(self, key: str, timestamp: float):
+        """Fire key at the first tick at or after timestamp (the next tick if it is already past)"""
+        with self._lock:
+            self._discard(key)
+            due = max(self._tick_of(timestamp), self._current + 1)
+            self._slots[due % len(self._slots)][key] = due
+            self._where[key] = due
+
+    def cancel(self, key: str):
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key: str):
+        due = self._where.pop(key, None)
+        if due is not None:
+            self._slots[due % len(self._slots)].pop(key, None)
+
+    def __len__(self):
+        return len(self._where)
+
+    def advance(self, now: float) -> List[str]:
+        """Move the wheel up to now and return every key that came due"""
+        target = self._tick_of(now)
+        due: List[str] = []
+        with self._lock:
+            while self._current < target and self._where:
+                self._current += 1
+                slot = self._slots[self._current % len(self._slots)]
+                ready = [key for key, at in slot.items() if at <= self._current]
+                for key in ready:
+                    del slot[key]
+                    del self._where[key]
+                due += ready
+            self._current = max(self._current, target)
+        return due
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="deadline-wheel", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.tick - time.time() % self.tick):
+            due = self.advance(time.time())
+            if not due:
+                continue
+            self.fired += len(due)
+            self.batches += 1
+            try:
+                self.on_due(due)
+            except Exception:
+                logger.exception("Deadline handler failed for %d attempts", len(due))
+
+    def stats(self) -> Dict:
+        return {"scheduled": len(self), "fired": self.fired, "batches": self.batches}
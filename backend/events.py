@@ -0,0 +1,92 @@
+import asyncio
+import json
+import threading
+from typing import Dict, Optional, Set
+
+
+class Subscription:
+    """A single live listener with a bounded buffer of pending events"""
+
+    def __init__(self, topics: Set[str], loop: asyncio.AbstractEventLoop, max_buffer: int):
+        self.topics = topics
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        self.dropped = 0
+
+    def _offer(self, event: Dict):
+        # Runs on the subscriber's event loop. A full buffer drops the oldest
+        # event so a slow consumer only ever loses history, never blocks.
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[Dict]:
+        """Wait for the next event, returning None if nothing arrives in time"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    """
+    In-process fan-out of exam events to live dashboard subscribers.
+    Publishing is safe from the sync request threadpool and never waits
+    on a subscriber.
+    """
+
+    def __init__(self, max_buffer: int = 100):
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._topics: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, *topics: str) -> Subscription:
+        sub = Subscription(set(topics), asyncio.get_running_loop(), self.max_buffer)
+        with self._lock:
+            for topic in sub.topics:
+                self._topics.setdefault(topic, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            for topic in sub.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers:
+                    subscribers.discard(sub)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def publish(self, topic: str, event: Dict):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub._offer, event)
+            except RuntimeError:
+                # Subscriber's loop already closed; it will be cleaned up on disconnect
+                pass
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({sub for subs in self._topics.values() for sub in subs})
+
+
+def admin_topic(admin_email: str) -> str:
+    return f"admin:{admin_email}"
+
+
+def link_topic(link_id: str) -> str:
+    return f"link:{link_id}"
+
+
+def format_sse(event: Dict) -> str:
+    """Encode an event as a text/event-stream frame"""
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+event_bus = EventBus()
@@ -1,23 +1,54 @@
 
-from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi import FastAPI, HTTPException, Request, Header, UploadFile, File, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 from pathlib import Path
 import json
 import os
-from datetime import datetime
-from pymongo import MongoClient
+import time
+import hashlib
+import base64
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import bcrypt
+from events import event_bus, admin_topic, link_topic, format_sse
+from quiz_bank import QuizRepository, QuizValidationError, CompiledQuiz
+from search_index import QuestionSearchIndex
+from scoring import align_answers, score_sheet, sheet_answers
+import rescore
+import rollups
+import collusion
+from static_assets import StaticAssetTable
+from storage import create_storage
+from outbox import SubmissionOutbox
+from archive import SubmissionArchive
+from response_cache import ResponseCache
+from result_store import ResultStore
+from time_sketches import TimeSketchRecorder, parse_duration, format_duration, time_report
+from wire_format import PackedAnswerError, decode_packed
+from shuffle import QuizPermutation, student_seed
+from deadlines import TimerWheel
 from bson import ObjectId
+from app_logging import RequestIdMiddleware, Sampler, configure_logging, log_stats, shutdown_logging
 
 
 # Load environment variables
 load_dotenv()
 
+# Logging: records are queued and written by a background thread; LOG_FORMAT=json for structured output
+configure_logging(os.getenv("LOG_LEVEL", "INFO"), os.getenv("LOG_FORMAT", "text"), int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+logger = logging.getLogger(__name__)
+
+# Per-question scoring traces (DEBUG) are logged for this fraction of submits, capped per second
+score_trace_sampler = Sampler(float(os.getenv("LOG_SCORE_TRACE_RATE", "0.01")), float(os.getenv("LOG_SCORE_TRACE_PER_SECOND", "1")))
+
 app = FastAPI()
 
 # Configuration
@@ -25,23 +56,61 @@ DATA_DIR = Path(os.getenv("DATA_DIR", "/app/data"))
 QUIZ_DIR = Path(os.getenv("QUIZ_DIR", "/app/quiz_data"))
 IMAGES_DIR = Path(os.getenv("IMAGES_DIR", "/app/images"))
 
+# Live exam monitoring (server-sent events)
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+# How long a submission total is reused before counting again
+SUBMISSION_COUNT_TTL_SECONDS = float(os.getenv("SUBMISSION_COUNT_TTL_SECONDS", "30"))
+
+# Minimum interval between checks of quiz files for search re-indexing
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "5"))
+
+# Submissions rescored per batched update when an answer key is corrected
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "500"))
+
+# Recent results kept in memory for /teacher/results; older ones are archived to DATA_DIR
+RESULT_STORE_CAPACITY = int(os.getenv("RESULT_STORE_CAPACITY", "10000"))
+
+# Largest number of links one bulk generation request may create
+BULK_LINK_LIMIT = int(os.getenv("BULK_LINK_LIMIT", "200"))
+
+# Timed links: a submit is still accepted this long past its deadline, after which the attempt is auto-submitted
+DEADLINE_GRACE_SECONDS = float(os.getenv("DEADLINE_GRACE_SECONDS", "30"))
+
+# How often each worker looks for overdue attempts its own timer wheel does not hold
+# (started on another worker, or before a restart)
+ATTEMPT_SWEEP_SECONDS = float(os.getenv("ATTEMPT_SWEEP_SECONDS", "60"))
+
+# Attempts left "finalizing" (a batch cut short) or "failed" for this long are claimed again by the sweep
+ATTEMPT_RETRY_SECONDS = float(os.getenv("ATTEMPT_RETRY_SECONDS", "300"))
+
+# Memory budget for rendered /admin/exam and /admin/submission responses
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# How often each worker persists its time-spent sketches
+TIME_SKETCH_FLUSH_SECONDS = float(os.getenv("TIME_SKETCH_FLUSH_SECONDS", "30"))
+
+# Submissions older than these ages move from storage to compressed files under ARCHIVE_DIR (0 keeps them).
+# Practice submissions from /quiz/submit are filed under PRACTICE_ADMIN_EMAIL and get the shorter retention.
+PRACTICE_ADMIN_EMAIL = "system@admin.com"
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", str(DATA_DIR / "archive")))
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_PRACTICE_AFTER_DAYS = int(os.getenv("ARCHIVE_PRACTICE_AFTER_DAYS", "30"))
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "24"))
+
 # MongoDB Configuration
 MONGODB_URI = os.getenv("MONGODB_URI")
 MONGODB_DATABASE = os.getenv("MONGODB_DATABASE")
 
-# Initialize MongoDB client
-mongo_client = None
-db = None
+# Storage backend: "mongo" (default) or "sqlite" for single-node installs without a database server
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo")
+SQLITE_PATH = os.getenv("SQLITE_PATH", str(DATA_DIR / "quizbuzz.db"))
 
-if MONGODB_URI and MONGODB_DATABASE:
-    try:
-        mongo_client = MongoClient(MONGODB_URI)
-        db = mongo_client[MONGODB_DATABASE]
-        print(f"✅ Connected to MongoDB: {MONGODB_DATABASE}")
-    except Exception as e:
-        print(f"❌ MongoDB connection failed: {e}")
-else:
-    print("⚠️ MongoDB credentials not found in environment variables")
+# Initialize storage; None keeps the app running without persistence, as before
+storage = create_storage(STORAGE_BACKEND, MONGODB_URI, MONGODB_DATABASE, SQLITE_PATH)
+
+# Scored submissions are committed to this local file first and delivered to storage in the background
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", str(DATA_DIR / "submission_outbox.db"))
 
 # Ensure directories exist
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -58,44 +127,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files for React frontend
+# Correlation id per request, attached to every log record and echoed as X-Request-ID
+app.add_middleware(RequestIdMiddleware)
+
+# React build - /static/* and root files are served from memory (see load_static_assets)
 static_build_dir = Path("/app/static")
+static_assets = StaticAssetTable(static_build_dir)
 if static_build_dir.exists():
-    # Mount the entire static directory
-    app.mount("/static", StaticFiles(directory=str(static_build_dir / "static")), name="react_static")
-    print(f"✅ Serving React static files from: {static_build_dir}/static")
-    
     # Also serve root level assets (favicon, manifest, etc.)
     app.mount("/assets", StaticFiles(directory=str(static_build_dir)), name="assets")
-    print(f"✅ Serving React assets from: {static_build_dir}")
-else:
-    print(f"❌ React build directory not found: {static_build_dir}")
+    logger.info("Serving React assets from %s", static_build_dir)
 
 # Mount quiz data files
 if QUIZ_DIR.exists():
     app.mount("/quiz_data", StaticFiles(directory=str(QUIZ_DIR)), name="quiz_data")
-    print(f"✅ Serving quiz data from: {QUIZ_DIR}")
+    logger.info("Serving quiz data from %s", QUIZ_DIR)
 else:
-    print(f"❌ Quiz data folder not found: {QUIZ_DIR}")
+    logger.error("Quiz data folder not found: %s", QUIZ_DIR)
     # Fallback to original path for development
     quiz_fallback_path = Path(__file__).parent.parent / "quiz_data"
     if quiz_fallback_path.exists():
         app.mount("/quiz_data", StaticFiles(directory=str(quiz_fallback_path)), name="quiz_data")
-        print(f"✅ Using fallback quiz data path: {quiz_fallback_path}")
+        logger.info("Using fallback quiz data path: %s", quiz_fallback_path)
 
 # Mount images directory - serve all image subdirectories
 if IMAGES_DIR.exists():
     app.mount("/images", StaticFiles(directory=str(IMAGES_DIR)), name="images")
-    print(f"✅ Serving images from: {IMAGES_DIR}")
+    logger.info("Serving images from %s", IMAGES_DIR)
 else:
-    print(f"❌ Static image folder not found: {IMAGES_DIR}")
+    logger.error("Static image folder not found: %s", IMAGES_DIR)
     # Fallback to original path for development
     static_path = Path(__file__).parent.parent / "images"
     if static_path.exists():
         app.mount("/images", StaticFiles(directory=str(static_path)), name="images")
-        print(f"✅ Using fallback image path: {static_path}")
+        logger.info("Using fallback image path: %s", static_path)
     else:
-        print(f"❌ Fallback image folder also not found: {static_path}")
+        logger.error("Fallback image folder also not found: %s", static_path)
 
 # Models
 class AdminLoginRequest(BaseModel):
@@ -145,11 +212,18 @@ class StudentAnswer(BaseModel):
     timeSpent: float
     isMarked: bool = False
 
+class PackedAnswers(BaseModel):
+    """Compact answers by question position - see wire_format. Validated in decode_packed, not per field"""
+    selected: Any
+    times: Any = None
+    marked: Optional[str] = None
+
 class QuizSubmission(BaseModel):
     studentName: str
     studentEmail: str
     quizName: str
-    answers: List[StudentAnswer]
+    answers: List[StudentAnswer] = []
+    packed: Optional[PackedAnswers] = None
     totalTimeSpent: str
     submittedAt: str
 
@@ -175,36 +249,117 @@ class StudentResult(BaseModel):
     submittedAt: str
     detailedResults: List[QuestionResult]
 
-# In-memory storage
-student_results: List[StudentResult] = []
-results_file = DATA_DIR / "student_results.json"
+# In-memory storage - compact and bounded, evicted results are appended to the archive
+student_results = ResultStore(RESULT_STORE_CAPACITY, DATA_DIR / "student_results_archive.jsonl")
 
-# Quiz links storage with student limits
+# Quiz links storage with student limits - a cache of the links persisted in storage
 quiz_links_storage = {}  # {link_id: {"max_allowed": int, "current_count": int, "students": []}}
 
 @app.on_event("startup")
 def load_results():
     # Clear old results on each startup - start fresh every run
-    print("🔄 Clearing old results and starting fresh...")
-    global student_results, quiz_links_storage
-    student_results = []
+    logger.info("Clearing old results and starting fresh")
+    global quiz_links_storage
+    student_results.clear()
     quiz_links_storage = {}
     
-    # Ensure data directory exists and create fresh empty file
+    # Ensure data directory exists for the results archive
     DATA_DIR.mkdir(parents=True, exist_ok=True)
-    with open(results_file, "w", encoding="utf-8") as f:
-        json.dump([], f)
-    print("✅ Fresh results file created - old data cleared")
+    logger.info("Fresh results store created - old data cleared")
+
+@app.on_event("startup")
+def ensure_indexes():
+    """Indexes backing the keyset-paginated admin listings"""
+    if storage is None:
+        return
+    try:
+        storage.ensure_indexes()
+        logger.info("%s indexes ensured", storage.name)
+    except Exception as e:
+        logger.warning("Could not create %s indexes: %s", storage.name, e)
+
+# Admin detail pages, read through and invalidated per admin/quiz when submissions are stored
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
 
-def save_results():
-    with open(results_file, "w", encoding="utf-8") as f:
-        json.dump([r.dict() for r in student_results], f, indent=2)
+def submission_delivered(submission_doc: Dict):
+    """Runs when the outbox gets a submission into storage (again only if a crash cut its first run short)"""
+    response_cache.invalidate(submission_doc["admin_email"], submission_doc["quiz_json_name"])
+    if submission_doc.get("link_id"):
+        rollups.record_submission(storage, submission_doc)
+
+submission_outbox = SubmissionOutbox(OUTBOX_PATH, on_delivered=submission_delivered)
+
+@app.on_event("startup")
+def start_submission_outbox():
+    if storage is not None:
+        submission_outbox.start(storage)
+
+@app.on_event("shutdown")
+def stop_submission_outbox():
+    # Undelivered submissions stay on disk and are replayed on the next start
+    submission_outbox.stop()
+
+def archive_changed(admin_email: str, quiz_name: str):
+    """Submissions of this admin/quiz were archived or restored"""
+    response_cache.invalidate(admin_email, quiz_name)
+    submission_count_cache.pop((admin_email, quiz_name), None)
+
+# Cold tier for old submissions: partitioned gzip JSONL per admin/quiz/month plus an id index
+submission_archive = SubmissionArchive(ARCHIVE_DIR, on_change=archive_changed)
+
+def run_archive_tiers() -> int:
+    """Apply both retention tiers: practice submissions first, then everything past ARCHIVE_AFTER_DAYS"""
+    archived = 0
+    now = datetime.utcnow()
+    if ARCHIVE_PRACTICE_AFTER_DAYS > 0:
+        archived += submission_archive.archive(storage, now - timedelta(days=ARCHIVE_PRACTICE_AFTER_DAYS), PRACTICE_ADMIN_EMAIL)
+    if ARCHIVE_AFTER_DAYS > 0:
+        archived += submission_archive.archive(storage, now - timedelta(days=ARCHIVE_AFTER_DAYS))
+    return archived
+
+async def archive_periodically():
+    while True:
+        if storage is not None:
+            try:
+                await run_in_threadpool(run_archive_tiers)
+            except Exception:
+                logger.exception("Archiving old submissions failed")
+        await asyncio.sleep(ARCHIVE_INTERVAL_HOURS * 3600)
+
+@app.on_event("startup")
+async def start_archiver():
+    if ARCHIVE_INTERVAL_HOURS > 0 and (ARCHIVE_AFTER_DAYS > 0 or ARCHIVE_PRACTICE_AFTER_DAYS > 0):
+        asyncio.create_task(archive_periodically())
+
+@app.on_event("shutdown")
+def close_storage():
+    if storage is not None:
+        storage.close()
 
 # New MongoDB Exam Session Functions
+def exam_session_doc(exam_id: str, quiz_id: str, admin_id: str, admin_email: str, admin_name: str,
+                     link_id: str, questions: List[Dict], created_at: datetime) -> Dict:
+    return {
+        "exam_id": exam_id,
+        "quiz_id": quiz_id,
+        "quiz_name": quiz_id.replace("-", " ").title(),
+        "created_at": created_at.isoformat(),
+        "admin_id": admin_id,
+        "admin_email": admin_email,
+        "admin_name": admin_name,
+        "link_id": link_id,
+        "correct_answers": {
+            "questions": questions,
+            "total_questions": len(questions)
+        },
+        "students": [],
+        "total_students": 0
+    }
+
 def create_exam_session(quiz_id: str, admin_id: str, admin_email: str, link_id: str, questions: List[Dict]):
     """Create a new exam session in MongoDB"""
-    if db is None:
-        print("⚠️ MongoDB not available, skipping exam session creation")
+    if storage is None:
+        logger.warning("Storage not available, skipping exam session creation")
         return None
         
     try:
@@ -213,72 +368,44 @@ def create_exam_session(quiz_id: str, admin_id: str, admin_email: str, link_id:
         exam_id = f"{quiz_id}_{now.strftime('%Y-%m-%d_%H-%M')}"
         
         # Get admin name from database
-        admin_user = db.admin_users.find_one({"_id": ObjectId(admin_id)})
+        admin_user = storage.get_admin_by_id(admin_id)
         admin_name = admin_user.get("name", "Unknown Admin") if admin_user else "Unknown Admin"
         
-        exam_session = {
-            "exam_id": exam_id,
-            "quiz_id": quiz_id,
-            "quiz_name": quiz_id.replace("-", " ").title(),
-            "created_at": now.isoformat(),
-            "admin_id": admin_id,
-            "admin_email": admin_email,
-            "admin_name": admin_name,
-            "link_id": link_id,
-            "correct_answers": {
-                "questions": questions,
-                "total_questions": len(questions)
-            },
-            "students": [],
-            "total_students": 0
-        }
-        
-        result = db.exam_submissions.insert_one(exam_session)
-        print(f"✅ Created exam session: {exam_id}")
+        exam_session = exam_session_doc(exam_id, quiz_id, admin_id, admin_email, admin_name, link_id, questions, now)
+        storage.insert_exam_sessions([exam_session])
+        logger.info("Created exam session %s", exam_id)
         return exam_id
         
-    except Exception as e:
-        print(f"❌ Error creating exam session: {e}")
+    except Exception:
+        logger.exception("Error creating exam session")
         return None
 
 def add_student_to_exam(exam_id: str, student_data: Dict):
     """Add a student submission to an existing exam session"""
-    if db is None:
-        print("⚠️ MongoDB not available, skipping student addition")
+    if storage is None:
+        logger.warning("Storage not available, skipping student addition")
         return False
         
     try:
         # Add student to the exam session
-        result = db.exam_submissions.update_one(
-            {"exam_id": exam_id},
-            {
-                "$push": {"students": student_data},
-                "$inc": {"total_students": 1}
-            }
-        )
-        
-        if result.modified_count > 0:
-            print(f"✅ Added student {student_data['name']} to exam {exam_id}")
+        if storage.push_exam_student(exam_id, student_data):
+            logger.info("Added student %s to exam %s", student_data["name"], exam_id)
             return True
         else:
-            print(f"❌ Failed to add student to exam {exam_id}")
+            logger.error("Failed to add student to exam %s", exam_id)
             return False
             
-    except Exception as e:
-        print(f"❌ Error adding student to exam: {e}")
+    except Exception:
+        logger.exception("Error adding student to exam")
         return False
 
 def get_exam_sessions(admin_email: str = None):
     """Get all exam sessions, optionally filtered by admin"""
-    if db is None:
+    if storage is None:
         return []
         
     try:
-        query = {}
-        if admin_email:
-            query["admin_email"] = admin_email
-            
-        sessions = list(db.exam_submissions.find(query).sort("created_at", -1))
+        sessions = storage.list_exam_sessions(admin_email)
         
         # Convert ObjectId to string for JSON serialization
         for session in sessions:
@@ -286,217 +413,310 @@ def get_exam_sessions(admin_email: str = None):
             
         return sessions
         
-    except Exception as e:
-        print(f"❌ Error fetching exam sessions: {e}")
+    except Exception:
+        logger.exception("Error fetching exam sessions")
         return []
 
 def get_exam_session_by_id(exam_id: str):
     """Get a specific exam session with all student data"""
-    if db is None:
+    if storage is None:
         return None
         
     try:
-        session = db.exam_submissions.find_one({"exam_id": exam_id})
+        session = storage.get_exam_session(exam_id)
         if session:
             session["_id"] = str(session["_id"])
             return session
         return None
         
-    except Exception as e:
-        print(f"❌ Error fetching exam session {exam_id}: {e}")
+    except Exception:
+        logger.exception("Error fetching exam session %s", exam_id)
         return None
 
+def get_link(link_id: str) -> Optional[Dict]:
+    """Link from the in-memory cache, loaded from storage on a miss (e.g. after a restart)"""
+    link_data = quiz_links_storage.get(link_id)
+    if link_data is None and storage is not None:
+        link_data = storage.get_link(link_id)
+        if link_data is not None:
+            quiz_links_storage[link_id] = link_data
+    return link_data
+
+def open_slots(link_data: Dict) -> int:
+    """Slots left on a link: submitted students and attempts in progress (reserved) each hold one"""
+    return link_data["max_allowed"] - link_data["current_count"] - link_data.get("reserved", 0)
+
+def limit_reached(link_data: Dict) -> HTTPException:
+    taken = link_data["current_count"] + link_data.get("reserved", 0)
+    return HTTPException(status_code=403, detail=f"Maximum student limit reached ({taken}/{link_data['max_allowed']})")
+
+def claim_link_slot(link_id: str, student: Dict, score: float):
+    """Atomically record a student on a link; returns (claimed, current link data)"""
+    if storage is not None:
+        claimed, link_data = storage.claim_link_slot(link_id, student, score)
+        if link_data is not None:
+            quiz_links_storage[link_id] = link_data
+        return claimed, link_data
+    
+    link_data = quiz_links_storage[link_id]
+    if student["id"] in [s["id"] for s in link_data["students"]] or open_slots(link_data) <= 0:
+        return False, link_data
+    link_data["current_count"] += 1
+    link_data["score_total"] = link_data.get("score_total", 0.0) + score
+    link_data["students"].append(student)
+    return True, link_data
+
+# Live exam events
+def link_stats(link_id: str) -> Dict:
+    """Current count/average for a link, as pushed to live dashboards"""
+    link_data = get_link(link_id)
+    count = link_data["current_count"]
+    return {
+        "link_id": link_id,
+        "quiz_name": link_data["quiz_id"],
+        "current_count": count,
+        "max_allowed": link_data["max_allowed"],
+        "average_score": round(link_data.get("score_total", 0.0) / count, 2) if count else 0
+    }
+
+def publish_submission_event(submission_doc: Dict, link_id: Optional[str] = None):
+    """Fan a committed submission out to the admin's and the link's subscribers"""
+    event = {
+        "type": "submission",
+        "quiz_name": submission_doc["quiz_json_name"],
+        "student_name": submission_doc["student_name"],
+        "class_name": submission_doc.get("class_name"),
+        "section": submission_doc.get("section"),
+        "score": submission_doc["score"],
+        "percentage": submission_doc["percentage"],
+        "correct_answers": submission_doc["correct_answers"],
+        "total_questions": submission_doc["total_questions"],
+        "submitted_at": submission_doc["submitted_at"],
+        "link_id": link_id,
+        "link_stats": link_stats(link_id) if link_id in quiz_links_storage else None
+    }
+    event_bus.publish(admin_topic(submission_doc["admin_email"]), event)
+    if link_id:
+        event_bus.publish(link_topic(link_id), event)
+
+# Keyset pagination helpers
+def encode_cursor(sort_value: datetime, doc_id, offset: int = 0) -> str:
+    """Opaque continuation token for the last row of a page; offset is how many rows came before the next page"""
+    raw = json.dumps({"t": sort_value.isoformat() if sort_value else None, "i": str(doc_id), "n": offset})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def cursor_data(cursor: str) -> Dict:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def decode_cursor(cursor: str):
+    data = cursor_data(cursor)
+    try:
+        return (datetime.fromisoformat(data["t"]) if data["t"] else None), data["i"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def cursor_offset(cursor: str) -> int:
+    """Rows before the page a cursor continues at (0 for cursors issued without one)"""
+    offset = cursor_data(cursor).get("n", 0)
+    return offset if isinstance(offset, int) and offset >= 0 else 0
+
+# Cached submission totals: {(admin_email, quiz_name): (expires_at, count)}
+submission_count_cache: Dict = {}
+
+def cached_submission_count(admin_email: str, quiz_name: str) -> int:
+    key = (admin_email, quiz_name)
+    cached = submission_count_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    
+    count = storage.count_submissions(admin_email, quiz_name)
+    submission_count_cache[key] = (time.monotonic() + SUBMISSION_COUNT_TTL_SECONDS, count)
+    return count
+
+def bump_submission_count(admin_email: str, quiz_name: str):
+    """Keep a cached total exact when we know a submission was just stored"""
+    key = (admin_email, quiz_name)
+    cached = submission_count_cache.get(key)
+    if cached:
+        submission_count_cache[key] = (cached[0], cached[1] + 1)
+
+# Quiz repository - search paths in priority order, uploads are published to the first
+quiz_repository = QuizRepository(
+    [
+        QUIZ_DIR,                                                          # /app/quiz_data/
+        Path(__file__).parent.parent / "quiz_data",                        # /quiz_data/
+        Path(__file__).parent.parent / "frontend" / "public" / "quiz_data",  # /frontend/public/quiz_data/
+        Path(__file__).parent.parent                                       # Root directory
+    ],
+    IMAGES_DIR
+)
+
+# Question bank search - built at startup, re-indexed per quiz when a file changes
+question_index = QuestionSearchIndex(quiz_repository, SEARCH_INDEX_REFRESH_SECONDS)
+
+@app.on_event("startup")
+def build_search_index():
+    start = time.perf_counter()
+    question_index.refresh(force=True)
+    stats = question_index.stats()
+    logger.info("Indexed %d questions from %d quizzes in %.0f ms", stats["questions"], stats["quizzes"], (time.perf_counter() - start) * 1000)
+
 # Load questions - Dynamic quiz file loading
-def load_quiz_questions(quiz_name: str):
+def load_quiz(quiz_name: str) -> CompiledQuiz:
     """
-    Dynamically load quiz questions from source directories
-    Searches multiple locations for the same quiz name
+    Load the compiled quiz from the repository
+    Files are parsed once and re-read only when they change on disk
     """
-    # Search paths in priority order
-    search_paths = [
-        QUIZ_DIR / f"{quiz_name}.json",                                    # /app/quiz_data/
-        Path(__file__).parent.parent / "quiz_data" / f"{quiz_name}.json",  # /quiz_data/
-        Path(__file__).parent.parent / "frontend" / "public" / "quiz_data" / f"{quiz_name}.json",  # /frontend/public/quiz_data/
-        Path(__file__).parent.parent / f"{quiz_name}.json"                 # Root directory
-    ]
-    
-    for path in search_paths:
-        if path.exists():
-            print(f"✅ Found quiz file: {path}")
-            with open(path, "r", encoding="utf-8") as f:
-                quiz_data = json.load(f)
-                print(f"✅ Loaded {len(quiz_data)} questions from {quiz_name}.json")
-                return quiz_data
+    compiled = quiz_repository.load(quiz_name)
+    if compiled is not None:
+        return compiled
     
     # If no file found, list available files for debugging
-    print(f"❌ Quiz file '{quiz_name}.json' not found in any location")
-    print("📁 Available quiz files:")
-    for search_path in search_paths:
-        if search_path.parent.exists():
-            for file in search_path.parent.glob("*.json"):
-                print(f"   - {file.name}")
+    logger.warning("Quiz file '%s.json' not found; available: %s", quiz_name, ", ".join(quiz_repository.available()))
     
     raise HTTPException(status_code=404, detail=f"Quiz '{quiz_name}' not found")
 
+def load_quiz_questions(quiz_name: str):
+    """
+    Dynamically load quiz questions from source directories
+    The returned list is shared with the cache and must not be modified
+    """
+    compiled = load_quiz(quiz_name)
+    logger.debug("Loaded %d questions from %s.json", len(compiled.questions), quiz_name)
+    return compiled.questions
+
+# Time-spent analytics - streaming sketches per quiz version, merged across workers on read
+time_sketches = TimeSketchRecorder()
+
+async def flush_time_sketches_periodically():
+    while True:
+        await asyncio.sleep(TIME_SKETCH_FLUSH_SECONDS)
+        if storage is not None:
+            await run_in_threadpool(time_sketches.flush, storage)
+
+@app.on_event("startup")
+async def start_time_sketch_flusher():
+    asyncio.create_task(flush_time_sketches_periodically())
+
+@app.on_event("shutdown")
+def flush_time_sketches():
+    if storage is not None:
+        time_sketches.flush(storage)
+
+def read_answers(quiz: CompiledQuiz, answers: List[StudentAnswer], packed: Optional[PackedAnswers],
+                 permutation: Optional[QuizPermutation] = None):
+    """
+    (sheet, stored answers) from either submission format; packed wins when both are sent.
+    With a permutation the answers are as the student saw them and are mapped back to quiz order.
+    """
+    if packed is None:
+        sheet = align_answers(quiz, answers)
+        if permutation is None:
+            return sheet, [answer.dict() for answer in answers]
+        permutation.map_options(sheet)
+    else:
+        try:
+            sheet = decode_packed(quiz, packed.selected, packed.times, packed.marked)
+        except PackedAnswerError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid packed answers: {e}")
+        if permutation is not None:
+            sheet = permutation.unshuffle(sheet)
+    return sheet, sheet_answers(quiz, sheet)
+
 # Enhanced scoring logic with detailed validation
-def calculate_score(answers: List[StudentAnswer], questions: List[Dict], quiz_name: str):
+def calculate_score(answers: List[Dict], quiz: CompiledQuiz, sheet=None):
     """
     Calculate detailed score with proper answer validation
     """
-    print(f"🔍 Starting score calculation for {quiz_name}")
-    print(f"📝 Student submitted {len(answers)} answers")
-    print(f"📋 Source quiz has {len(questions)} questions")
-    
-    q_map = {q["questionNumber"]: q for q in questions}
-    correct_count = 0
-    wrong_count = 0
-    unanswered_count = 0
-    details = []
-
-    # Check all questions from source
-    for q in questions:
-        question_num = q["questionNumber"]
-        
-        # Find student's answer for this question
-        student_answer = next((a for a in answers if a.questionNumber == question_num), None)
-        
-        if not student_answer:
-            # Student didn't answer this question
-            unanswered_count += 1
-            details.append({
-                "questionNumber": question_num,
-                "questionText": q.get("questionText", ""),
-                "selectedOption": -1,  # -1 means not answered
-                "selectedLetter": "NOT ANSWERED",
-                "correctAnswer": q.get("correct_answer", "X"),
-                "correctLetter": ["A", "B", "C", "D"][q.get("correct_answer", 0)] if isinstance(q.get("correct_answer"), int) else q.get("correct_answer", "X"),
-                "isCorrect": False,
-                "status": "UNANSWERED",
-                "timeSpent": 0,
-                "isMarked": False,
-                "options": q.get("option_with_images_", [])
-            })
-            continue
-        
-        # Get correct answer from source JSON
-        correct_raw = q.get("correct_answer", "X")
-        correct_letter = (
-            ["A", "B", "C", "D"][correct_raw] if isinstance(correct_raw, int) else str(correct_raw)
-        )
-        
-        # Get student's selected answer
-        if 0 <= student_answer.selectedOption <= 3:
-            selected_letter = ["A", "B", "C", "D"][student_answer.selectedOption]
-        else:
-            selected_letter = "INVALID"
-        
-        # Validate answer
-        is_correct = (correct_letter == selected_letter)
-        
-        if is_correct:
-            correct_count += 1
-            status = "CORRECT"
-        else:
-            wrong_count += 1
-            status = "WRONG"
-
-        details.append({
-            "questionNumber": question_num,
-            "questionText": q.get("questionText", ""),
-            "selectedOption": student_answer.selectedOption,
-            "selectedLetter": selected_letter,
-            "correctAnswer": correct_raw,
-            "correctLetter": correct_letter,
-            "isCorrect": is_correct,
-            "status": status,
-            "timeSpent": student_answer.timeSpent,
-            "isMarked": student_answer.isMarked,
-            "options": q.get("option_with_images_", [])
-        })
-        
-        print(f"Q{question_num}: Student={selected_letter}, Correct={correct_letter}, Result={status}")
+    score_data = score_sheet(quiz, sheet or align_answers(quiz, answers))
 
-    total_questions = len(questions)
-    percentage = round((correct_count / total_questions) * 100, 2) if total_questions > 0 else 0
-    
-    print(f"📊 FINAL SCORE:")
-    print(f"   ✅ Correct: {correct_count}")
-    print(f"   ❌ Wrong: {wrong_count}")
-    print(f"   ⚪ Unanswered: {unanswered_count}")
-    print(f"   📈 Percentage: {percentage}%")
+    # Per-question traces are sampled - at full rate they would be one line per question per submit
+    if logger.isEnabledFor(logging.DEBUG) and score_trace_sampler.allow():
+        trace = " ".join(
+            f"Q{detail['questionNumber']}={detail['selectedLetter']}/{detail['correctLetter']}:{detail['status']}"
+            for detail in score_data["details"] if detail["status"] != "UNANSWERED"
+        )
+        logger.debug("Score trace for %s: %s", quiz.name, trace, extra={"quiz": quiz.name, "submitted_answers": len(answers)})
 
-    return {
-        "correct": correct_count,
-        "wrong": wrong_count,
-        "unanswered": unanswered_count,
-        "total": total_questions,
-        "percentage": percentage,
-        "details": details
-    }
+    return score_data
 
 @app.post("/quiz/submit")
 def submit_quiz(data: QuizSubmission):
-    if db is None:
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database connection not available")
     
-    questions = load_quiz_questions(data.quizName)
-    score_data = calculate_score(data.answers, questions, data.quizName)
+    quiz = load_quiz(data.quizName)
+    sheet, answers = read_answers(quiz, data.answers, data.packed)
+    score_data = calculate_score(answers, quiz, sheet)
+    time_spent_seconds = parse_duration(data.totalTimeSpent)
 
     # Create individual submission document
     submission_doc = {
         "quiz_json_name": data.quizName,
-        "admin_email": "system@admin.com",  # Regular quizzes go to system admin
+        "admin_email": PRACTICE_ADMIN_EMAIL,  # Regular quizzes go to system admin
         "student_name": data.studentName,
         "student_email": data.studentEmail,
         "total_questions": score_data["total"],
-        "answered_questions": len(data.answers),
+        "answered_questions": len(answers),
         "correct_answers": score_data["correct"],
         "wrong_answers": score_data["wrong"],
         "unanswered": score_data["unanswered"],
         "score": round((score_data["correct"] / score_data["total"]) * 100, 2),
         "percentage": score_data["percentage"],
         "time_spent": data.totalTimeSpent,
+        "time_spent_seconds": time_spent_seconds,
         "submitted_at": data.submittedAt,
         "timestamp": datetime.utcnow(),
         "detailed_results": score_data["details"],
-        "answers": [answer.dict() for answer in data.answers]
+        "answers": answers,
+        "quiz_version": quiz.version
     }
 
     try:
-        # Save individual submission to MongoDB
-        db.exam_submissions.insert_one(submission_doc)
-        print(f"✅ Saved submission for {data.studentName} - Quiz: {data.quizName}")
-        
-        # Also save to JSON for backward compatibility
-        result = StudentResult(
-            studentName=data.studentName,
-            studentEmail=data.studentEmail,
-            quizName=data.quizName,
-            totalQuestions=score_data["total"],
-            answeredQuestions=len(data.answers),
-            correctAnswers=score_data["correct"],
-            score=round((score_data["correct"] / score_data["total"]) * 100, 2),
-            timeSpent=data.totalTimeSpent,
-            submittedAt=data.submittedAt,
-            detailedResults=score_data["details"]
-        )
-        student_results.append(result)
-        save_results()
-        
-    except Exception as e:
-        print(f"❌ Error saving submission: {e}")
+        # Commit locally; the outbox delivers it to storage even through a database outage
+        submission_outbox.put(submission_doc)
+    except Exception:
+        logger.exception("Error saving submission")
         raise HTTPException(status_code=500, detail="Failed to save submission")
+    logger.info("Saved submission for %s - quiz %s", data.studentName, data.quizName, extra={
+        "quiz": data.quizName, "correct": score_data["correct"], "wrong": score_data["wrong"],
+        "unanswered": score_data["unanswered"], "score": submission_doc["score"]
+    })
+
+    # The submission is committed from here on: a failing side effect is logged, never turned
+    # into an error the student would retry (there is no idempotency key, so a retry stores it twice)
+    try:
+        bump_submission_count(submission_doc["admin_email"], data.quizName)
+        time_sketches.record(submission_doc["admin_email"], quiz, sheet.times, time_spent_seconds)
+        
+        # Also keep in the recent results store for the teacher panel
+        student_results.append(
+            quiz, sheet,
+            student_name=data.studentName,
+            student_email=data.studentEmail,
+            score=submission_doc["score"],
+            correct=score_data["correct"],
+            answered=len(answers),
+            time_spent_seconds=time_spent_seconds,
+            submitted_at=data.submittedAt
+        )
+        publish_submission_event(submission_doc)
+    except Exception:
+        logger.exception("Post-submit bookkeeping failed for %s", data.studentName)
 
     return {"message": "✅ Submission received", "score": submission_doc["score"]}
 
 @app.post("/admin/login")
 def admin_login(login_data: AdminLoginRequest):
-    if db is None:
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database connection not available")
     
     try:
         # Find admin user by email
-        admin_user = db.admin_users.find_one({"email": login_data.email})
+        admin_user = storage.get_admin_by_email(login_data.email)
         
         if not admin_user:
             raise HTTPException(status_code=401, detail="Invalid email or password")
@@ -516,7 +736,7 @@ def admin_login(login_data: AdminLoginRequest):
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
         # Get plan information
-        plan = db.plans.find_one({"_id": admin_user["plan_id"]})
+        plan = storage.get_plan(admin_user["plan_id"])
         
         if not plan:
             raise HTTPException(status_code=500, detail="Plan not found")
@@ -531,13 +751,17 @@ def admin_login(login_data: AdminLoginRequest):
         
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Login error: {e}")
+    except Exception:
+        logger.exception("Login error")
         raise HTTPException(status_code=500, detail="Login failed")
 
 # Add missing models for generate-link
 class GenerateLinkRequest(BaseModel):
     quiz_id: str
+    shuffle: bool = True  # per-student question and option order
+    starts_at: Optional[datetime] = None  # exam window; naive times are UTC
+    ends_at: Optional[datetime] = None
+    duration_minutes: Optional[int] = None  # per-attempt time limit
 
 class GenerateLinkResponse(BaseModel):
     link_id: str
@@ -545,24 +769,53 @@ class GenerateLinkResponse(BaseModel):
     quiz_json_file: str
     max_allowed: int
 
+def utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def link_window(starts_at: Optional[datetime], ends_at: Optional[datetime], duration_minutes: Optional[int]) -> Dict:
+    """Exam window fields for a link document, stored as UTC ISO strings like created_at"""
+    starts_at, ends_at = utc_naive(starts_at), utc_naive(ends_at)
+    if duration_minutes is not None and duration_minutes < 1:
+        raise HTTPException(status_code=400, detail="duration_minutes must be at least 1")
+    if starts_at and ends_at and ends_at <= starts_at:
+        raise HTTPException(status_code=400, detail="ends_at must be after starts_at")
+    return {
+        "starts_at": starts_at.isoformat() if starts_at else None,
+        "ends_at": ends_at.isoformat() if ends_at else None,
+        "duration_minutes": duration_minutes
+    }
+
+def exam_window(link_data: Dict):
+    """(starts_at, ends_at, duration_minutes) of a link; all None for untimed links"""
+    starts_at, ends_at = link_data.get("starts_at"), link_data.get("ends_at")
+    return (datetime.fromisoformat(starts_at) if starts_at else None,
+            datetime.fromisoformat(ends_at) if ends_at else None,
+            link_data.get("duration_minutes"))
+
+def is_timed(link_data: Dict) -> bool:
+    return any(value is not None for value in exam_window(link_data))
+
 @app.post("/admin/generate-link")
 def generate_quiz_link(request: GenerateLinkRequest, admin_email: str = Header(..., alias="X-Admin-Email"), http_request: Request = None):
-    if db is None:
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database connection not available")
     
     try:
         # Find admin user by email to get their plan dynamically
-        admin_user = db.admin_users.find_one({"email": admin_email})
+        admin_user = storage.get_admin_by_email(admin_email)
         if not admin_user:
             raise HTTPException(status_code=401, detail="Admin not found")
         
         # Get admin's plan from DB dynamically
-        plan = db.plans.find_one({"_id": admin_user["plan_id"]})
+        plan = storage.get_plan(admin_user["plan_id"])
         if not plan:
             raise HTTPException(status_code=500, detail="Plan not found")
         
         # Use dynamic student limit from database
         max_students = plan.get("max_students", plan.get("student_limit", 1))
+        window = link_window(request.starts_at, request.ends_at, request.duration_minutes)
         
         # Load quiz questions to store in exam session
         questions = load_quiz_questions(request.quiz_id)
@@ -580,20 +833,28 @@ def generate_quiz_link(request: GenerateLinkRequest, admin_email: str = Header(.
             questions=questions
         )
         
-        # Store link with dynamic tracking (keep in-memory for quick access)
-        quiz_links_storage[link_id] = {
+        # Store link with dynamic tracking (persisted, and cached in-memory for quick access)
+        link_data = {
+            "link_id": link_id,
             "max_allowed": max_students,
             "current_count": 0,
+            "reserved": 0,  # slots held by timed attempts in progress
             "students": [],
             "quiz_id": request.quiz_id,
             "admin_id": str(admin_user["_id"]),
             "admin_email": admin_email,
             "plan_name": plan["name"],
-            "exam_id": exam_id  # Link to MongoDB exam session
+            "exam_id": exam_id,  # Link to MongoDB exam session
+            "score_total": 0.0,  # Running sum for live average
+            "shuffle": request.shuffle,
+            **window,
+            "created_at": datetime.utcnow().isoformat()
         }
+        storage.insert_links([link_data])
+        quiz_links_storage[link_id] = link_data
         
-        print(f"✅ Generated quiz link {link_id} for admin {admin_user['name']} with {max_students} student limit ({plan['name']} plan)")
-        print(f"✅ Created exam session: {exam_id}")
+        logger.info("Generated quiz link %s (exam session %s) for admin %s with %d student limit (%s plan)",
+                    link_id, exam_id, admin_user["name"], max_students, plan["name"])
         
         # Generate URL based on the request's host (works with tunnels)
         base_url = f"{http_request.url.scheme}://{http_request.url.netloc}" if http_request else "http://localhost:8080"
@@ -607,29 +868,178 @@ def generate_quiz_link(request: GenerateLinkRequest, admin_email: str = Header(.
         
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Generate link error: {e}")
+    except Exception:
+        logger.exception("Generate link error")
         raise HTTPException(status_code=500, detail="Failed to generate quiz link")
 
+class BulkLinkEntry(BaseModel):
+    quiz_id: str
+    class_name: Optional[str] = None
+    section: Optional[str] = None
+    max_students: Optional[int] = None  # capped at the plan's limit
+    shuffle: bool = True
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    duration_minutes: Optional[int] = None
+
+class BulkGenerateLinksRequest(BaseModel):
+    links: List[BulkLinkEntry]
+
+class BulkLinkResult(GenerateLinkResponse):
+    class_name: Optional[str] = None
+    section: Optional[str] = None
+    exam_id: str
+
+class BulkGenerateLinksResponse(BaseModel):
+    links: List[BulkLinkResult]
+
+@app.post("/admin/generate-links", response_model=BulkGenerateLinksResponse)
+def generate_quiz_links(request: BulkGenerateLinksRequest, admin_email: str = Header(..., alias="X-Admin-Email"), http_request: Request = None):
+    """
+    Create links for many classes at once, e.g. one quiz for every section at the start of term.
+    The admin and plan are looked up once, each quiz is loaded once, and all exam sessions and
+    links are written in one batch each. Nothing is written unless every quiz resolves.
+    """
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    if not request.links:
+        raise HTTPException(status_code=400, detail="No links requested")
+    if len(request.links) > BULK_LINK_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_LINK_LIMIT} links per request")
+    
+    admin_user = storage.get_admin_by_email(admin_email)
+    if not admin_user:
+        raise HTTPException(status_code=401, detail="Admin not found")
+    plan = storage.get_plan(admin_user["plan_id"])
+    if not plan:
+        raise HTTPException(status_code=500, detail="Plan not found")
+    plan_limit = plan.get("max_students", plan.get("student_limit", 1))
+    
+    # Every quiz is resolved before anything is written; an unknown quiz fails the whole batch
+    questions_by_quiz = {quiz_id: load_quiz_questions(quiz_id) for quiz_id in dict.fromkeys(e.quiz_id for e in request.links)}
+    
+    import secrets
+    now = datetime.utcnow()
+    admin_id = str(admin_user["_id"])
+    base_url = f"{http_request.url.scheme}://{http_request.url.netloc}" if http_request else "http://localhost:8080"
+    sessions, links, results = [], [], []
+    for entry in request.links:
+        window = link_window(entry.starts_at, entry.ends_at, entry.duration_minutes)
+        link_id = secrets.token_urlsafe(8)
+        # The link id keeps exam ids unique when several sessions for a quiz start in the same minute
+        exam_id = f"{entry.quiz_id}_{now.strftime('%Y-%m-%d_%H-%M')}_{link_id}"
+        max_students = min(entry.max_students, plan_limit) if entry.max_students and entry.max_students > 0 else plan_limit
+        sessions.append(exam_session_doc(exam_id, entry.quiz_id, admin_id, admin_email, admin_user.get("name", "Unknown Admin"),
+                                         link_id, questions_by_quiz[entry.quiz_id], now))
+        links.append({
+            "link_id": link_id,
+            "max_allowed": max_students,
+            "current_count": 0,
+            "reserved": 0,  # slots held by timed attempts in progress
+            "students": [],
+            "quiz_id": entry.quiz_id,
+            "class_name": entry.class_name,
+            "section": entry.section,
+            "admin_id": admin_id,
+            "admin_email": admin_email,
+            "plan_name": plan["name"],
+            "exam_id": exam_id,
+            "score_total": 0.0,
+            "shuffle": entry.shuffle,
+            **window,
+            "created_at": now.isoformat()
+        })
+        results.append(BulkLinkResult(
+            link_id=link_id,
+            link_url=f"{base_url}/quiz/{link_id}",
+            quiz_json_file=f"{entry.quiz_id}.json",
+            max_allowed=max_students,
+            class_name=entry.class_name,
+            section=entry.section,
+            exam_id=exam_id
+        ))
+    
+    try:
+        storage.insert_exam_sessions(sessions)
+        storage.insert_links(links)
+    except Exception:
+        logger.exception("Bulk link generation failed for %s", admin_email)
+        raise HTTPException(status_code=500, detail="Failed to generate quiz links")
+    for link_data in links:
+        quiz_links_storage[link_data["link_id"]] = link_data
+    
+    logger.info("Generated %d quiz links for %d quizzes for admin %s (%s plan)",
+                len(links), len(questions_by_quiz), admin_user["name"], plan["name"])
+    return BulkGenerateLinksResponse(links=results)
+
+def link_student_id(name: str, class_name: str, section: str) -> str:
+    return f"{name}_{class_name}_{section}"
+
+def student_permutation(link_id: str, link_data: Dict, quiz: CompiledQuiz, student_id: str,
+                        shuffled: bool = True) -> Optional[QuizPermutation]:
+    """
+    The student's own question/option order on a shuffle link, seeded so fetch and submit agree.
+    shuffled is whether the student was served that order; answers to the plain quiz map as they are.
+    """
+    if not shuffled or not link_data.get("shuffle"):
+        return None
+    return QuizPermutation(quiz, student_seed(link_id, student_id))
+
+def attempt_id(link_id: str, student_id: str) -> str:
+    return f"{link_id}:{student_id}"
+
+def open_attempt(link_id: str, link_data: Dict, student_id: str) -> Optional[Dict]:
+    if storage is None or not is_timed(link_data):
+        return None
+    attempt = storage.get_attempt(attempt_id(link_id, student_id))
+    return attempt if attempt is not None and attempt["status"] == "open" else None
+
+def attempt_seconds(attempt: Dict, now: datetime) -> int:
+    """Server-measured time on an attempt, stopping at its deadline"""
+    end = min(now, attempt["deadline"]) if attempt.get("deadline") else now
+    return max(int((end - attempt["started_at"]).total_seconds()), 0)
+
+def seconds_left(attempt: Dict, now: datetime) -> Optional[int]:
+    return max(int((attempt["deadline"] - now).total_seconds()), 0) if attempt.get("deadline") else None
+
+def deadline_timestamp(attempt: Dict) -> float:
+    """When the timer wheel finalizes the attempt: its deadline plus the grace period"""
+    return attempt["deadline"].replace(tzinfo=timezone.utc).timestamp() + DEADLINE_GRACE_SECONDS
+
+def record_link_students(link_id: str, students: List[Dict], scores: List[float]):
+    storage.record_link_students(link_id, students, scores)
+    quiz_links_storage.pop(link_id, None)  # reloaded from storage on next access
+
 @app.get("/api/quiz/{link_id}")
-def get_quiz_by_link(link_id: str):
+def get_quiz_by_link(link_id: str, name: Optional[str] = None, class_name: Optional[str] = None, section: Optional[str] = None):
+    """
+    Serve a link's quiz. On shuffle links, a student identifying themselves (the same
+    name/class/section they submit with) gets their own question and option order. The
+    response says whether it did ("shuffled"); submissions echo that flag, since answers
+    to the plain order must not be mapped through the student's permutation.
+    """
     # Check if link exists and validate access
-    if link_id not in quiz_links_storage:
+    link_data = get_link(link_id)
+    if link_data is None:
         raise HTTPException(status_code=404, detail="Quiz link not found or expired")
     
-    link_data = quiz_links_storage[link_id]
+    # Questions of a timed exam are not served before its window opens
+    starts_at, ends_at, duration_minutes = exam_window(link_data)
+    if starts_at and datetime.utcnow() < starts_at:
+        raise HTTPException(status_code=403, detail=f"This exam opens at {starts_at.isoformat()} UTC")
     
-    # Check if max students reached
-    if link_data["current_count"] >= link_data["max_allowed"]:
-        raise HTTPException(
-            status_code=403, 
-            detail=f"Maximum student limit reached ({link_data['current_count']}/{link_data['max_allowed']})"
-        )
+    # Check if max students reached - students with an attempt in progress hold a slot already
+    if open_slots(link_data) <= 0 and not (
+        name and class_name and section and open_attempt(link_id, link_data, link_student_id(name, class_name, section))
+    ):
+        raise limit_reached(link_data)
     
     # Load quiz questions - use the specific quiz from the link
+    quiz = None
     try:
-        questions = load_quiz_questions(link_data["quiz_id"])
-        print(f"✅ Loaded quiz questions from {link_data['quiz_id']}.json")
+        quiz = load_quiz(link_data["quiz_id"])
+        questions = quiz.questions
+        logger.debug("Loaded quiz questions from %s.json", link_data["quiz_id"])
     except:
         # Fallback to default quiz files if specific quiz not found
         quiz_files = ["NEET-2025-Code-48", "JEE", "7th std Maths", "7th std Science"]
@@ -638,7 +1048,7 @@ def get_quiz_by_link(link_id: str):
         for quiz_file in quiz_files:
             try:
                 questions = load_quiz_questions(quiz_file)
-                print(f"⚠️ Using fallback quiz file: {quiz_file}.json")
+                logger.warning("Link %s uses fallback quiz file %s.json", link_id, quiz_file)
                 break
             except:
                 continue
@@ -646,7 +1056,13 @@ def get_quiz_by_link(link_id: str):
         if not questions:
             raise HTTPException(status_code=404, detail="Quiz questions not found")
     
-    print(f"✅ Quiz access granted for link {link_id} - {link_data['current_count']}/{link_data['max_allowed']} students used")
+    permutation = None
+    if quiz is not None and name and class_name and section:
+        permutation = student_permutation(link_id, link_data, quiz, link_student_id(name, class_name, section))
+    if permutation is not None:
+        questions = permutation.questions()
+    
+    logger.debug("Quiz access granted for link %s - %d/%d students used", link_id, link_data["current_count"], link_data["max_allowed"])
     
     return {
         "link_id": link_id,
@@ -654,7 +1070,13 @@ def get_quiz_by_link(link_id: str):
         "max_allowed": link_data["max_allowed"],
         "current_count": link_data["current_count"],
         "questions": questions,
-        "can_access": link_data["current_count"] < link_data["max_allowed"]
+        "shuffle": bool(link_data.get("shuffle")),
+        "shuffled": permutation is not None,
+        "timed": is_timed(link_data),
+        "starts_at": link_data.get("starts_at"),
+        "ends_at": link_data.get("ends_at"),
+        "duration_minutes": duration_minutes,
+        "can_access": open_slots(link_data) > 0
     }
 
 # Add missing models for quiz submission
@@ -668,116 +1090,250 @@ class LinkQuizSubmission(BaseModel):
     name: str
     class_name: str
     section: str
-    answers: List[StudentAnswer]
+    answers: List[StudentAnswer] = []
+    packed: Optional[PackedAnswers] = None
+    shuffled: bool = False  # echoed from GET /api/quiz/{link_id}: the answers are to this student's shuffled view
     totalTimeSpent: str
 
-@app.post("/api/quiz/{link_id}/submit")
-def submit_quiz_by_link(link_id: str, submission: LinkQuizSubmission):
-    # Check if link exists
-    if link_id not in quiz_links_storage:
+class AttemptProgress(StudentInfoRequest):
+    answers: List[StudentAnswer] = []
+    packed: Optional[PackedAnswers] = None
+    shuffled: bool = False
+
+@app.post("/api/quiz/{link_id}/start")
+def start_link_attempt(link_id: str, student: StudentInfoRequest):
+    """
+    Start, or resume, a student's attempt on a timed link. The deadline is fixed here from
+    the link's end time and duration, so reloading the page never restarts the clock.
+    """
+    link_data = get_link(link_id)
+    if link_data is None:
         raise HTTPException(status_code=404, detail="Quiz link not found")
+    if not is_timed(link_data):
+        return {"timed": False}
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
     
-    link_data = quiz_links_storage[link_id]
-    
-    # Check if student already submitted (prevent duplicates)
-    student_id = f"{submission.name}_{submission.class_name}_{submission.section}"
-    if student_id in [s["id"] for s in link_data["students"]]:
-        raise HTTPException(status_code=409, detail="Student has already submitted this quiz")
+    now = datetime.utcnow()
+    starts_at, ends_at, duration_minutes = exam_window(link_data)
+    if starts_at and now < starts_at:
+        raise HTTPException(status_code=403, detail=f"This exam opens at {starts_at.isoformat()} UTC")
     
-    # Check if max students reached
-    if link_data["current_count"] >= link_data["max_allowed"]:
-        raise HTTPException(
-            status_code=403, 
-            detail=f"Maximum student limit reached ({link_data['current_count']}/{link_data['max_allowed']})"
-        )
+    student_id = link_student_id(student.name, student.class_name, student.section)
+    attempt = storage.get_attempt(attempt_id(link_id, student_id))
+    if attempt is None:
+        if ends_at and now >= ends_at:
+            raise HTTPException(status_code=403, detail="This exam has closed")
+        if student_id in [s["id"] for s in link_data["students"]]:
+            raise HTTPException(status_code=409, detail="Student has already submitted this quiz")
+        if open_slots(link_data) <= 0:
+            raise limit_reached(link_data)
+        deadlines = [d for d in (ends_at, now + timedelta(minutes=duration_minutes) if duration_minutes else None) if d]
+        attempt = storage.start_attempt({
+            "_id": attempt_id(link_id, student_id),
+            "link_id": link_id,
+            "student_id": student_id,
+            "name": student.name,
+            "class_name": student.class_name,
+            "section": student.section,
+            "status": "open",
+            "started_at": now,
+            "deadline": min(deadlines) if deadlines else None,
+            "progress": None,
+            "saved_at": None
+        })
+        # The slot is reserved atomically with the insert; the cached link no longer has the counts
+        quiz_links_storage.pop(link_id, None)
+        if attempt is None:
+            link_data = get_link(link_id)
+            if student_id in [s["id"] for s in link_data["students"]]:
+                raise HTTPException(status_code=409, detail="Student has already submitted this quiz")
+            raise limit_reached(link_data)
+    if attempt["status"] != "open":
+        raise HTTPException(status_code=409, detail="This attempt has already been submitted")
+    if attempt.get("deadline"):
+        exam_timers.schedule(attempt["_id"], deadline_timestamp(attempt))
     
-    # Load quiz questions for scoring
-    questions = load_quiz_questions(link_data["quiz_id"])
+    return {
+        "timed": True,
+        "started_at": attempt["started_at"],
+        "deadline": attempt.get("deadline"),
+        "server_time": now,
+        "seconds_left": seconds_left(attempt, now)
+    }
+
+@app.post("/api/quiz/{link_id}/progress")
+def save_link_attempt_progress(link_id: str, progress: AttemptProgress):
+    """Save a timed attempt's answers so far; when the deadline passes the attempt is scored from the last save"""
+    link_data = get_link(link_id)
+    if link_data is None:
+        raise HTTPException(status_code=404, detail="Quiz link not found")
+    student_id = link_student_id(progress.name, progress.class_name, progress.section)
+    attempt = open_attempt(link_id, link_data, student_id)
+    if attempt is None:
+        raise HTTPException(status_code=409, detail="No attempt in progress for this student")
     
-    # Calculate score with proper validation
-    score_data = calculate_score(submission.answers, questions, link_data["quiz_id"])
+    now = datetime.utcnow()
+    if attempt.get("deadline") and now > attempt["deadline"] + timedelta(seconds=DEADLINE_GRACE_SECONDS):
+        raise HTTPException(status_code=409, detail="The deadline has passed")
     
-    # Create individual submission document for new MongoDB structure
-    submission_doc = {
+    # Stored in quiz order, as a submission stores them, so finalizing needs no permutation
+    quiz = load_quiz(link_data["quiz_id"])
+    permutation = student_permutation(link_id, link_data, quiz, student_id, progress.shuffled)
+    _, answers = read_answers(quiz, progress.answers, progress.packed, permutation)
+    if not storage.save_attempt_progress(attempt["_id"], {"answers": answers, "shuffled": permutation is not None}, now):
+        raise HTTPException(status_code=409, detail="This attempt has already been submitted")
+    return {"saved": len(answers), "seconds_left": seconds_left(attempt, now)}
+
+def close_attempt(link_id: str, link_data: Dict, student_id: str) -> Dict:
+    """Claim a timed attempt for a student's own submit; after the grace period it belongs to the deadline"""
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    attempt = storage.get_attempt(attempt_id(link_id, student_id))
+    if attempt is None:
+        raise HTTPException(status_code=400, detail="Start the exam before submitting")
+    if attempt["status"] != "open":
+        raise HTTPException(status_code=409, detail="This attempt was already submitted at its deadline")
+    if attempt.get("deadline") and datetime.utcnow() > attempt["deadline"] + timedelta(seconds=DEADLINE_GRACE_SECONDS):
+        raise HTTPException(status_code=409, detail="The deadline has passed; your last saved answers are submitted automatically")
+    if not storage.claim_attempts([attempt["_id"]], "submitted"):
+        raise HTTPException(status_code=409, detail="This attempt was already submitted at its deadline")
+    exam_timers.cancel(attempt["_id"])
+    return attempt
+
+def link_submission_doc(link_id: str, link_data: Dict, quiz: CompiledQuiz, name: str, class_name: str, section: str,
+                        score_data: Dict, answers: List[Dict], time_spent: str, time_spent_seconds: Optional[int],
+                        shuffled: bool, submitted_at: datetime) -> Dict:
+    return {
         "quiz_json_name": link_data["quiz_id"],  # Use the quiz_id from link
         "admin_email": link_data["admin_email"],  # Track which admin generated this link
-        "student_name": submission.name,
-        "student_email": f"{submission.name}@{submission.class_name}.school",  # Generate email if not provided
-        "class_name": submission.class_name,
-        "section": submission.section,
+        "student_name": name,
+        "student_email": f"{name}@{class_name}.school",  # Generate email if not provided
+        "class_name": class_name,
+        "section": section,
         "total_questions": score_data["total"],
-        "answered_questions": len(submission.answers),
+        "answered_questions": len(answers),
         "correct_answers": score_data["correct"],
         "wrong_answers": score_data["wrong"],
         "unanswered": score_data["unanswered"],
         "score": round((score_data["correct"] / score_data["total"]) * 100, 2),
         "percentage": score_data["percentage"],
-        "time_spent": submission.totalTimeSpent,
-        "submitted_at": datetime.utcnow().isoformat(),
-        "timestamp": datetime.utcnow(),
+        "time_spent": time_spent,
+        "time_spent_seconds": time_spent_seconds,
+        "submitted_at": submitted_at.isoformat(),
+        "timestamp": submitted_at,
         "detailed_results": score_data["details"],
-        "answers": [answer.dict() for answer in submission.answers],
-        "link_id": link_id  # Track which link was used
+        "answers": answers,
+        "link_id": link_id,  # Track which link was used
+        "shuffled": shuffled,
+        "quiz_version": quiz.version  # Answer key the score was computed against
     }
 
-    # Save individual submission to MongoDB
-    if db is not None:
-        try:
-            result = db.exam_submissions.insert_one(submission_doc)
-            print(f"✅ Saved individual submission to MongoDB:")
-            print(f"   📝 Submission ID: {result.inserted_id}")
-            print(f"   👤 Student: {submission.name}")
-            print(f"   📚 Quiz: '{link_data['quiz_id']}'")
-            print(f"   📊 Score: {submission_doc['score']}%")
-        except Exception as e:
-            print(f"❌ Error saving submission to MongoDB: {e}")
+def link_submission_recorded(quiz: CompiledQuiz, sheet, submission_doc: Dict, score_data: Dict):
+    """In-process bookkeeping once a link submission is committed"""
+    time_sketches.record(submission_doc["admin_email"], quiz, sheet.times, submission_doc["time_spent_seconds"])
+    bump_submission_count(submission_doc["admin_email"], submission_doc["quiz_json_name"])
     
-    # Update link tracking (in-memory)
-    quiz_links_storage[link_id]["current_count"] += 1
-    quiz_links_storage[link_id]["students"].append({
-        "id": student_id,
-        "name": submission.name,
-        "class": submission.class_name,
-        "section": submission.section,
-        "submitted_at": datetime.utcnow().isoformat()
-    })
+    # Also keep in the recent results store for the teacher panel
+    student_results.append(
+        quiz, sheet,
+        student_name=submission_doc["student_name"],
+        student_email=submission_doc["student_email"],
+        score=submission_doc["score"],
+        correct=score_data["correct"],
+        answered=score_data["correct"] + score_data["wrong"],
+        time_spent_seconds=submission_doc["time_spent_seconds"],
+        submitted_at=submission_doc["submitted_at"],
+        extra={"link_id": submission_doc["link_id"], "class_name": submission_doc["class_name"], "section": submission_doc["section"]}
+    )
     
-    # Also save to DATA folder for backward compatibility
-    student_result = {
-        "link_id": link_id,
-        "quiz_id": link_data["quiz_id"],
-        "name": submission.name,
-        "class_name": submission.class_name,
-        "section": submission.section,
-        "score": score_data["correct"],
-        "wrong": score_data["wrong"],
-        "unanswered": score_data["unanswered"],
-        "total_questions": score_data["total"],
-        "answered_questions": score_data["correct"] + score_data["wrong"],
-        "percentage": score_data["percentage"],
-        "answers": [a.dict() for a in submission.answers],
-        "time_spent": submission.totalTimeSpent,
-        "submitted_at": datetime.utcnow().isoformat()
-    }
+    # Push to live dashboards (never blocks on slow subscribers)
+    publish_submission_event(submission_doc, submission_doc["link_id"])
+
+@app.post("/api/quiz/{link_id}/submit")
+def submit_quiz_by_link(link_id: str, submission: LinkQuizSubmission):
+    # Check if link exists
+    link_data = get_link(link_id)
+    if link_data is None:
+        raise HTTPException(status_code=404, detail="Quiz link not found")
     
-    results_file = DATA_DIR / "student_results.json"
-    existing_results = []
+    # Check if student already submitted (prevent duplicates)
+    student_id = link_student_id(submission.name, submission.class_name, submission.section)
+    if student_id in [s["id"] for s in link_data["students"]]:
+        raise HTTPException(status_code=409, detail="Student has already submitted this quiz")
     
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    # Check if max students reached - on timed links the slot was reserved when the attempt started
+    timed = is_timed(link_data)
+    if not timed and open_slots(link_data) <= 0:
+        raise limit_reached(link_data)
+    
+    # Load quiz for scoring
+    quiz = load_quiz(link_data["quiz_id"])
     
-    if results_file.exists():
-        with open(results_file, "r", encoding="utf-8") as f:
-            existing_results = json.load(f)
+    # Calculate score with proper validation, in quiz order whatever order the student saw
+    permutation = student_permutation(link_id, link_data, quiz, student_id, submission.shuffled)
+    sheet, answers = read_answers(quiz, submission.answers, submission.packed, permutation)
+    score_data = calculate_score(answers, quiz, sheet)
+    now = datetime.utcnow()
+    time_spent = submission.totalTimeSpent
+    time_spent_seconds = parse_duration(time_spent)
     
-    existing_results.append(student_result)
+    # On timed links the clock is the server's: the attempt is closed here and its elapsed time used
+    attempt = close_attempt(link_id, link_data, student_id) if timed else None
+    if attempt is not None:
+        time_spent_seconds = attempt_seconds(attempt, now)
+        time_spent = format_duration(time_spent_seconds)
+    
+    # Create individual submission document for new MongoDB structure
+    submission_doc = link_submission_doc(link_id, link_data, quiz, submission.name, submission.class_name, submission.section,
+                                         score_data, answers, time_spent, time_spent_seconds, permutation is not None, now)
+    student = {
+        "id": student_id,
+        "name": submission.name,
+        "class": submission.class_name,
+        "section": submission.section,
+        "submitted_at": now.isoformat()
+    }
+
+    if attempt is not None:
+        # Consumes the slot reserved when the attempt started; the closed attempt rules out a second submit
+        record_link_students(link_id, [student], [submission_doc["score"]])
+        link_data = get_link(link_id)
+    else:
+        # Update link tracking - the checks above are repeated atomically, so two
+        # concurrent submits cannot both take the last slot or duplicate a student
+        claimed, link_data = claim_link_slot(link_id, student, submission_doc["score"])
+        if not claimed:
+            if student_id in [s["id"] for s in link_data["students"]]:
+                raise HTTPException(status_code=409, detail="Student has already submitted this quiz")
+            raise limit_reached(link_data)
     
-    with open(results_file, "w", encoding="utf-8") as f:
-        json.dump(existing_results, f, indent=2, ensure_ascii=False)
+    # Commit locally; the outbox delivers it to storage (and its class rollup) in the background
+    # The slot is already claimed, so a failing outbox falls back to a direct write rather than a 500
+    try:
+        submission_id = submission_outbox.put(submission_doc)
+        logger.debug("Queued submission %s", submission_id)
+    except Exception:
+        logger.exception("Error committing submission for %s to the outbox, writing directly", submission.name)
+        try:
+            submission_doc.pop("_id", None)
+            storage.insert_submission(submission_doc)
+            submission_delivered(submission_doc)
+        except Exception:
+            logger.exception("Error saving submission for %s", submission.name)
+    try:
+        link_submission_recorded(quiz, sheet, submission_doc, score_data)
+    except Exception:
+        logger.exception("Post-submit bookkeeping failed for %s", submission.name)
     
     current_count = link_data["current_count"]
     max_allowed = link_data["max_allowed"]
     
-    print(f"✅ Student {submission.name} ({submission.class_name} {submission.section}) submitted quiz - {current_count}/{max_allowed} students used")
+    logger.info("Student %s (%s %s) submitted link %s - %d/%d students used",
+                submission.name, submission.class_name, submission.section, link_id, current_count, max_allowed, extra={
+                    "quiz": link_data["quiz_id"], "correct": score_data["correct"], "wrong": score_data["wrong"],
+                    "unanswered": score_data["unanswered"], "score": submission_doc["score"]
+                })
     
     return {
         "message": "✅ Quiz submitted successfully",
@@ -791,73 +1347,157 @@ def submit_quiz_by_link(link_id: str, submission: LinkQuizSubmission):
             "percentage": score_data["percentage"]
         },
         "detailed_results": score_data["details"],
-        "remaining_slots": max_allowed - current_count
+        "remaining_slots": open_slots(link_data)
     }
 
-@app.get("/teacher/results")
-def get_all_results():
-    # Load fresh data from DATA folder to show all results
-    all_results = []
-    
-    # Load regular quiz results from in-memory
-    all_results.extend(student_results)
-    
-    # Load link-based quiz results from DATA folder
-    data_results_file = DATA_DIR / "student_results.json"
-    if data_results_file.exists():
+def finalize_attempts(attempt_ids: List[str]):
+    """Timer wheel batch: auto-submit the attempts among attempt_ids that are still open"""
+    if storage is None:
+        return
+    claimed = storage.claim_attempts(attempt_ids, "finalizing")
+    if claimed:
+        submit_attempts(claimed)
+
+def submit_attempts(attempts: List[Dict]):
+    """
+    Score claimed attempts from their last saved answers and submit them as one batch:
+    one outbox transaction for the submissions and one write per link for its students.
+    Submission ids derive from the attempt, so re-running a batch interrupted by a crash
+    (attempts left "finalizing") stores nothing twice. An attempt that cannot be scored is
+    marked "failed" without holding up the rest; the sweep retries both.
+    """
+    batch, students, scores, failed = [], defaultdict(list), defaultdict(list), []
+    for attempt in attempts:
+        link_id = attempt["link_id"]
         try:
-            with open(data_results_file, "r", encoding="utf-8") as f:
-                link_results = json.load(f)
-                print(f"✅ Loaded {len(link_results)} results from DATA folder")
-                all_results.extend(link_results)
-        except Exception as e:
-            print(f"⚠️ Error loading DATA folder results: {e}")
+            link_data = get_link(link_id)
+            if link_data is None:
+                raise LookupError(f"link {link_id} not found")
+            quiz = load_quiz(link_data["quiz_id"])
+            progress = attempt.get("progress") or {}
+            sheet = align_answers(quiz, progress.get("answers", []))
+            answers = sheet_answers(quiz, sheet)
+            score_data = calculate_score(answers, quiz, sheet)
+            submitted_at = attempt["deadline"]
+            time_spent_seconds = attempt_seconds(attempt, submitted_at)
+            doc = link_submission_doc(link_id, link_data, quiz, attempt["name"], attempt["class_name"], attempt["section"],
+                                      score_data, answers, format_duration(time_spent_seconds), time_spent_seconds,
+                                      bool(progress.get("shuffled")), submitted_at)
+        except Exception:
+            logger.exception("Could not score attempt %s at its deadline, marked failed", attempt["_id"])
+            failed.append(attempt["_id"])
+            continue
+        doc["_id"] = str(ObjectId(hashlib.sha1(attempt["_id"].encode("utf-8")).digest()[:12]))
+        doc["auto_submitted"] = True
+        batch.append((attempt["_id"], quiz, sheet, doc, score_data))
+        students[link_id].append({
+            "id": attempt["student_id"],
+            "name": attempt["name"],
+            "class": attempt["class_name"],
+            "section": attempt["section"],
+            "submitted_at": submitted_at.isoformat()
+        })
+        scores[link_id].append(doc["score"])
+    
+    if failed:
+        storage.set_attempts_status(failed, "failed")
+    if not batch:
+        return
+    submission_outbox.put_many([doc for _, _, _, doc, _ in batch])
+    for link_id, entries in students.items():
+        record_link_students(link_id, entries, scores[link_id])
+    storage.set_attempts_status([attempt_id for attempt_id, _, _, _, _ in batch], "finalized")
+    for _, quiz, sheet, doc, score_data in batch:
+        link_submission_recorded(quiz, sheet, doc, score_data)
+    logger.info("Auto-submitted %d attempts at their deadline across %d links", len(batch), len(students))
+
+# Attempt deadlines: one wheel per worker, firing every attempt due in the same second as one batch
+exam_timers = TimerWheel(finalize_attempts)
+
+@app.on_event("startup")
+def start_exam_timers():
+    if storage is None:
+        return
+    try:
+        retry_stuck_attempts()
+        for attempt in storage.find_attempts("open"):
+            if attempt.get("deadline"):
+                exam_timers.schedule(attempt["_id"], deadline_timestamp(attempt))
+    except Exception:
+        logger.exception("Could not load open exam attempts")
+    exam_timers.start()
+
+def finalize_overdue_attempts():
+    overdue = storage.find_attempts("open", due_before=datetime.utcnow() - timedelta(seconds=DEADLINE_GRACE_SECONDS), limit=1000)
+    if overdue:
+        finalize_attempts([attempt["_id"] for attempt in overdue])
+    retry_stuck_attempts()
+
+def retry_stuck_attempts():
+    """
+    Claim again attempts left "finalizing" by a batch that died part way, or "failed" to score,
+    once they have sat for ATTEMPT_RETRY_SECONDS; the claim is conditional on that age, so only
+    one worker takes each, and a batch still running elsewhere is left alone
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=ATTEMPT_RETRY_SECONDS)
+    for status in ("finalizing", "failed"):
+        stuck = storage.find_attempts(status, claimed_before=cutoff, limit=1000)
+        claimed = storage.claim_attempts([attempt["_id"] for attempt in stuck], "finalizing", current=status,
+                                         claimed_before=cutoff) if stuck else []
+        if claimed:
+            logger.warning("Retrying %d exam attempts left %s", len(claimed), status)
+            submit_attempts(claimed)
+
+async def sweep_overdue_attempts():
+    while True:
+        await asyncio.sleep(ATTEMPT_SWEEP_SECONDS)
+        if storage is not None:
+            try:
+                await run_in_threadpool(finalize_overdue_attempts)
+            except Exception:
+                logger.exception("Sweeping overdue exam attempts failed")
+
+@app.on_event("startup")
+async def start_attempt_sweeper():
+    asyncio.create_task(sweep_overdue_attempts())
+
+@app.on_event("shutdown")
+def stop_exam_timers():
+    # Attempts still open are rescheduled from storage on the next start
+    exam_timers.stop()
+
+@app.get("/teacher/results")
+def get_all_results(limit: Optional[int] = None):
+    """Recent results from this run, oldest first; limit returns only the most recent ones"""
+    results = student_results.results(quiz_repository.load, limit)
     
     return {
-        "results": all_results,
-        "totalStudents": len(all_results),
+        "results": results,
+        "totalStudents": len(student_results),
         "summary": {
-            "averageScore": round(
-                sum(getattr(r, 'score', r.get('score', 0) if isinstance(r, dict) else 0) for r in all_results) / len(all_results), 2
-            ) if all_results else 0
+            "averageScore": student_results.average_score()
         }
     }
 
 # New Exam Management API Endpoints
 
 @app.get("/admin/exams")
-def get_admin_exams(admin_email: str = Header(..., alias="X-Admin-Email"), page: int = 1, limit: int = 20):
-    """Get all quiz submissions grouped by quiz name for fast loading"""
-    if db is None:
+def get_admin_exams(admin_email: str = Header(..., alias="X-Admin-Email"), page: int = 1, limit: int = 20, cursor: Optional[str] = None):
+    """
+    Get all quiz submissions grouped by quiz name for fast loading.
+    Pass the returned next_cursor to fetch the following page; page is kept for older clients.
+    """
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database connection not available")
     
     try:
-        # Aggregate submissions by quiz_json_name for fast overview - filter by admin
-        pipeline = [
-            {
-                "$match": {"admin_email": admin_email}  # Only show this admin's submissions
-            },
-            {
-                "$group": {
-                    "_id": "$quiz_json_name",
-                    "total_submissions": {"$sum": 1},
-                    "latest_submission": {"$max": "$timestamp"},
-                    "average_score": {"$avg": "$score"},
-                    "first_submission": {"$min": "$timestamp"}
-                }
-            },
-            {
-                "$sort": {"latest_submission": -1}
-            },
-            {
-                "$skip": (page - 1) * limit
-            },
-            {
-                "$limit": limit
-            }
-        ]
-        
-        quiz_groups = list(db.exam_submissions.aggregate(pipeline))
+        # Per-quiz aggregates of this admin's submissions, newest first
+        after = decode_cursor(cursor) if cursor else None
+        # Fetch one extra row to know whether another page exists
+        quiz_groups, total_count = storage.quiz_groups(admin_email, limit + 1, after=after, skip=(page - 1) * limit if page > 1 else 0)
+        has_more = len(quiz_groups) > limit
+        quiz_groups = quiz_groups[:limit]
+        next_cursor = encode_cursor(quiz_groups[-1]["latest_submission"], quiz_groups[-1]["quiz_name"]) if has_more else None
         
         # Import timezone for IST conversion
         from datetime import timezone, timedelta
@@ -878,161 +1518,438 @@ def get_admin_exams(admin_email: str = Header(..., alias="X-Admin-Email"), page:
                 first_ist = first_utc.replace(tzinfo=timezone.utc).astimezone(ist).strftime("%d/%m/%Y, %I:%M:%S %p")
             
             exam_list.append({
-                "quiz_name": group["_id"],
+                "quiz_name": group["quiz_name"],
                 "total_submissions": group["total_submissions"],
                 "latest_submission": latest_ist,
                 "first_submission": first_ist,
                 "average_score": round(group["average_score"], 2) if group["average_score"] else 0
             })
         
-        # Get total count for pagination
-        total_count = len(quiz_groups)
-        
-        print(f"📊 Found {total_count} quiz groups with submissions")
+        logger.debug("Found %d quiz groups with submissions", total_count)
         
         return {
             "exams": exam_list,
             "total_exams": total_count,
             "page": page,
             "limit": limit,
-            "total_pages": (total_count + limit - 1) // limit
+            "total_pages": (total_count + limit - 1) // limit,
+            "next_cursor": next_cursor,
+            "has_more": has_more
         }
         
-    except Exception as e:
-        print(f"❌ Error fetching admin exams: {e}")
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error fetching admin exams")
         raise HTTPException(status_code=500, detail="Failed to fetch exams")
 
+def exam_details_page(quiz_name: str, decoded_quiz_name: str, admin_email: str, page: int, limit: int,
+                      cursor: Optional[str], include_total: bool) -> Dict:
+    # Get submissions for this quiz with pagination - filter by admin
+    after = decode_cursor(cursor) if cursor else None
+    skip = (page - 1) * limit if not cursor and page > 1 else 0
+    # Position of the page's first row: carried in the cursor, since keyset pages have no page number
+    offset = cursor_offset(cursor) if cursor else skip
+    # Fetch one extra row to know whether another page exists
+    submissions = storage.list_submission_summaries(admin_email, decoded_quiz_name, limit + 1, after=after, skip=skip)
+    has_more = len(submissions) > limit
+    submissions = submissions[:limit]
+    next_cursor = encode_cursor(submissions[-1].get("timestamp"), submissions[-1]["_id"], offset + limit) if has_more else None
+
+    logger.debug("Found %d submissions for quiz %s (admin: %s)", len(submissions), decoded_quiz_name, admin_email)
+
+    if not submissions and not cursor:
+        # Also check what quiz names exist for this admin
+        existing_quizzes = storage.submission_quiz_names(admin_email)
+        logger.info("No submissions for quiz %s; available quizzes for admin %s: %s", decoded_quiz_name, admin_email, existing_quizzes)
+        raise HTTPException(status_code=404, detail=f"No submissions found for quiz: {decoded_quiz_name}")
+
+    # Get total count for pagination - cached per admin/quiz
+    total_count = cached_submission_count(admin_email, decoded_quiz_name) if include_total else None
+
+    # Import timezone for IST conversion
+    from datetime import timezone, timedelta
+    ist = timezone(timedelta(hours=5, minutes=30))
+
+    # Format student data for frontend
+    students = []
+    for i, submission in enumerate(submissions):
+        # Convert timestamp to IST
+        timestamp_ist = None
+        if submission.get("timestamp"):
+            timestamp_utc = submission["timestamp"]
+            timestamp_ist = timestamp_utc.replace(tzinfo=timezone.utc).astimezone(ist).strftime("%d/%m/%Y, %I:%M:%S %p")
+
+        students.append({
+            "index": offset + i,
+            "submission_id": str(submission["_id"]),
+            "student_name": submission.get("student_name", "Unknown"),
+            "student_email": submission.get("student_email", ""),
+            "score": submission.get("score", 0),
+            "percentage": submission.get("percentage", 0),
+            "time_spent": submission.get("time_spent", ""),
+            "time_spent_seconds": submission.get("time_spent_seconds"),
+            "submitted_at": submission.get("submitted_at", ""),
+            "timestamp": timestamp_ist,
+            "total_questions": submission.get("total_questions", 0),
+            "correct_answers": submission.get("correct_answers", 0),
+            "wrong_answers": submission.get("wrong_answers", 0),
+            "unanswered": submission.get("unanswered", 0)
+        })
+
+    # Calculate quiz statistics
+    avg_score = round(sum(s.get("score", 0) for s in submissions) / len(submissions), 2) if submissions else 0
+
+    return {
+        "quiz_info": {
+            "quiz_name": quiz_name,
+            "total_submissions": total_count,
+            "average_score": avg_score,
+            "page": page,
+            "limit": limit,
+            "total_pages": (total_count + limit - 1) // limit if total_count is not None else None,
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        },
+        "students": students
+    }
+
 @app.get("/admin/exam/{quiz_name}")
-def get_exam_details(quiz_name: str, admin_email: str = Header(..., alias="X-Admin-Email"), page: int = 1, limit: int = 50):
-    """Get all student submissions for a specific quiz with pagination"""
-    if db is None:
+def get_exam_details(
+    quiz_name: str,
+    admin_email: str = Header(..., alias="X-Admin-Email"),
+    page: int = 1,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True
+):
+    """
+    Get all student submissions for a specific quiz with keyset pagination.
+    Pages are keyed on (timestamp, _id) via next_cursor so deep pages cost the same as the first;
+    page is still honoured for older clients. The total is cached briefly and can be skipped.
+    Rendered pages are cached until a submission for this admin/quiz is stored.
+    """
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database connection not available")
     
+    # URL decode the quiz name to handle special characters
+    import urllib.parse
+    decoded_quiz_name = urllib.parse.unquote(quiz_name)
+    logger.debug("Looking for quiz '%s' (original: '%s')", decoded_quiz_name, quiz_name)
+    
     try:
-        # URL decode the quiz name to handle special characters
-        import urllib.parse
-        decoded_quiz_name = urllib.parse.unquote(quiz_name)
-        
-        print(f"🔍 Looking for quiz: '{decoded_quiz_name}' (original: '{quiz_name}')")
-        
-        # Get submissions for this quiz with pagination - filter by admin
-        query = {
-            "quiz_json_name": decoded_quiz_name,
-            "admin_email": admin_email  # Only show this admin's submissions
-        }
-        
-        submissions = list(db.exam_submissions.find(query).sort("timestamp", -1).skip((page - 1) * limit).limit(limit))
-        
-        print(f"📊 Found {len(submissions)} submissions for quiz: {decoded_quiz_name} (admin: {admin_email})")
-        
-        if not submissions:
-            # Also check what quiz names exist for this admin
-            existing_quizzes = list(db.exam_submissions.distinct("quiz_json_name", {"admin_email": admin_email}))
-            print(f"🗂️ Available quizzes for admin {admin_email}: {existing_quizzes}")
-            raise HTTPException(status_code=404, detail=f"No submissions found for quiz: {decoded_quiz_name}")
-        
-        # Get total count for pagination - filter by admin
-        total_count = db.exam_submissions.count_documents(query)
-        
-        # Import timezone for IST conversion
-        from datetime import timezone, timedelta
-        ist = timezone(timedelta(hours=5, minutes=30))
-        
-        # Format student data for frontend
-        students = []
-        for i, submission in enumerate(submissions):
-            # Convert timestamp to IST
-            timestamp_ist = None
-            if submission.get("timestamp"):
-                timestamp_utc = submission["timestamp"]
-                timestamp_ist = timestamp_utc.replace(tzinfo=timezone.utc).astimezone(ist).strftime("%d/%m/%Y, %I:%M:%S %p")
-            
-            students.append({
-                "index": (page - 1) * limit + i,
-                "submission_id": str(submission["_id"]),
-                "student_name": submission.get("student_name", "Unknown"),
-                "student_email": submission.get("student_email", ""),
-                "score": submission.get("score", 0),
-                "percentage": submission.get("percentage", 0),
-                "time_spent": submission.get("time_spent", ""),
-                "submitted_at": submission.get("submitted_at", ""),
-                "timestamp": timestamp_ist,
-                "total_questions": submission.get("total_questions", 0),
-                "correct_answers": submission.get("correct_answers", 0),
-                "wrong_answers": submission.get("wrong_answers", 0),
-                "unanswered": submission.get("unanswered", 0)
-            })
-        
-        # Calculate quiz statistics
-        avg_score = round(sum(s.get("score", 0) for s in submissions) / len(submissions), 2) if submissions else 0
-        
-        return {
-            "quiz_info": {
-                "quiz_name": quiz_name,
-                "total_submissions": total_count,
-                "average_score": avg_score,
-                "page": page,
-                "limit": limit,
-                "total_pages": (total_count + limit - 1) // limit
-            },
-            "students": students
-        }
-        
+        return response_cache.get_or_load(
+            ("exam", admin_email, decoded_quiz_name, quiz_name, page, limit, cursor, include_total),
+            lambda: ((admin_email, decoded_quiz_name),
+                     exam_details_page(quiz_name, decoded_quiz_name, admin_email, page, limit, cursor, include_total))
+        )
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"❌ Error fetching quiz details: {e}")
+    except Exception:
+        logger.exception("Error fetching quiz details")
         raise HTTPException(status_code=500, detail="Failed to fetch quiz details")
 
+def resolve_stream_admin(header_email: Optional[str], query_email: Optional[str]) -> str:
+    # EventSource cannot send custom headers, so the admin may come from the query string
+    admin_email = header_email or query_email
+    if not admin_email:
+        raise HTTPException(status_code=401, detail="Admin email required")
+    return admin_email
+
+async def sse_response(request: Request, sub, initial: Dict):
+    async def stream():
+        try:
+            yield format_sse(initial)
+            while not await request.is_disconnected():
+                event = await sub.get(SSE_HEARTBEAT_SECONDS)
+                yield format_sse(event) if event else ": keep-alive\n\n"
+        finally:
+            event_bus.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/admin/events")
+async def stream_admin_events(
+    request: Request,
+    admin_email: Optional[str] = Header(None, alias="X-Admin-Email"),
+    email: Optional[str] = None
+):
+    """Server-sent events for every submission to this admin's quizzes"""
+    admin_email = resolve_stream_admin(admin_email, email)
+    sub = event_bus.subscribe(admin_topic(admin_email))
+    snapshot = {
+        "type": "snapshot",
+        "links": [link_stats(link_id) for link_id, link in list(quiz_links_storage.items()) if link["admin_email"] == admin_email]
+    }
+    return await sse_response(request, sub, snapshot)
+
+@app.get("/admin/link/{link_id}/events")
+async def stream_link_events(
+    link_id: str,
+    request: Request,
+    admin_email: Optional[str] = Header(None, alias="X-Admin-Email"),
+    email: Optional[str] = None
+):
+    """Server-sent events for submissions on a single quiz link"""
+    admin_email = resolve_stream_admin(admin_email, email)
+    link_data = get_link(link_id)
+    if not link_data or link_data["admin_email"] != admin_email:
+        raise HTTPException(status_code=404, detail="Quiz link not found")
+    
+    sub = event_bus.subscribe(link_topic(link_id))
+    return await sse_response(request, sub, {"type": "snapshot", "links": [link_stats(link_id)]})
+
+# Answer-similarity (collusion) checks per quiz link
+def get_admin_link(link_id: str, admin_email: str) -> Dict:
+    link_data = get_link(link_id)
+    if not link_data or link_data["admin_email"] != admin_email:
+        raise HTTPException(status_code=404, detail="Quiz link not found")
+    return link_data
+
+@app.post("/admin/link/{link_id}/collusion")
+def start_collusion_check(
+    link_id: str,
+    background_tasks: BackgroundTasks,
+    admin_email: str = Header(..., alias="X-Admin-Email"),
+    alpha: float = collusion.DEFAULT_ALPHA
+):
+    """Analyse the link's submissions for suspiciously similar wrong answers in the background"""
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    if not 0 < alpha < 1:
+        raise HTTPException(status_code=400, detail="alpha must be between 0 and 1")
+
+    link_data = get_admin_link(link_id, admin_email)
+    quiz = load_quiz(link_data["quiz_id"])
+    background_tasks.add_task(collusion.run_detection, storage, link_data, quiz, alpha)
+    logger.info("Collusion check queued for link %s (%d submissions)", link_id, link_data["current_count"])
+    return {"message": "✅ Collusion check started", "link_id": link_id, "status": "running"}
+
+@app.get("/admin/link/{link_id}/collusion")
+def get_collusion_report(link_id: str, admin_email: str = Header(..., alias="X-Admin-Email")):
+    """Latest collusion report for a link: flagged pairs with their shared wrong answers and p-values"""
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+
+    get_admin_link(link_id, admin_email)
+    report = storage.get_collusion_report(link_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="No collusion check has been run for this link")
+    return report
+
+def submission_details(submission_id: str, admin_email: str):
+    """(cache tag, response) for one stored submission"""
+    from datetime import timezone, timedelta
+    ist = timezone(timedelta(hours=5, minutes=30))
+
+    # Get individual submission by ID, falling back to the archive for old ones
+    submission = storage.get_submission(submission_id)
+    archived = submission is None
+    if archived:
+        submission = submission_archive.get(submission_id, admin_email)
+
+    if not submission:
+        raise HTTPException(status_code=404, detail="Submission not found")
+
+    # Convert timestamp to IST for submission details
+    timestamp_ist = None
+    if submission.get("timestamp"):
+        timestamp_utc = submission["timestamp"]
+        timestamp_ist = timestamp_utc.replace(tzinfo=timezone.utc).astimezone(ist).strftime("%d/%m/%Y, %I:%M:%S %p")
+
+    # Return detailed submission data, tagged for cache invalidation
+    return (submission.get("admin_email", ""), submission.get("quiz_json_name", "")), {
+        "student_info": {
+            "submission_id": str(submission["_id"]),
+            "student_name": submission.get("student_name", "Unknown"),
+            "student_email": submission.get("student_email", ""),
+            "quiz_name": submission.get("quiz_json_name", ""),
+            "submitted_at": submission.get("submitted_at", ""),
+            "timestamp": timestamp_ist,
+            "time_spent": submission.get("time_spent", "")
+        },
+        "score_summary": {
+            "score": submission.get("score", 0),
+            "percentage": submission.get("percentage", 0),
+            "total_questions": submission.get("total_questions", 0),
+            "correct_answers": submission.get("correct_answers", 0),
+            "wrong_answers": submission.get("wrong_answers", 0),
+            "unanswered": submission.get("unanswered", 0)
+        },
+        "detailed_results": submission.get("detailed_results", []),
+        "student_answers": submission.get("answers", []),
+        "archived": archived
+    }
+
 @app.get("/admin/submission/{submission_id}")
 def get_student_detailed_answers(submission_id: str, admin_email: str = Header(..., alias="X-Admin-Email")):
     """Get detailed question-by-question answers for a specific student submission"""
-    if db is None:
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database connection not available")
     
     try:
-        from bson import ObjectId
-        from datetime import timezone, timedelta
-        ist = timezone(timedelta(hours=5, minutes=30))
-        
-        # Get individual submission by ID
-        submission = db.exam_submissions.find_one({"_id": ObjectId(submission_id)})
-        
-        if not submission:
-            raise HTTPException(status_code=404, detail="Submission not found")
-        
-        # Convert timestamp to IST for submission details
-        timestamp_ist = None
-        if submission.get("timestamp"):
-            timestamp_utc = submission["timestamp"]
-            timestamp_ist = timestamp_utc.replace(tzinfo=timezone.utc).astimezone(ist).strftime("%d/%m/%Y, %I:%M:%S %p")
-        
-        # Return detailed submission data
+        return response_cache.get_or_load(("submission", admin_email, submission_id), lambda: submission_details(submission_id, admin_email))
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error fetching student details")
+        raise HTTPException(status_code=500, detail="Failed to fetch student details")
+
+def rescore_completed(admin_email: str, quiz_name: str):
+    rollups.rebuild_rollups(storage, admin_email, quiz_name)
+    response_cache.invalidate(admin_email, quiz_name)
+
+@app.post("/admin/rescore/{quiz_name}")
+def rescore_quiz(quiz_name: str, background_tasks: BackgroundTasks, admin_email: str = Header(..., alias="X-Admin-Email")):
+    """
+    Rescore this admin's stored submissions against the quiz's current answer key.
+    Re-posting resumes an unfinished job from its last checkpoint.
+    """
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    
+    import urllib.parse
+    quiz = load_quiz(urllib.parse.unquote(quiz_name))
+    
+    try:
+        job = rescore.start_or_resume_job(storage, admin_email, quiz)
+    except Exception:
+        logger.exception("Error starting rescore job")
+        raise HTTPException(status_code=500, detail="Failed to start rescore job")
+    
+    background_tasks.add_task(rescore.run_rescore_job, storage, job["_id"], quiz, RESCORE_BATCH_SIZE,
+                              on_complete=lambda: rescore_completed(admin_email, quiz.name))
+    logger.info("Rescore job %s queued for '%s' (%d submissions)", job["_id"], quiz.name, job["total"])
+    
+    return rescore.public_job(job)
+
+@app.get("/admin/rescore/{job_id}")
+def get_rescore_job(job_id: str, admin_email: str = Header(..., alias="X-Admin-Email")):
+    """Progress of a rescore job"""
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    
+    job = rescore.get_job(storage, job_id, admin_email)
+    if not job:
+        raise HTTPException(status_code=404, detail="Rescore job not found")
+    return rescore.public_job(job)
+
+@app.get("/admin/rollups")
+def get_class_rollups(
+    admin_email: str = Header(..., alias="X-Admin-Email"),
+    quiz_name: Optional[str] = None,
+    class_name: Optional[str] = None
+):
+    """Score averages, spread and histogram per class/section for link submissions"""
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    
+    try:
+        results = rollups.query_rollups(storage, admin_email, quiz_name, class_name)
+        return {"rollups": results, "count": len(results)}
+    except Exception:
+        logger.exception("Error fetching class rollups")
+        raise HTTPException(status_code=500, detail="Failed to fetch class rollups")
+
+@app.post("/admin/rollups/rebuild")
+def rebuild_class_rollups(admin_email: str = Header(..., alias="X-Admin-Email"), quiz_name: Optional[str] = None):
+    """Recompute this admin's class/section rollups from the stored submissions"""
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    
+    try:
+        rebuilt = rollups.rebuild_rollups(storage, admin_email, quiz_name)
+        logger.info("Rebuilt %d class rollups for %s", rebuilt, admin_email)
+        return {"message": "✅ Rollups rebuilt", "rollups": rebuilt}
+    except Exception:
+        logger.exception("Error rebuilding class rollups")
+        raise HTTPException(status_code=500, detail="Failed to rebuild class rollups")
+
+@app.get("/admin/analytics/time/{quiz_name}")
+def get_time_analytics(quiz_name: str, admin_email: str = Header(..., alias="X-Admin-Email"), quiz_version: Optional[str] = None):
+    """
+    Median and p90 time spent per question and for the whole quiz, from streaming
+    sketches of this admin's submissions. Defaults to the quiz's current version.
+    """
+    quiz = quiz_repository.load(quiz_name)
+    if quiz_version is None:
+        if quiz is None:
+            raise HTTPException(status_code=404, detail=f"Quiz '{quiz_name}' not found")
+        quiz_version = quiz.version
+    elif quiz is not None and quiz.version != quiz_version:
+        # Older version: question order comes from the sketches themselves
+        quiz = None
+
+    try:
+        sketch = time_sketches.merged(storage, admin_email, quiz_name, quiz_version)
         return {
-            "student_info": {
-                "submission_id": str(submission["_id"]),
-                "student_name": submission.get("student_name", "Unknown"),
-                "student_email": submission.get("student_email", ""),
-                "quiz_name": submission.get("quiz_json_name", ""),
-                "submitted_at": submission.get("submitted_at", ""),
-                "timestamp": timestamp_ist,
-                "time_spent": submission.get("time_spent", "")
-            },
-            "score_summary": {
-                "score": submission.get("score", 0),
-                "percentage": submission.get("percentage", 0),
-                "total_questions": submission.get("total_questions", 0),
-                "correct_answers": submission.get("correct_answers", 0),
-                "wrong_answers": submission.get("wrong_answers", 0),
-                "unanswered": submission.get("unanswered", 0)
-            },
-            "detailed_results": submission.get("detailed_results", []),
-            "student_answers": submission.get("answers", [])
+            "quiz_name": quiz_name,
+            "quiz_version": quiz_version,
+            **time_report(sketch, quiz)
         }
-        
-    except Exception as e:
-        print(f"❌ Error fetching student details: {e}")
-        raise HTTPException(status_code=500, detail="Failed to fetch student details")
+    except Exception:
+        logger.exception("Error building time analytics for %s", quiz_name)
+        raise HTTPException(status_code=500, detail="Failed to build time analytics")
+
+@app.get("/admin/archive")
+def get_archive_overview(admin_email: str = Header(..., alias="X-Admin-Email"), quiz_name: Optional[str] = None):
+    """Archived submissions of this admin per quiz and month"""
+    partitions = submission_archive.partitions(admin_email, quiz_name)
+    return {"partitions": partitions, "total_submissions": sum(p["submissions"] for p in partitions)}
+
+@app.post("/admin/archive")
+def archive_submissions(admin_email: str = Header(..., alias="X-Admin-Email"), older_than_days: int = ARCHIVE_AFTER_DAYS):
+    """Archive this admin's submissions older than older_than_days now, instead of waiting for the schedule"""
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    if older_than_days < 1:
+        raise HTTPException(status_code=400, detail="older_than_days must be at least 1")
+    
+    try:
+        archived = submission_archive.archive(storage, datetime.utcnow() - timedelta(days=older_than_days), admin_email)
+        return {"message": "✅ Submissions archived", "archived": archived}
+    except Exception:
+        logger.exception("Error archiving submissions")
+        raise HTTPException(status_code=500, detail="Failed to archive submissions")
+
+@app.get("/admin/archive/{quiz_name}")
+def get_archived_submissions(
+    quiz_name: str,
+    admin_email: str = Header(..., alias="X-Admin-Email"),
+    month: Optional[str] = None,
+    page: int = 1,
+    limit: int = 50
+):
+    """Archived submission summaries for a quiz, newest first; details stay available at /admin/submission/{id}"""
+    import urllib.parse
+    decoded_quiz_name = urllib.parse.unquote(quiz_name)
+    limit = max(1, min(limit, 200))
+    submissions = submission_archive.list_summaries(admin_email, decoded_quiz_name, month, limit, (max(page, 1) - 1) * limit)
+    return {"quiz_name": decoded_quiz_name, "month": month, "page": page, "limit": limit, "submissions": submissions}
+
+@app.post("/admin/archive/{quiz_name}/restore")
+def restore_archived_submissions(quiz_name: str, admin_email: str = Header(..., alias="X-Admin-Email"), month: Optional[str] = None):
+    """
+    Move a quiz's archived submissions (or one YYYY-MM month of them) back into storage.
+    They are archived again on the next scheduled run if still past retention.
+    """
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    
+    import urllib.parse
+    decoded_quiz_name = urllib.parse.unquote(quiz_name)
+    try:
+        restored = submission_archive.restore(storage, admin_email, decoded_quiz_name, month)
+    except Exception:
+        logger.exception("Error restoring archived submissions")
+        raise HTTPException(status_code=500, detail="Failed to restore archived submissions")
+    if not restored:
+        raise HTTPException(status_code=404, detail="No archived submissions match")
+    return {"message": "✅ Submissions restored", "restored": restored}
 
 @app.get("/api/quiz-files")
 def get_quiz_files():
@@ -1048,10 +1965,67 @@ def get_quiz_files():
             "count": len(quiz_files)
         }
         
-    except Exception as e:
-        print(f"❌ Error fetching quiz files: {e}")
+    except Exception:
+        logger.exception("Error fetching quiz files")
         raise HTTPException(status_code=500, detail="Failed to fetch quiz files")
 
+@app.post("/admin/quiz-upload")
+def upload_quiz(
+    file: UploadFile = File(...),
+    quiz_name: Optional[str] = Form(None),
+    overwrite: bool = Form(False),
+    admin_email: str = Header(..., alias="X-Admin-Email")
+):
+    """
+    Validate an uploaded quiz bank and publish it to the quiz repository.
+    The file is parsed incrementally and every validation error is reported at once.
+    """
+    quiz_name = (quiz_name or Path(file.filename or "").stem).strip()
+    
+    if not overwrite and quiz_repository.find_path(quiz_name) is not None:
+        raise HTTPException(status_code=409, detail=f"Quiz '{quiz_name}' already exists")
+    
+    try:
+        questions = quiz_repository.compile_upload(quiz_name, file.file)
+    except QuizValidationError as e:
+        logger.warning("Rejected upload of '%s' by %s: %d error(s)", quiz_name, admin_email, len(e.errors))
+        raise HTTPException(status_code=422, detail={"message": "Quiz validation failed", "errors": e.errors})
+    
+    try:
+        compiled = quiz_repository.publish(quiz_name, questions)
+        question_index.index_quiz(compiled)
+    except Exception:
+        logger.exception("Error publishing quiz %s", quiz_name)
+        raise HTTPException(status_code=500, detail="Failed to publish quiz")
+    
+    logger.info("Published quiz '%s' (%d questions, version %s) by %s", quiz_name, len(compiled), compiled.version, admin_email)
+    
+    return {
+        "message": "✅ Quiz published",
+        "quiz_name": quiz_name,
+        "total_questions": len(compiled),
+        "version": compiled.version
+    }
+
+@app.get("/admin/questions/search")
+def search_questions(
+    q: str,
+    admin_email: str = Header(..., alias="X-Admin-Email"),
+    limit: int = 20,
+    quiz_name: Optional[str] = None
+):
+    """Search question and option text across every quiz file"""
+    start = time.perf_counter()
+    question_index.refresh()
+    results = question_index.search(q, limit=max(1, min(limit, 100)), quiz_name=quiz_name)
+    
+    return {
+        "query": q,
+        "results": results,
+        "count": len(results),
+        "took_ms": round((time.perf_counter() - start) * 1000, 2)
+    }
+
 @app.get("/api/quiz-data/{quiz_name}")
 def get_quiz_data(quiz_name: str):
     """Get quiz data for frontend quiz selection"""
@@ -1064,36 +2038,24 @@ def get_quiz_data(quiz_name: str):
         }
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"❌ Error loading quiz data for {quiz_name}: {e}")
+    except Exception:
+        logger.exception("Error loading quiz data for %s", quiz_name)
         raise HTTPException(status_code=500, detail=f"Failed to load quiz data for {quiz_name}")
 
 @app.get("/admin/debug/submissions")
 def debug_submissions(admin_email: str = Header(..., alias="X-Admin-Email")):
-    """Debug endpoint to see what's in the exam_submissions collection"""
-    if db is None:
+    """Debug endpoint to see what's in the submissions store"""
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database connection not available")
     
     try:
         # Get all quiz names and submission counts
-        pipeline = [
-            {
-                "$group": {
-                    "_id": "$quiz_json_name",
-                    "count": {"$sum": 1},
-                    "latest": {"$max": "$timestamp"}
-                }
-            },
-            {"$sort": {"latest": -1}}
-        ]
-        
-        quiz_groups = list(db.exam_submissions.aggregate(pipeline))
-        total_submissions = db.exam_submissions.count_documents({})
+        quiz_groups, total_submissions = storage.submission_overview()
         
         return {
             "total_submissions": total_submissions,
             "quiz_groups": quiz_groups,
-            "message": "Debug info for exam_submissions collection"
+            "message": f"Debug info for {storage.name} submissions"
         }
         
     except Exception as e:
@@ -1101,41 +2063,58 @@ def debug_submissions(admin_email: str = Header(..., alias="X-Admin-Email")):
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "message": "Quiz Buzz API is running"}
+    return {"status": "healthy", "message": "Quiz Buzz API is running", "logging": log_stats(), "outbox": submission_outbox.stats(), "response_cache": response_cache.stats(), "archive": submission_archive.stats(), "exam_timers": exam_timers.stats()}
 
 @app.get("/api")
 def api_root():
     return {"message": "Quiz Buzz API", "status": "running", "health": "/health"}
 
+@app.on_event("startup")
+def load_static_assets():
+    """Load the React build into memory with precompressed variants"""
+    loaded = static_assets.load()
+    if loaded:
+        stats = static_assets.stats()
+        logger.info("Loaded %d React build files into memory (%d KB, %d KB compressed)", loaded, stats["bytes"] // 1024, stats["compressed_bytes"] // 1024)
+    else:
+        logger.warning("React build directory not found: %s", static_build_dir)
+
+@app.on_event("shutdown")
+def stop_logging():
+    # Registered last so records from the other shutdown handlers are written too
+    shutdown_logging()
+
 # Serve React app root
 @app.get("/")
-def serve_root():
-    static_build_dir = Path("/app/static")
-    index_file = static_build_dir / "index.html"
-    if index_file.exists():
-        return FileResponse(str(index_file))
+def serve_root(request: Request):
+    index_asset = static_assets.get("index.html")
+    if index_asset:
+        return static_assets.respond(index_asset, request)
     else:
         return {"message": "Quiz Buzz API", "status": "running", "frontend": "not found"}
 
 # Serve React app for all non-API routes
 @app.get("/{path:path}")
 def serve_react_app(request: Request, path: str):
-    static_build_dir = Path("/app/static")
-    index_file = static_build_dir / "index.html"
-    
     # Skip API routes but allow quiz frontend routes  
     if path.startswith(("api/", "admin/", "teacher/", "images/", "quiz_data/", "docs", "openapi.json")):
         raise HTTPException(status_code=404, detail="API endpoint not found")
     
-    # If it's a static file request, try to serve it from root static directory
-    if path.endswith((".js", ".css", ".png", ".ico", ".json", ".svg", ".woff", ".woff2", ".ttf")) or path in ["favicon.ico", "manifest.json", "robots.txt"]:
+    # Built files (hashed bundles, favicon, manifest, ...) come straight from memory
+    asset = static_assets.get(path)
+    if asset:
+        return static_assets.respond(asset, request)
+    
+    # Files too large to keep in memory are still served from disk
+    if path.endswith((".js", ".css", ".png", ".ico", ".json", ".svg", ".woff", ".woff2", ".ttf")):
         file_path = static_build_dir / path
-        if file_path.exists():
+        if file_path.is_file() and static_build_dir.resolve() in file_path.resolve().parents:
             return FileResponse(str(file_path))
     
     # For all other routes (including React routes), serve index.html
-    if index_file.exists():
-        return FileResponse(str(index_file))
+    index_asset = static_assets.get("index.html")
+    if index_asset:
+        return static_assets.respond(index_asset, request)
     else:
         raise HTTPException(status_code=404, detail="React app not found")
 
@@ -0,0 +1,200 @@
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from bson import ObjectId
+
+from storage import dump_document, load_document
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    submission_key TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    sent INTEGER NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL
+);
+"""
+# Columns added after the first schema version, migrated in place on open
+COLUMN_TYPES = {"sent": "INTEGER NOT NULL DEFAULT 0"}
+
+IDLE_POLL_SECONDS = 5.0
+
+
+class SubmissionOutbox:
+    """
+    Durable local queue between scoring and storage. A submit commits the
+    scored document to a local SQLite file (synchronous=FULL, so it survives
+    a crash once put() returns) and a background thread delivers it.
+
+    The submission key is the document's _id, assigned here, so delivery is
+    idempotent: a batch replayed after a crash or a timeout that actually
+    succeeded is skipped by the storage's unique id. on_delivered runs for
+    the delivery that inserted a submission, and each row is cleared as soon
+    as its hook has run. A row that was sent before and comes back as a
+    duplicate may be this outbox's own write from a delivery cut short
+    before its hook, so the hook runs for it too; a duplicate on a row's
+    first send was stored by someone else and is only cleared.
+    """
+
+    def __init__(self, path: str, on_delivered: Optional[Callable[[Dict], None]] = None,
+                 batch_size: int = 100, max_backoff: float = 30.0):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.on_delivered = on_delivered
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._failing_since: Optional[float] = None
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(outbox)")}
+        for column, column_type in COLUMN_TYPES.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE outbox ADD COLUMN {column} {column_type}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def put(self, doc: Dict) -> str:
+        """Commit a scored submission locally; returns its submission key (the future _id)"""
+        doc.setdefault("_id", str(ObjectId()))
+        key = str(doc["_id"])
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO outbox (submission_key, created_at, doc) VALUES (?, ?, ?)",
+                (key, datetime.utcnow().isoformat(), dump_document(doc))
+            )
+        self._wake.set()
+        return key
+
+    def put_many(self, docs: List[Dict]) -> List[str]:
+        """put() for a batch in one transaction; keys already queued are skipped, so a retried batch is harmless"""
+        for doc in docs:
+            doc.setdefault("_id", str(ObjectId()))
+        created_at = datetime.utcnow().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO outbox (submission_key, created_at, doc) VALUES (?, ?, ?)",
+                [(str(doc["_id"]), created_at, dump_document(doc)) for doc in docs]
+            )
+        self._wake.set()
+        return [str(doc["_id"]) for doc in docs]
+
+    def stats(self) -> Dict:
+        row = self.conn.execute("SELECT COUNT(*), MIN(created_at), MAX(attempts) FROM outbox").fetchone()
+        return {
+            "pending": row[0],
+            "oldest": row[1],
+            "max_attempts": row[2] or 0,
+            "failing_for_seconds": round(time.monotonic() - self._failing_since, 1) if self._failing_since else 0
+        }
+
+    def replay_once(self, storage) -> int:
+        """Deliver up to batch_size pending submissions; returns how many were cleared"""
+        rows = self.conn.execute(
+            "SELECT seq, sent, doc FROM outbox ORDER BY seq LIMIT ?", (self.batch_size,)
+        ).fetchall()
+        if not rows:
+            return 0
+        docs = [load_document(doc) for _, _, doc in rows]
+        seqs = [(seq,) for seq, _, _ in rows]
+        with self.conn:
+            self.conn.executemany("UPDATE outbox SET sent = 1 WHERE seq = ?", seqs)
+        try:
+            inserted = storage.deliver_submissions(docs)
+        except Exception as e:
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE seq = ?",
+                    [(str(e)[:500], seq) for (seq,) in seqs]
+                )
+            raise
+
+        skipped = []
+        for (seq, sent, _), doc, is_new in zip(rows, docs, inserted):
+            if not (is_new or sent) or self.on_delivered is None:
+                skipped.append((seq,))
+                continue
+            try:
+                self.on_delivered(doc)
+            except Exception:
+                logger.exception("Post-delivery hook failed for submission %s", doc["_id"])
+            # Cleared right after its hook, so a crash later in the batch does not run it again
+            with self.conn:
+                self.conn.execute("DELETE FROM outbox WHERE seq = ?", (seq,))
+        if skipped:
+            with self.conn:
+                self.conn.executemany("DELETE FROM outbox WHERE seq = ?", skipped)
+        return len(rows)
+
+    def drain(self, storage) -> int:
+        delivered = 0
+        while not self._stop.is_set():
+            count = self.replay_once(storage)
+            if not count:
+                break
+            delivered += count
+        return delivered
+
+    def start(self, storage):
+        """Start the replayer; anything left from a previous run is delivered first"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._wake.set()
+        self._thread = threading.Thread(target=self._run, args=(storage,), name="submission-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, storage):
+        backoff = 0.0
+        while not self._stop.is_set():
+            if backoff:
+                # New submits do not cut a backoff short; they are safe on disk meanwhile
+                self._stop.wait(backoff)
+            else:
+                self._wake.wait(IDLE_POLL_SECONDS)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                delivered = self.drain(storage)
+            except Exception as e:
+                backoff = min(max(backoff * 2, 1.0), self.max_backoff)
+                if self._failing_since is None:
+                    self._failing_since = time.monotonic()
+                    logger.warning("Submission delivery failing, keeping submissions in the outbox: %s", e)
+                continue
+            if self._failing_since is not None:
+                logger.info("Submission delivery recovered after %.0f s (%d delivered)",
+                            time.monotonic() - self._failing_since, delivered)
+                self._failing_since = None
+            backoff = 0.0
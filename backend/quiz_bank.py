@@ -0,0 +1,296 @@
+import codecs
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+OPTION_LETTERS = ["A", "B", "C", "D"]
+
+# Per-question answer codes used by the scoring engine: 0 means no answer,
+# 1-4 are options A-D and 5 an out-of-range selection. A question without
+# an answer key gets NO_KEY, which no answer code can match.
+NO_ANSWER = 0
+INVALID_ANSWER = 5
+NO_KEY = 255
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")
+QUIZ_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9 _.\-]{0,99}$")
+
+# A single question larger than this is treated as a malformed upload
+MAX_QUESTION_BYTES = 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class QuizValidationError(Exception):
+    """Raised with every problem found in an uploaded quiz, not just the first"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__(f"{len(errors)} validation error(s)")
+        self.errors = errors
+
+
+def answer_letter(correct_raw) -> Optional[str]:
+    """Normalise a correct_answer value (letter or 0-based index) to A-D"""
+    if isinstance(correct_raw, bool):
+        return None
+    if isinstance(correct_raw, int):
+        return OPTION_LETTERS[correct_raw] if 0 <= correct_raw < len(OPTION_LETTERS) else None
+    if isinstance(correct_raw, str) and correct_raw.strip().upper() in OPTION_LETTERS:
+        return correct_raw.strip().upper()
+    return None
+
+
+def is_image_reference(value) -> bool:
+    return isinstance(value, str) and value.lower().endswith(IMAGE_EXTENSIONS)
+
+
+class CompiledQuiz:
+    """
+    Serving form of a quiz: the question list plus the indexes the
+    scoring and serving paths need, built once per file version.
+    """
+
+    def __init__(self, name: str, questions: List[Dict], version: str, path: Optional[Path] = None):
+        if not isinstance(questions, list) or not all(isinstance(q, dict) for q in questions):
+            raise ValueError("Quiz file must be a JSON array of questions")
+        self.name = name
+        self.questions = questions
+        self.version = version
+        self.path = path
+        self.by_number = {q.get("questionNumber"): q for q in questions}
+        self.position = {q.get("questionNumber"): i for i, q in enumerate(questions)}
+        self.answer_key = [answer_letter(q.get("correct_answer")) for q in questions]
+        self.key_codes = bytes(
+            OPTION_LETTERS.index(letter) + 1 if letter else NO_KEY for letter in self.answer_key
+        )
+        self.option_counts = bytes(
+            min(len(options), len(OPTION_LETTERS)) if isinstance(options, list) else 0
+            for options in (q.get("option_with_images_") for q in questions)
+        )
+
+    def __len__(self):
+        return len(self.questions)
+
+
+def iter_json_array(stream: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator:
+    """
+    Incrementally parse a top-level JSON array from a binary stream, yielding
+    one element at a time. Only the not-yet-parsed tail of the text is held.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+    buf = ""
+    pos = 0
+    eof = False
+    state = "start"  # start -> value -> separator -> value ... -> end
+
+    def refill():
+        nonlocal buf, pos, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            buf = buf[pos:] + utf8.decode(b"", final=True)
+        else:
+            buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+
+    while True:
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                break
+            refill()
+            continue
+
+        if state == "start":
+            if buf[pos] != "[":
+                raise ValueError("Quiz file must be a JSON array of questions")
+            pos += 1
+            state = "first"
+        elif state in ("first", "value"):
+            if state == "first" and buf[pos] == "]":
+                pos += 1
+                state = "end"
+                continue
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"Invalid JSON: {e.msg}")
+                if len(buf) - pos > MAX_QUESTION_BYTES:
+                    raise ValueError("Question entry too large or malformed")
+                refill()
+                continue
+            if end == len(buf) and not eof and not isinstance(value, (dict, list, str)):
+                # A bare number may continue in the next chunk
+                refill()
+                continue
+            pos = end
+            state = "separator"
+            yield value
+        elif state == "separator":
+            if buf[pos] == ",":
+                state = "value"
+            elif buf[pos] == "]":
+                state = "end"
+            else:
+                raise ValueError("Expected ',' or ']' between questions")
+            pos += 1
+        else:
+            raise ValueError("Unexpected content after the question array")
+
+    if state != "end":
+        raise ValueError("Quiz file ended before the question array was closed")
+
+
+def validate_question(question, index: int, seen_numbers: Dict, image_dir: Optional[Path]) -> List[str]:
+    """Return every problem with a single question entry"""
+    label = f"Question #{index + 1}"
+    if not isinstance(question, dict):
+        return [f"{label}: must be an object"]
+
+    errors = []
+    number = question.get("questionNumber")
+    if isinstance(number, int) and not isinstance(number, bool):
+        label = f"Question {number}"
+        if number in seen_numbers:
+            errors.append(f"{label}: duplicate questionNumber (also entry #{seen_numbers[number] + 1})")
+        else:
+            seen_numbers[number] = index
+    else:
+        errors.append(f"{label}: questionNumber must be an integer")
+
+    text = question.get("questionText")
+    if not isinstance(text, str) or not text.strip():
+        errors.append(f"{label}: questionText is missing or empty")
+
+    options = question.get("option_with_images_")
+    if not isinstance(options, list) or not 2 <= len(options) <= len(OPTION_LETTERS):
+        errors.append(f"{label}: option_with_images_ must list 2 to {len(OPTION_LETTERS)} options")
+        options = []
+    elif not all(isinstance(o, str) and o.strip() for o in options):
+        errors.append(f"{label}: every option must be a non-empty string")
+
+    if "correct_answer" not in question or question["correct_answer"] is None:
+        errors.append(f"{label}: correct_answer is missing")
+    else:
+        letter = answer_letter(question["correct_answer"])
+        if letter is None:
+            errors.append(f"{label}: correct_answer must be A-D or an option index")
+        elif options and OPTION_LETTERS.index(letter) >= len(options):
+            errors.append(f"{label}: correct_answer {letter} has no matching option")
+
+    images = question.get("question_images", [])
+    if not isinstance(images, list) or not all(isinstance(i, str) for i in images):
+        errors.append(f"{label}: question_images must be a list of file names")
+        images = []
+
+    if image_dir is not None:
+        for ref in images + [o for o in options if is_image_reference(o)]:
+            # The quiz page resolves every image by file name inside the quiz's folder
+            if not (image_dir / Path(ref).name).is_file():
+                errors.append(f"{label}: image '{ref}' not found in {image_dir.name}/")
+
+    return errors
+
+
+class QuizRepository:
+    """
+    Loads quiz files from the search paths and caches their compiled form
+    until the file changes. Uploaded quizzes are published to the first path.
+    """
+
+    def __init__(self, search_dirs: List[Path], images_dir: Path):
+        self.search_dirs = search_dirs
+        self.images_dir = images_dir
+        self._lock = threading.Lock()
+        self._cache: Dict[str, tuple] = {}  # {quiz_name: (path, mtime_ns, CompiledQuiz)}
+
+    @property
+    def publish_dir(self) -> Path:
+        return self.search_dirs[0]
+
+    def find_path(self, quiz_name: str) -> Optional[Path]:
+        for directory in self.search_dirs:
+            path = directory / f"{quiz_name}.json"
+            if path.exists():
+                return path
+        return None
+
+    def load(self, quiz_name: str) -> Optional[CompiledQuiz]:
+        path = self.find_path(quiz_name)
+        if path is None:
+            return None
+
+        mtime = path.stat().st_mtime_ns
+        cached = self._cache.get(quiz_name)
+        if cached and cached[0] == path and cached[1] == mtime:
+            return cached[2]
+
+        raw = path.read_bytes()
+        compiled = CompiledQuiz(quiz_name, json.loads(raw), hashlib.sha1(raw).hexdigest()[:12], path)
+        with self._lock:
+            self._cache[quiz_name] = (path, mtime, compiled)
+        return compiled
+
+    def available(self) -> List[str]:
+        names = set()
+        for directory in self.search_dirs:
+            if directory.exists():
+                names.update(p.stem for p in directory.glob("*.json"))
+        return sorted(names)
+
+    def compile_upload(self, quiz_name: str, stream: BinaryIO) -> List[Dict]:
+        """Stream-parse and validate an upload, raising with all errors found"""
+        if not QUIZ_NAME_PATTERN.match(quiz_name):
+            raise QuizValidationError([f"Invalid quiz name '{quiz_name}'"])
+
+        image_dir = self.images_dir / quiz_name
+        errors: List[str] = []
+        seen_numbers: Dict = {}
+        questions = []
+        try:
+            for index, question in enumerate(iter_json_array(stream)):
+                errors.extend(validate_question(question, index, seen_numbers, image_dir))
+                questions.append(question)
+        except (ValueError, UnicodeDecodeError) as e:
+            errors.append(str(e))
+
+        if not questions and not errors:
+            errors.append("Quiz has no questions")
+        if errors:
+            raise QuizValidationError(errors)
+        return questions
+
+    def publish(self, quiz_name: str, questions: List[Dict]) -> CompiledQuiz:
+        """Atomically write a validated quiz into the repository and cache it"""
+        self.publish_dir.mkdir(parents=True, exist_ok=True)
+        target = self.publish_dir / f"{quiz_name}.json"
+        digest = hashlib.sha1()
+
+        fd, tmp_name = tempfile.mkstemp(dir=str(self.publish_dir), prefix=f".{quiz_name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                # Encode piecewise rather than building the whole document in memory
+                for piece in json.JSONEncoder(indent=2, ensure_ascii=False).iterencode(questions):
+                    data = piece.encode("utf-8")
+                    digest.update(data)
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates owner-only files; quiz files are served publicly
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, target)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+        compiled = CompiledQuiz(quiz_name, questions, digest.hexdigest()[:12], target)
+        with self._lock:
+            self._cache[quiz_name] = (target, target.stat().st_mtime_ns, compiled)
+        return compiled
@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from quiz_bank import CompiledQuiz
+from scoring import align_answers, tally_batch, build_details, percentage
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED_STATUSES = ["pending", "running", "failed"]
+
+# Jobs executing in this process, so a resume request cannot start a second runner
+_active_jobs = set()
+_active_lock = threading.Lock()
+
+
+def public_job(job: Dict) -> Dict:
+    """Job document as returned to admins, with derived progress figures"""
+    total = job.get("total") or 0
+    processed = job.get("processed", 0)
+    elapsed = job.get("elapsed_seconds", 0) or 0
+    rate = processed / elapsed if elapsed else 0
+    return {
+        "job_id": job["_id"],
+        "quiz_name": job["quiz_name"],
+        "quiz_version": job["quiz_version"],
+        "status": job["status"],
+        "total": total,
+        "processed": processed,
+        "changed": job.get("changed", 0),
+        "progress": round(processed / total * 100, 2) if total else (100.0 if job["status"] == "completed" else 0),
+        "rate_per_second": round(rate, 1),
+        "eta_seconds": round((total - processed) / rate) if rate and total > processed else 0,
+        "created_at": job["created_at"],
+        "finished_at": job.get("finished_at"),
+        "error": job.get("error"),
+        "active": job["_id"] in _active_jobs
+    }
+
+
+def start_or_resume_job(storage, admin_email: str, quiz: CompiledQuiz) -> Dict:
+    """
+    Reuse the admin's unfinished job for this exact answer key, so a crashed or
+    interrupted run continues from its checkpoint; otherwise start a new one.
+    """
+    job = storage.find_unfinished_rescore_job(admin_email, quiz.name, quiz.version, UNFINISHED_STATUSES)
+    if job:
+        return job
+
+    job = {
+        "_id": uuid.uuid4().hex,
+        "admin_email": admin_email,
+        "quiz_name": quiz.name,
+        "quiz_version": quiz.version,
+        "status": "pending",
+        "total": storage.count_submissions(admin_email, quiz.name),
+        "processed": 0,
+        "changed": 0,
+        "last_id": None,
+        "elapsed_seconds": 0.0,
+        "created_at": datetime.utcnow().isoformat(),
+        "finished_at": None,
+        "error": None
+    }
+    storage.insert_rescore_job(job)
+    return job
+
+
+def _rescore_batch(storage, quiz: CompiledQuiz, batch: List[Dict]) -> int:
+    """Score a batch against the key and write it back in one batched update; returns changed count"""
+    sheets = [align_answers(quiz, doc.get("answers") or []) for doc in batch]
+    tallies = tally_batch(quiz, [sheet.codes for sheet in sheets])
+    total = len(quiz)
+    now = datetime.utcnow()
+
+    updates = []
+    changed = 0
+    for doc, sheet, (correct, wrong, unanswered) in zip(batch, sheets, tallies):
+        if correct != doc.get("correct_answers"):
+            changed += 1
+        # Every row is rewritten: the displayed key in detailed_results changes even when the score does not
+        updates.append((doc["_id"], {
+            "total_questions": total,
+            "correct_answers": correct,
+            "wrong_answers": wrong,
+            "unanswered": unanswered,
+            "score": percentage(correct, total),
+            "percentage": percentage(correct, total),
+            "detailed_results": build_details(quiz, sheet),
+            "quiz_version": quiz.version,
+            "rescored_at": now
+        }))
+
+    storage.update_submissions(updates)
+    return changed
+
+
+def run_rescore_job(storage, job_id: str, quiz: CompiledQuiz, batch_size: int = 500, on_complete: Optional[Callable] = None):
+    """
+    Stream the job's submissions in _id order and rescore them batch by batch,
+    checkpointing after every batch so the job can resume where it stopped.
+    on_complete runs once all submissions are rescored, e.g. to refresh derived data.
+    """
+    with _active_lock:
+        if job_id in _active_jobs:
+            return
+        _active_jobs.add(job_id)
+
+    try:
+        job = storage.get_rescore_job(job_id)
+        if job is None or job["status"] == "completed":
+            return
+
+        storage.update_rescore_job(job_id, {"status": "running", "error": None})
+        logger.info("Rescoring '%s' for %s from %d/%d", job["quiz_name"], job["admin_email"], job.get("processed", 0), job.get("total", 0))
+
+        elapsed = job.get("elapsed_seconds", 0.0) or 0.0
+        started = time.monotonic()
+
+        def checkpoint(batch: List[Dict]):
+            changed = _rescore_batch(storage, quiz, batch)
+            storage.update_rescore_job(
+                job_id,
+                {"last_id": batch[-1]["_id"], "elapsed_seconds": elapsed + time.monotonic() - started},
+                {"processed": len(batch), "changed": changed}
+            )
+
+        # Only answers/correct_answers are read; detailed_results is rewritten, never read
+        rows = storage.iter_submission_answers(job["admin_email"], job["quiz_name"], job.get("last_id"), batch_size)
+        batch = []
+        for doc in rows:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                checkpoint(batch)
+                batch = []
+        if batch:
+            checkpoint(batch)
+
+        storage.update_rescore_job(job_id, {
+            "status": "completed",
+            "finished_at": datetime.utcnow().isoformat(),
+            "elapsed_seconds": elapsed + time.monotonic() - started
+        })
+        logger.info("Rescore job %s completed for '%s'", job_id, job["quiz_name"])
+        if on_complete:
+            on_complete()
+
+    except Exception as e:
+        logger.exception("Rescore job %s failed", job_id)
+        storage.update_rescore_job(job_id, {"status": "failed", "error": str(e)})
+    finally:
+        with _active_lock:
+            _active_jobs.discard(job_id)
+
+
+def get_job(storage, job_id: str, admin_email: str) -> Optional[Dict]:
+    return storage.get_rescore_job(job_id, admin_email)
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+# Invalidation scope: the admin and quiz a submission belongs to
+Tag = Tuple[str, str]
+
+
+class _Entry:
+    __slots__ = ("tag", "seq", "body")
+
+    def __init__(self, tag: Tag, seq: int, body: bytes):
+        self.tag = tag
+        self.seq = seq
+        self.body = body
+
+
+class ResponseCache:
+    """
+    Bounded read-through cache of rendered JSON responses for admin pages.
+
+    Entries are the encoded response bodies, evicted least recently used
+    once max_bytes is exceeded. Each entry is tagged with the (admin, quiz)
+    it was built from; invalidate() records a sequence number for the tag,
+    and an entry is served only if it was loaded after its tag's last
+    invalidation. The sequence is taken before loading, so a write that
+    lands while a page is being built is never cached as fresh.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._seq = 0
+        self._invalidated: Dict[Tag, int] = {}
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: {"hits": 0, "misses": 0, "stale": 0})
+        self._evictions = 0
+        self._invalidations = 0
+
+    def _lookup(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            counters = self._counters[key[0]]
+            entry = self._entries.get(key)
+            if entry is None:
+                counters["misses"] += 1
+                return None
+            if self._invalidated.get(entry.tag, 0) > entry.seq:
+                counters["stale"] += 1
+                self._remove(key)
+                return None
+            counters["hits"] += 1
+            self._entries.move_to_end(key)
+            return entry.body
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+
+    def _store(self, key: Hashable, tag: Tag, seq: int, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(tag, seq, body)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Tuple[Tag, Dict]]) -> Response:
+        """
+        key starts with the endpoint name (metrics are kept per endpoint).
+        load() returns (tag, payload); exceptions (e.g. a 404) pass through uncached.
+        """
+        body = self._lookup(key)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+
+        with self._lock:
+            seq = self._seq
+        tag, payload = load()
+        response = JSONResponse(content=jsonable_encoder(payload), headers={"X-Cache": "MISS"})
+        self._store(key, tag, seq, response.body)
+        return response
+
+    def invalidate(self, admin_email: str, quiz_name: str):
+        """Called whenever a submission for this admin/quiz is stored or changed"""
+        with self._lock:
+            self._seq += 1
+            self._invalidated[(admin_email, quiz_name)] = self._seq
+            self._invalidations += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            endpoints = {}
+            for name, counters in self._counters.items():
+                lookups = counters["hits"] + counters["misses"] + counters["stale"]
+                endpoints[name] = {**counters, "hit_rate": round(counters["hits"] / lookups, 3) if lookups else None}
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "endpoints": endpoints
+            }
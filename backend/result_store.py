@@ -0,0 +1,178 @@
+import json
+import logging
+import threading
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from quiz_bank import CompiledQuiz, INVALID_ANSWER, OPTION_LETTERS
+from scoring import AnswerSheet, build_details
+
+logger = logging.getLogger(__name__)
+
+MARKED_BIT = 0x80  # answer codes fit in the low bits, the high bit carries isMarked
+
+
+def format_seconds(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def pack_sheet(sheet: AnswerSheet) -> bytes:
+    """Answer codes (one byte each, marked flag in the high bit) followed by float32 times"""
+    codes = bytes(code | (MARKED_BIT if marked else 0) for code, marked in zip(sheet.codes, sheet.marked))
+    return codes + array("f", sheet.times).tobytes()
+
+
+def unpack_sheet(packed: bytes, invalid: Optional[Dict[int, int]] = None) -> AnswerSheet:
+    size = len(packed) // 5
+    sheet = AnswerSheet(size)
+    for pos, byte in enumerate(packed[:size]):
+        sheet.codes[pos] = byte & ~MARKED_BIT
+        sheet.marked[pos] = 1 if byte & MARKED_BIT else 0
+    times = array("f")
+    times.frombytes(packed[size:])
+    sheet.times = [round(t, 2) for t in times]
+    sheet.invalid = dict(invalid or {})
+    return sheet
+
+
+class ResultStore:
+    """
+    Bounded, column-oriented store of recent quiz results for /teacher/results.
+
+    Each row keeps scalars in fixed-width arrays, the quiz as an index into an
+    interned table, and the answers as one packed bytes object; question text
+    and options are re-attached from the compiled quiz only when a row is read.
+    When full, the oldest row is evicted to an append-only JSONL archive.
+    """
+
+    def __init__(self, capacity: int, archive_path: Optional[Path] = None):
+        self.capacity = max(capacity, 1)
+        self.archive_path = archive_path
+        self._lock = threading.Lock()
+        self._quizzes: List[tuple] = []          # interned (quiz name, version)
+        self._quiz_ids: Dict[tuple, int] = {}
+        self.clear()
+
+    def clear(self):
+        cap = self.capacity
+        self._quiz = array("H", bytes(2 * cap))
+        self._score = array("f", bytes(4 * cap))
+        self._total = array("H", bytes(2 * cap))
+        self._answered = array("H", bytes(2 * cap))
+        self._correct = array("H", bytes(2 * cap))
+        self._seconds = array("I", bytes(4 * cap))
+        self._names: List[Optional[str]] = [None] * cap
+        self._emails: List[Optional[str]] = [None] * cap
+        self._submitted: List[Optional[str]] = [None] * cap
+        self._packed: List[Optional[bytes]] = [None] * cap
+        self._extra: Dict[int, Dict] = {}  # sparse: link fields and out-of-range selections
+        self._head = 0
+        self._size = 0
+        self._score_sum = 0.0
+
+    def __len__(self):
+        return self._size
+
+    def _intern(self, quiz: CompiledQuiz) -> int:
+        key = (quiz.name, quiz.version)
+        quiz_id = self._quiz_ids.get(key)
+        if quiz_id is None:
+            quiz_id = self._quiz_ids[key] = len(self._quizzes)
+            self._quizzes.append(key)
+        return quiz_id
+
+    def append(self, quiz: CompiledQuiz, sheet: AnswerSheet, student_name: str, student_email: str,
+               score: float, correct: int, answered: int, time_spent_seconds: Optional[int],
+               submitted_at: str, extra: Optional[Dict] = None):
+        evicted = None
+        with self._lock:
+            if self._size == self.capacity:
+                evicted = self._row(self._head)
+                self._score_sum -= self._score[self._head]
+                self._extra.pop(self._head, None)
+                slot = self._head
+                self._head = (self._head + 1) % self.capacity
+            else:
+                slot = (self._head + self._size) % self.capacity
+                self._size += 1
+
+            self._quiz[slot] = self._intern(quiz)
+            self._score[slot] = score
+            self._score_sum += self._score[slot]
+            self._total[slot] = len(quiz)
+            self._answered[slot] = answered
+            self._correct[slot] = correct
+            self._seconds[slot] = time_spent_seconds or 0
+            self._names[slot] = student_name
+            self._emails[slot] = student_email
+            self._submitted[slot] = submitted_at
+            self._packed[slot] = pack_sheet(sheet)
+            row_extra = dict(extra or {})
+            if sheet.invalid:
+                row_extra["invalid"] = dict(sheet.invalid)
+            if row_extra:
+                self._extra[slot] = row_extra
+
+        if evicted is not None:
+            self._archive(evicted)
+
+    def _row(self, slot: int) -> Dict:
+        """Compact form of a row: what the archive stores"""
+        name, version = self._quizzes[self._quiz[slot]]
+        extra = self._extra.get(slot, {})
+        row = {
+            "studentName": self._names[slot],
+            "studentEmail": self._emails[slot],
+            "quizName": name,
+            "quizVersion": version,
+            "totalQuestions": self._total[slot],
+            "answeredQuestions": self._answered[slot],
+            "correctAnswers": self._correct[slot],
+            "score": round(self._score[slot], 2),
+            "timeSpent": format_seconds(self._seconds[slot]),
+            "submittedAt": self._submitted[slot],
+            "packed": self._packed[slot]
+        }
+        row.update({k: v for k, v in extra.items() if k != "invalid"})
+        row["invalid"] = extra.get("invalid")
+        return row
+
+    def _archive(self, row: Dict):
+        if self.archive_path is None:
+            return
+        sheet = unpack_sheet(row.pop("packed"), row.pop("invalid"))
+        row["answers"] = "".join(
+            "-" if code == 0 else "?" if code == INVALID_ANSWER else OPTION_LETTERS[code - 1] for code in sheet.codes
+        )
+        row["marked"] = [pos for pos, flag in enumerate(sheet.marked) if flag]
+        row["times"] = sheet.times
+        row["archivedAt"] = datetime.utcnow().isoformat()
+        try:
+            with open(self.archive_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logger.warning("Could not archive evicted result for %s: %s", row["studentName"], e)
+
+    def average_score(self) -> float:
+        return round(self._score_sum / self._size, 2) if self._size else 0
+
+    def results(self, load_quiz: Callable[[str], Optional[CompiledQuiz]], limit: Optional[int] = None) -> List[Dict]:
+        """Rows oldest first in the StudentResult shape; limit keeps only the most recent"""
+        with self._lock:
+            count = self._size if limit is None else min(max(limit, 0), self._size)
+            start = self._size - count
+            rows = [self._row((self._head + i) % self.capacity) for i in range(start, self._size)]
+
+        quizzes = {}
+        for row in rows:
+            name = row["quizName"]
+            if name not in quizzes:
+                quizzes[name] = load_quiz(name)
+            quiz = quizzes[name]
+            sheet = unpack_sheet(row.pop("packed"), row.pop("invalid"))
+            # Text and options come from the quiz as it is now
+            row["detailedResults"] = build_details(quiz, sheet) if quiz and len(quiz) == len(sheet.codes) else []
+            del row["quizVersion"]
+        return rows
@@ -0,0 +1,81 @@
+import math
+from typing import Dict, List, Optional
+
+# Fixed-width score histogram over percentages: [0,10), [10,20), ... [90,100]
+HISTOGRAM_BUCKETS = 10
+BUCKET_WIDTH = 100 / HISTOGRAM_BUCKETS
+ROLLUP_KEY_FIELDS = ("admin_email", "quiz_name", "class_name", "section")
+
+
+def bucket_for(percentage: float) -> int:
+    return min(max(int(percentage // BUCKET_WIDTH), 0), HISTOGRAM_BUCKETS - 1)
+
+
+def rollup_key(admin_email: str, quiz_name: str, class_name: str, section: str) -> Dict:
+    return {"admin_email": admin_email, "quiz_name": quiz_name, "class_name": class_name, "section": section}
+
+
+def record_submission(storage, submission_doc: Dict):
+    """Fold one link submission into its class/section rollup with a single upsert"""
+    percentage = float(submission_doc.get("percentage", 0) or 0)
+    key = rollup_key(
+        submission_doc["admin_email"],
+        submission_doc["quiz_json_name"],
+        submission_doc["class_name"],
+        submission_doc["section"]
+    )
+    storage.increment_class_rollup(key, percentage, bucket_for(percentage))
+
+
+def format_rollup(doc: Dict) -> Dict:
+    count = doc.get("count", 0)
+    mean = doc.get("sum", 0) / count if count else 0
+    # Population variance; clamp tiny negatives from floating point cancellation
+    variance = max(doc.get("sum_sq", 0) / count - mean * mean, 0) if count else 0
+    histogram = doc.get("histogram", {})
+    return {
+        "quiz_name": doc["quiz_name"],
+        "class_name": doc["class_name"],
+        "section": doc["section"],
+        "count": count,
+        "mean": round(mean, 2),
+        "variance": round(variance, 2),
+        "std_dev": round(math.sqrt(variance), 2),
+        "min": doc.get("min"),
+        "max": doc.get("max"),
+        "histogram": [
+            {
+                "range": f"{int(i * BUCKET_WIDTH)}-{int((i + 1) * BUCKET_WIDTH)}",
+                "count": histogram.get(str(i), 0)
+            }
+            for i in range(HISTOGRAM_BUCKETS)
+        ]
+    }
+
+
+def query_rollups(storage, admin_email: str, quiz_name: Optional[str] = None, class_name: Optional[str] = None) -> List[Dict]:
+    return [format_rollup(doc) for doc in storage.find_class_rollups(admin_email, quiz_name, class_name)]
+
+
+def rebuild_rollups(storage, admin_email: str, quiz_name: Optional[str] = None) -> int:
+    """
+    Recompute rollups from raw submissions, e.g. after a rescore. Grouping is
+    done by the database per (quiz, class, section, bucket) and merged here.
+    """
+    rollups: Dict[tuple, Dict] = {}
+    for group in storage.class_rollup_groups(admin_email, quiz_name, BUCKET_WIDTH, HISTOGRAM_BUCKETS):
+        key = (group["quiz_name"], group["class_name"], group["section"])
+        rollup = rollups.setdefault(key, {
+            **rollup_key(admin_email, *key),
+            "count": 0, "sum": 0.0, "sum_sq": 0.0, "min": None, "max": None, "histogram": {}
+        })
+        rollup["count"] += group["count"]
+        rollup["sum"] += group["sum"]
+        rollup["sum_sq"] += group["sum_sq"]
+        rollup["min"] = group["min"] if rollup["min"] is None else min(rollup["min"], group["min"])
+        rollup["max"] = group["max"] if rollup["max"] is None else max(rollup["max"], group["max"])
+        bucket = str(group["bucket"])
+        rollup["histogram"][bucket] = rollup["histogram"].get(bucket, 0) + group["count"]
+
+    storage.replace_class_rollups(admin_email, quiz_name, list(rollups.values()))
+    return len(rollups)
@@ -0,0 +1,169 @@
+import operator
+from typing import Dict, Iterable, List, Tuple
+
+from quiz_bank import CompiledQuiz, OPTION_LETTERS, NO_ANSWER, INVALID_ANSWER
+
+
+def option_code(selected_option) -> int:
+    """Answer code for a selectedOption index (0-3 are A-D)"""
+    if isinstance(selected_option, int) and 0 <= selected_option < len(OPTION_LETTERS):
+        return selected_option + 1
+    return INVALID_ANSWER
+
+
+def _field(answer, name: str, default=None):
+    # Answers arrive as StudentAnswer models from requests and as dicts from MongoDB
+    if isinstance(answer, dict):
+        return answer.get(name, default)
+    return getattr(answer, name, default)
+
+
+class AnswerSheet:
+    """A student's answers aligned to the quiz's question order"""
+
+    __slots__ = ("codes", "times", "marked", "invalid")
+
+    def __init__(self, size: int):
+        self.codes = bytearray(size)
+        self.times = [0.0] * size
+        self.marked = bytearray(size)
+        self.invalid: Dict[int, int] = {}  # {position: raw selectedOption} for out-of-range picks
+
+
+def align_answers(quiz: CompiledQuiz, answers: Iterable) -> AnswerSheet:
+    """
+    Place each answer at its question's position. The first answer for a
+    question wins and answers to unknown question numbers are ignored.
+    """
+    sheet = AnswerSheet(len(quiz))
+    position = quiz.position
+    for answer in answers:
+        pos = position.get(_field(answer, "questionNumber"))
+        if pos is None or sheet.codes[pos] != NO_ANSWER:
+            continue
+        selected = _field(answer, "selectedOption")
+        code = option_code(selected)
+        sheet.codes[pos] = code
+        if code == INVALID_ANSWER:
+            sheet.invalid[pos] = selected
+        sheet.times[pos] = _field(answer, "timeSpent", 0) or 0
+        sheet.marked[pos] = 1 if _field(answer, "isMarked", False) else 0
+    return sheet
+
+
+def sheet_answers(quiz: CompiledQuiz, sheet: AnswerSheet) -> List[Dict]:
+    """The answered positions of a sheet as StudentAnswer-shaped dicts, the form submissions store"""
+    answers = []
+    for pos, code in enumerate(sheet.codes):
+        if code == NO_ANSWER:
+            continue
+        answers.append({
+            "questionNumber": quiz.questions[pos]["questionNumber"],
+            "selectedOption": sheet.invalid[pos] if code == INVALID_ANSWER else code - 1,
+            "timeSpent": sheet.times[pos],
+            "isMarked": bool(sheet.marked[pos])
+        })
+    return answers
+
+
+def tally(key_codes: bytes, codes) -> Tuple[int, int, int]:
+    """(correct, wrong, unanswered) for one sheet's answer codes"""
+    correct = sum(map(operator.eq, codes, key_codes))
+    unanswered = codes.count(NO_ANSWER)
+    return correct, len(codes) - correct - unanswered, unanswered
+
+
+# Byte (code << 3 | key) -> 1 when the answer code matches the key, else 0. Keys are 1-4,
+# with NO_KEY folded to 7, which no answer code (0-5) takes, so fields never carry
+_MATCH = bytes(1 if pair >> 3 == pair & 7 else 0 for pair in range(256))
+_KEY_FIELD = bytes(code if code < 8 else 7 for code in range(256))
+
+
+def tally_batch(quiz: CompiledQuiz, batch: List) -> List[Tuple[int, int, int]]:
+    """
+    Tally many sheets against the same answer key. The batch is packed into one
+    buffer and compared to the tiled key in a single pass: each byte becomes
+    code << 3 | key, and a lookup table turns it into a 0/1 match flag, so only
+    C-level counts over each sheet's slice remain per document.
+    """
+    size = len(quiz)
+    if not batch or not size:
+        return [(0, 0, 0) for _ in batch]
+    if any(len(codes) != size for codes in batch):
+        return [tally(quiz.key_codes, codes) for codes in batch]
+
+    packed = b"".join(batch)
+    keys = quiz.key_codes.translate(_KEY_FIELD) * len(batch)
+    pairs = (int.from_bytes(packed, "big") << 3 | int.from_bytes(keys, "big")).to_bytes(len(packed), "big")
+    matches = pairs.translate(_MATCH)
+
+    tallies = []
+    for start in range(0, len(packed), size):
+        end = start + size
+        correct = matches.count(1, start, end)
+        unanswered = packed.count(NO_ANSWER, start, end)
+        tallies.append((correct, size - correct - unanswered, unanswered))
+    return tallies
+
+
+def percentage(correct: int, total: int) -> float:
+    return round((correct / total) * 100, 2) if total > 0 else 0
+
+
+def display_letter(correct_raw) -> str:
+    if isinstance(correct_raw, int) and not isinstance(correct_raw, bool) and 0 <= correct_raw < len(OPTION_LETTERS):
+        return OPTION_LETTERS[correct_raw]
+    return str(correct_raw)
+
+
+def build_details(quiz: CompiledQuiz, sheet: AnswerSheet) -> List[Dict]:
+    """Per-question breakdown stored with each submission"""
+    details = []
+    key_codes = quiz.key_codes
+    for pos, q in enumerate(quiz.questions):
+        code = sheet.codes[pos]
+        if code == NO_ANSWER:
+            details.append({
+                "questionNumber": q["questionNumber"],
+                "questionText": q.get("questionText", ""),
+                "selectedOption": -1,  # -1 means not answered
+                "selectedLetter": "NOT ANSWERED",
+                "correctAnswer": q.get("correct_answer", "X"),
+                "correctLetter": display_letter(q.get("correct_answer", "X")),
+                "isCorrect": False,
+                "status": "UNANSWERED",
+                "timeSpent": 0,
+                "isMarked": False,
+                "options": q.get("option_with_images_", [])
+            })
+            continue
+
+        is_correct = code == key_codes[pos]
+        correct_raw = q.get("correct_answer", "X")
+        details.append({
+            "questionNumber": q["questionNumber"],
+            "questionText": q.get("questionText", ""),
+            "selectedOption": sheet.invalid[pos] if code == INVALID_ANSWER else code - 1,
+            "selectedLetter": "INVALID" if code == INVALID_ANSWER else OPTION_LETTERS[code - 1],
+            "correctAnswer": correct_raw,
+            "correctLetter": display_letter(correct_raw),
+            "isCorrect": is_correct,
+            "status": "CORRECT" if is_correct else "WRONG",
+            "timeSpent": sheet.times[pos],
+            "isMarked": bool(sheet.marked[pos]),
+            "options": q.get("option_with_images_", [])
+        })
+    return details
+
+
+def score_sheet(quiz: CompiledQuiz, sheet: AnswerSheet) -> Dict:
+    correct, wrong, unanswered = tally(quiz.key_codes, sheet.codes)
+    total = len(quiz)
+    return {
+        "correct": correct,
+        "wrong": wrong,
+        "unanswered": unanswered,
+        "total": total,
+        "percentage": percentage(correct, total),
+        "details": build_details(quiz, sheet)
+    }
@@ -0,0 +1,216 @@
+import bisect
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from quiz_bank import CompiledQuiz, QuizRepository, is_image_reference
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+STOP_WORDS = frozenset("a an and are as at be by for from in is it of on or that the this to was which with".split())
+
+# Question text counts more than option text when ranking
+QUESTION_TEXT_WEIGHT = 2
+OPTION_TEXT_WEIGHT = 1
+# Limit on vocabulary terms a trailing prefix may expand to
+MAX_PREFIX_EXPANSIONS = 50
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return [t for t in TOKEN_PATTERN.findall(text) if t not in STOP_WORDS]
+
+
+class QuestionSearchIndex:
+    """
+    Inverted index over question and option text for every quiz in the
+    repository. Quizzes are re-indexed individually when their file changes.
+    """
+
+    def __init__(self, repository: QuizRepository, refresh_interval: float = 5.0):
+        self.repository = repository
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, int]] = {}  # {term: {doc_id: weighted tf}}
+        self._vocab: List[str] = []  # sorted terms for prefix lookup
+        self._docs: Dict[int, Tuple[str, Dict]] = {}  # {doc_id: (quiz_name, question)}
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+        self._quizzes: Dict[str, Tuple[str, List[int]]] = {}  # {quiz_name: (version, doc_ids)}
+        self._next_id = 0
+        self._last_refresh = 0.0
+        self._unreadable: Dict[str, int] = {}  # {quiz_name: mtime_ns} of files that failed to load
+
+    # Indexing
+
+    def _add_terms(self, doc_id: int, terms: Counter):
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._vocab, term)
+            postings[doc_id] = tf
+
+    def _remove_doc(self, doc_id: int):
+        quiz_name, question = self._docs.pop(doc_id)
+        self._total_len -= self._doc_len.pop(doc_id)
+        for term in self._question_terms(question):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                del self._vocab[bisect.bisect_left(self._vocab, term)]
+
+    @staticmethod
+    def _question_terms(question: Dict) -> Counter:
+        terms = Counter()
+        for token in tokenize(question.get("questionText", "")):
+            terms[token] += QUESTION_TEXT_WEIGHT
+        for option in question.get("option_with_images_", []) or []:
+            if isinstance(option, str) and not is_image_reference(option):
+                for token in tokenize(option):
+                    terms[token] += OPTION_TEXT_WEIGHT
+        return terms
+
+    def index_quiz(self, compiled: CompiledQuiz):
+        """(Re)index one quiz, replacing whatever was indexed for it before"""
+        questions = compiled.questions if isinstance(compiled.questions, list) else []
+        with self._lock:
+            self.remove_quiz(compiled.name)
+            doc_ids = []
+            for question in questions:
+                if not isinstance(question, dict):
+                    continue
+                terms = self._question_terms(question)
+                doc_id = self._next_id
+                self._next_id += 1
+                self._docs[doc_id] = (compiled.name, question)
+                length = sum(terms.values())
+                self._doc_len[doc_id] = length
+                self._total_len += length
+                self._add_terms(doc_id, terms)
+                doc_ids.append(doc_id)
+            self._quizzes[compiled.name] = (compiled.version, doc_ids)
+
+    def remove_quiz(self, quiz_name: str):
+        with self._lock:
+            indexed = self._quizzes.pop(quiz_name, None)
+            if indexed:
+                for doc_id in indexed[1]:
+                    self._remove_doc(doc_id)
+
+    def refresh(self, force: bool = False) -> int:
+        """Re-index quizzes whose files changed since the last refresh; returns how many"""
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return 0
+        self._last_refresh = now
+
+        changed = 0
+        available = set(self.repository.available())
+        for quiz_name in available:
+            path = self.repository.find_path(quiz_name)
+            if path is None or self._unreadable.get(quiz_name) == path.stat().st_mtime_ns:
+                continue
+            try:
+                compiled = self.repository.load(quiz_name)
+            except Exception as e:
+                # Remember the failure so an unreadable file is not retried until it changes
+                self._unreadable[quiz_name] = path.stat().st_mtime_ns
+                logger.warning("Skipping quiz '%s' in search index: %s", quiz_name, e)
+                continue
+            self._unreadable.pop(quiz_name, None)
+            indexed = self._quizzes.get(quiz_name)
+            if compiled is not None and (indexed is None or indexed[0] != compiled.version):
+                self.index_quiz(compiled)
+                changed += 1
+
+        for quiz_name in set(self._quizzes) - available:
+            self.remove_quiz(quiz_name)
+            changed += 1
+        return changed
+
+    # Querying
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._vocab, prefix)
+        terms = []
+        for term in self._vocab[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query: str, limit: int = 20, quiz_name: Optional[str] = None, prefix: bool = True) -> List[Dict]:
+        """
+        BM25-ranked search. Every query term must match; with prefix=True the
+        last term also matches longer words ("photo" finds "photosynthesis").
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return []
+            avg_len = self._total_len / n_docs
+
+            scores: Optional[Dict[int, float]] = None
+            for i, token in enumerate(tokens):
+                terms = self._expand_prefix(token) if prefix and i == len(tokens) - 1 else [token]
+                token_scores: Dict[int, float] = {}
+                doc_len = self._doc_len
+                base_norm = K1 * (1 - B)
+                len_norm = K1 * B / avg_len
+                for term in terms:
+                    postings = self._postings.get(term, {})
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    boost = idf * (K1 + 1)
+                    for doc_id, tf in postings.items():
+                        score = boost * tf / (tf + base_norm + len_norm * doc_len[doc_id])
+                        if score > token_scores.get(doc_id, 0.0):
+                            token_scores[doc_id] = score
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {d: s + token_scores[d] for d, s in scores.items() if d in token_scores}
+                if not scores:
+                    return []
+
+            if quiz_name:
+                scores = {d: s for d, s in scores.items() if self._docs[d][0] == quiz_name}
+
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            results = []
+            for doc_id, score in ranked:
+                doc_quiz, question = self._docs[doc_id]
+                results.append({
+                    "quiz_name": doc_quiz,
+                    "questionNumber": question.get("questionNumber"),
+                    "questionText": question.get("questionText", ""),
+                    "options": question.get("option_with_images_", []),
+                    "score": round(score, 4)
+                })
+            return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "quizzes": len(self._quizzes),
+                "questions": len(self._docs),
+                "terms": len(self._postings)
+            }
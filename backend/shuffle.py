@@ -0,0 +1,85 @@
+import hashlib
+import itertools
+import random
+from array import array
+from typing import Dict, List
+
+from quiz_bank import CompiledQuiz, OPTION_LETTERS, NO_ANSWER, INVALID_ANSWER
+from scoring import AnswerSheet
+
+OPTION_SLOTS = len(OPTION_LETTERS)
+
+# Every ordering of 0..n-1 for each option count, so a question's option order is one random pick
+_ORDERINGS = {count: list(itertools.permutations(range(count))) for count in range(OPTION_SLOTS + 1)}
+
+
+def student_seed(link_id: str, student_key: str) -> int:
+    digest = hashlib.sha256(f"{link_id}\0{student_key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+class QuizPermutation:
+    """
+    One student's question and option order over a shared CompiledQuiz.
+
+    order[p] is the quiz position of the question served at position p, and
+    options[q * 4 + k] the original option shown as option k of the question
+    at quiz position q (identity past the question's last option). These two
+    arrays are the whole per-student state; the quiz itself is never copied.
+    """
+
+    __slots__ = ("quiz", "order", "options")
+
+    def __init__(self, quiz: CompiledQuiz, seed: int):
+        rng = random.Random(seed)
+        size = len(quiz)
+        positions = list(range(size))
+        rng.shuffle(positions)
+        self.quiz = quiz
+        self.order = array("H" if size < 65536 else "I", positions)
+        options = bytearray(range(OPTION_SLOTS)) * size
+        for q, count in enumerate(quiz.option_counts):
+            if count > 1:
+                options[q * OPTION_SLOTS:q * OPTION_SLOTS + count] = bytes(rng.choice(_ORDERINGS[count]))
+        self.options = bytes(options)
+
+    def questions(self) -> List[Dict]:
+        """Questions as this student sees them, in served order with options reordered"""
+        served = []
+        for q in self.order:
+            question = self.quiz.questions[q]
+            options = question.get("option_with_images_")
+            count = self.quiz.option_counts[q]
+            if count < 2:
+                served.append(question)
+                continue
+            mapping = self.options[q * OPTION_SLOTS:q * OPTION_SLOTS + count]
+            view = dict(question, option_with_images_=[options[i] for i in mapping] + options[count:])
+            # Keep the served key consistent with the served options
+            key = self.quiz.answer_key[q]
+            if key is not None and OPTION_LETTERS.index(key) < count:
+                view["correct_answer"] = OPTION_LETTERS[mapping.index(OPTION_LETTERS.index(key))]
+            served.append(view)
+        return served
+
+    def _original_code(self, q: int, code: int) -> int:
+        if code == NO_ANSWER or code == INVALID_ANSWER:
+            return code
+        return self.options[q * OPTION_SLOTS + code - 1] + 1
+
+    def map_options(self, sheet: AnswerSheet) -> AnswerSheet:
+        """For a sheet already in quiz order (answers keyed by questionNumber): served options to original ones"""
+        codes = sheet.codes
+        for q, code in enumerate(codes):
+            codes[q] = self._original_code(q, code)
+        return sheet
+
+    def unshuffle(self, sheet: AnswerSheet) -> AnswerSheet:
+        """For a sheet in served order (packed answers): back to quiz order and original options"""
+        original = AnswerSheet(len(self.order))
+        for p, q in enumerate(self.order):
+            original.codes[q] = self._original_code(q, sheet.codes[p])
+            original.times[q] = sheet.times[p]
+            original.marked[q] = sheet.marked[p]
+        original.invalid = {self.order[p]: raw for p, raw in sheet.invalid.items()}
+        return original
@@ -0,0 +1,121 @@
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip variants are built
+    brotli = None
+
+# CRA content-hashes build output, e.g. static/js/main.3f2a9c1b.js or main.3f2a9c1b.chunk.css
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.(?:chunk\.)?[A-Za-z0-9]+$")
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/manifest+json", "image/svg+xml")
+MIN_COMPRESS_BYTES = 1024
+# Larger files are left on disk and served by FileResponse
+MAX_IN_MEMORY_BYTES = 10 * 1024 * 1024
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+
+
+class StaticAsset:
+    """One built file with its precompressed variants and response headers"""
+
+    __slots__ = ("path", "body", "variants", "etag", "content_type", "cache_control")
+
+    def __init__(self, path: str, body: bytes):
+        self.path = path
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        self.content_type = content_type
+        self.cache_control = IMMUTABLE_CACHE if HASHED_NAME.search(path) else REVALIDATE_CACHE
+        self.variants: Dict[str, bytes] = {}
+
+        if len(body) >= MIN_COMPRESS_BYTES and content_type.startswith(COMPRESSIBLE_TYPES):
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.variants["br"] = compressed
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.variants["gzip"] = compressed
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    encodings = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[token.strip().lower()] = quality
+    return encodings
+
+
+class StaticAssetTable:
+    """The React build held in memory, served with validators and precompressed bodies"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.assets: Dict[str, StaticAsset] = {}
+
+    def load(self) -> int:
+        self.assets = {}
+        if not self.root.exists():
+            return 0
+        for file_path in self.root.rglob("*"):
+            if file_path.is_file() and file_path.stat().st_size <= MAX_IN_MEMORY_BYTES:
+                relative = file_path.relative_to(self.root).as_posix()
+                self.assets[relative] = StaticAsset(relative, file_path.read_bytes())
+        return len(self.assets)
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        return self.assets.get(path.lstrip("/"))
+
+    def stats(self) -> Dict:
+        return {
+            "files": len(self.assets),
+            "bytes": sum(len(a.body) for a in self.assets.values()),
+            "compressed_bytes": sum(len(v) for a in self.assets.values() for v in a.variants.values())
+        }
+
+    def respond(self, asset: StaticAsset, request: Request) -> Response:
+        encoding = None
+        if asset.variants:
+            accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+            for candidate in ("br", "gzip"):
+                if candidate in asset.variants and accepted.get(candidate, accepted.get("*", 0)) > 0:
+                    encoding = candidate
+                    break
+
+        etag = f'"{asset.etag}-{encoding}"' if encoding else f'"{asset.etag}"'
+        headers = {"ETag": etag, "Cache-Control": asset.cache_control}
+        if asset.variants:
+            headers["Vary"] = "Accept-Encoding"
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        body = asset.variants[encoding] if encoding else asset.body
+        return Response(content=body, media_type=asset.content_type, headers=headers)
@@ -0,0 +1,296 @@
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Keyset position in a listing: (sort value, row id)
+Cursor = Tuple[datetime, str]
+
+
+def _json_default(value):
+    # Datetimes are tagged so they come back as datetimes, not strings
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return str(value)
+
+
+def _json_object_hook(value: Dict):
+    if len(value) == 1 and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def dump_document(doc: Dict) -> str:
+    """JSON for a stored document outside the database (outbox, archive); ids become strings"""
+    return json.dumps(doc, default=_json_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_document(text) -> Dict:
+    return json.loads(text, object_hook=_json_object_hook)
+
+
+class Storage:
+    """
+    Persistence used by the API: submissions, exam sessions, admins/plans,
+    quiz links, class rollups and rescore jobs. Implemented for MongoDB
+    (storage_mongo) and embedded SQLite (storage_sqlite).
+
+    Submission ids and link/admin ids are returned as strings. Listings are
+    ordered newest first and paged with an optional keyset position.
+    """
+
+    name = "base"
+
+    def ensure_indexes(self):
+        pass
+
+    def close(self):
+        pass
+
+    # Admins and plans
+
+    def get_admin_by_email(self, email: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def get_admin_by_id(self, admin_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def get_plan(self, plan_id) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def save_plan(self, plan: Dict) -> str:
+        raise NotImplementedError
+
+    def save_admin(self, admin: Dict) -> str:
+        raise NotImplementedError
+
+    # Submissions
+
+    def insert_submission(self, doc: Dict) -> str:
+        """Store one scored submission; sets doc["_id"] and returns it as a string"""
+        raise NotImplementedError
+
+    def insert_submissions(self, docs: List[Dict]) -> List[str]:
+        raise NotImplementedError
+
+    def deliver_submissions(self, docs: List[Dict]) -> List[bool]:
+        """
+        Insert submissions that already carry their _id (from the outbox),
+        skipping ids that are stored already so a replayed batch is harmless.
+        Returns, per doc, whether this call inserted it.
+        """
+        raise NotImplementedError
+
+    def get_submission(self, submission_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def list_submission_summaries(self, admin_email: str, quiz_name: str, limit: int,
+                                  after: Optional[Cursor] = None, skip: int = 0) -> List[Dict]:
+        """Summary fields only (no detailed_results/answers), newest first"""
+        raise NotImplementedError
+
+    def count_submissions(self, admin_email: str, quiz_name: str) -> int:
+        raise NotImplementedError
+
+    def submission_quiz_names(self, admin_email: str) -> List[str]:
+        raise NotImplementedError
+
+    def quiz_groups(self, admin_email: str, limit: int, after: Optional[Cursor] = None,
+                    skip: int = 0) -> Tuple[List[Dict], int]:
+        """
+        (one page of per-quiz aggregates for an admin ordered by latest submission, the
+        admin's number of quizzes). Each group has quiz_name, total_submissions,
+        latest_submission, first_submission and average_score. Only the page's quizzes
+        are aggregated; the rest cost one index lookup each for their latest submission.
+        """
+        raise NotImplementedError
+
+    def submission_overview(self) -> Tuple[List[Dict], int]:
+        """(per-quiz counts with latest timestamp, total submissions) across all admins"""
+        raise NotImplementedError
+
+    def archive_candidates(self, cutoff: datetime) -> List[Tuple[str, str]]:
+        """(admin_email, quiz_name) pairs that have submissions older than cutoff"""
+        raise NotImplementedError
+
+    def find_submissions_before(self, admin_email: str, quiz_name: str, cutoff: datetime, limit: int) -> List[Dict]:
+        """Full submission documents older than cutoff, oldest first"""
+        raise NotImplementedError
+
+    def delete_submissions(self, submission_ids: List[str]) -> int:
+        raise NotImplementedError
+
+    def iter_submission_answers(self, admin_email: str, quiz_name: str, after_id: Optional[str] = None,
+                                batch_size: int = 500) -> Iterator[Dict]:
+        """_id, answers and correct_answers for rescoring, in ascending _id order"""
+        raise NotImplementedError
+
+    def update_submissions(self, updates: List[Tuple[str, Dict]]):
+        """Apply field updates to many submissions in one batch"""
+        raise NotImplementedError
+
+    def iter_link_submissions(self, link_id: str) -> Iterator[Dict]:
+        """_id, student_name, class_name, section and answers of every submission on a link"""
+        raise NotImplementedError
+
+    # Exam sessions
+
+    def insert_exam_sessions(self, sessions: List[Dict]):
+        raise NotImplementedError
+
+    def push_exam_student(self, exam_id: str, student_data: Dict) -> bool:
+        raise NotImplementedError
+
+    def list_exam_sessions(self, admin_email: Optional[str] = None) -> List[Dict]:
+        raise NotImplementedError
+
+    def get_exam_session(self, exam_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    # Quiz links
+
+    def insert_links(self, links: List[Dict]):
+        raise NotImplementedError
+
+    def get_link(self, link_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def claim_link_slot(self, link_id: str, student: Dict, score: float) -> Tuple[bool, Optional[Dict]]:
+        """
+        Atomically add a student to a link if they have not submitted and the
+        limit is not reached (counting slots reserved by open attempts).
+        Returns (claimed, current link).
+        """
+        raise NotImplementedError
+
+    def record_link_students(self, link_id: str, students: List[Dict], scores: List[float]):
+        """
+        Add the students of closed attempts to a link in one write. Each took
+        a slot when its attempt started (see start_attempt), so no limit is
+        checked: the reservation becomes a counted student. Students already
+        on the link are skipped without touching the counts, so a retried
+        batch is harmless.
+        """
+        raise NotImplementedError
+
+    # Exam attempts (timed links); an attempt's _id is "<link_id>:<student id>"
+
+    def start_attempt(self, attempt: Dict) -> Optional[Dict]:
+        """
+        Return the stored attempt for attempt's _id, or insert it while atomically
+        reserving a slot on its link (current_count + reserved < max_allowed, and
+        the student not on the link yet). None when no slot could be reserved.
+        """
+        raise NotImplementedError
+
+    def get_attempt(self, attempt_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def save_attempt_progress(self, attempt_id: str, progress: Dict, saved_at: datetime) -> bool:
+        """Replace an open attempt's last saved answers; False once it is closed"""
+        raise NotImplementedError
+
+    def claim_attempts(self, attempt_ids: List[str], status: str, current: str = "open",
+                       claimed_before: Optional[datetime] = None) -> List[Dict]:
+        """
+        Move the attempts among attempt_ids still in current (and, if given, last claimed
+        before claimed_before) to status in one batch, stamping claimed_at; returns the ones moved
+        """
+        raise NotImplementedError
+
+    def set_attempts_status(self, attempt_ids: List[str], status: str):
+        raise NotImplementedError
+
+    def find_attempts(self, status: str, due_before: Optional[datetime] = None,
+                      claimed_before: Optional[datetime] = None, limit: int = 0) -> List[Dict]:
+        """
+        Attempts in status, optionally only those with a deadline before due_before or
+        last claimed before claimed_before, earliest deadline first
+        """
+        raise NotImplementedError
+
+    # Class rollups
+
+    def increment_class_rollup(self, key: Dict, percentage: float, bucket: int):
+        raise NotImplementedError
+
+    def find_class_rollups(self, admin_email: str, quiz_name: Optional[str] = None,
+                           class_name: Optional[str] = None) -> List[Dict]:
+        raise NotImplementedError
+
+    def class_rollup_groups(self, admin_email: str, quiz_name: Optional[str], bucket_width: float,
+                            buckets: int) -> Iterator[Dict]:
+        """Raw submission aggregates per (quiz, class, section, histogram bucket)"""
+        raise NotImplementedError
+
+    def replace_class_rollups(self, admin_email: str, quiz_name: Optional[str], rollups: List[Dict]):
+        raise NotImplementedError
+
+    # Rescore jobs
+
+    def insert_rescore_job(self, job: Dict):
+        raise NotImplementedError
+
+    def get_rescore_job(self, job_id: str, admin_email: Optional[str] = None) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def find_unfinished_rescore_job(self, admin_email: str, quiz_name: str, quiz_version: str,
+                                    statuses: List[str]) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def update_rescore_job(self, job_id: str, set_fields: Optional[Dict] = None, inc_fields: Optional[Dict] = None):
+        raise NotImplementedError
+
+    # Time-spent sketches
+
+    def save_time_sketch(self, admin_email: str, quiz_name: str, quiz_version: str, worker_id: str,
+                         sketch: Dict, updated_at: datetime):
+        """Upsert one worker's serialized sketches for a quiz version"""
+        raise NotImplementedError
+
+    def find_time_sketches(self, admin_email: str, quiz_name: str, quiz_version: str) -> List[Dict]:
+        """Every worker's rows for a quiz version: worker_id, sketch, updated_at"""
+        raise NotImplementedError
+
+    # Collusion reports
+
+    def save_collusion_report(self, link_id: str, admin_email: str, report: Dict):
+        """Replace the stored report for a link"""
+        raise NotImplementedError
+
+    def get_collusion_report(self, link_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+
+def create_storage(backend: str, mongodb_uri: Optional[str] = None, mongodb_database: Optional[str] = None,
+                   sqlite_path: Optional[str] = None) -> Optional[Storage]:
+    """Build the configured backend, or None when it cannot be initialised"""
+    backend = (backend or "").lower()
+
+    if backend == "sqlite":
+        from storage_sqlite import SQLiteStorage
+        try:
+            storage = SQLiteStorage(sqlite_path)
+            logger.info("Using SQLite storage: %s", sqlite_path)
+            return storage
+        except Exception as e:
+            logger.error("SQLite storage failed: %s", e)
+            return None
+
+    if backend == "mongo":
+        if not (mongodb_uri and mongodb_database):
+            logger.warning("MongoDB credentials not found in environment variables")
+            return None
+        from storage_mongo import MongoStorage
+        try:
+            storage = MongoStorage.connect(mongodb_uri, mongodb_database)
+            logger.info("Connected to MongoDB: %s", mongodb_database)
+            return storage
+        except Exception as e:
+            logger.error("MongoDB connection failed: %s", e)
+            return None
+
+    logger.error("Unknown STORAGE_BACKEND '%s' (expected 'mongo' or 'sqlite')", backend)
+    return None
@@ -0,0 +1,300 @@
+"""
+Conformance and throughput check for the storage backends.
+
+    python storage_check.py sqlite [path]
+    python storage_check.py mongo            # uses MONGODB_URI, writes to a scratch database
+
+Runs the same operations against a fresh store and prints timings, so both
+backends can be compared on the target machine before switching.
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from dotenv import load_dotenv
+
+ADMIN = "check@quizbuzz.local"
+QUIZ = "storage-check"
+OLD_QUIZ = "storage-check-archived"
+LINK = "storage-check-link"
+
+
+def submission(i: int, base: datetime) -> dict:
+    return {
+        "quiz_json_name": QUIZ,
+        "admin_email": ADMIN,
+        "student_name": f"student-{i}",
+        "student_email": f"student-{i}@check.school",
+        "class_name": f"{i % 3 + 6}",
+        "section": "AB"[i % 2],
+        "total_questions": 10,
+        "correct_answers": i % 11,
+        "wrong_answers": 10 - i % 11,
+        "unanswered": 0,
+        "score": float(i % 11 * 10),
+        "percentage": float(i % 11 * 10),
+        "time_spent": "00:05:00",
+        "submitted_at": base.isoformat(),
+        "timestamp": base + timedelta(milliseconds=i // 4),
+        "detailed_results": [{"questionNumber": q, "status": "CORRECT"} for q in range(1, 11)],
+        "answers": [{"questionNumber": q, "selectedOption": 1, "timeSpent": 3, "isMarked": False} for q in range(1, 11)]
+    }
+
+
+def timed(label: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"   {label:<34} {(time.perf_counter() - started) * 1000:9.1f} ms")
+    return result
+
+
+def check_admins(storage):
+    plan = {"_id": ObjectId(), "name": "check", "student_limit": 30, "max_students": 30}
+    plan_id = storage.save_plan(plan)
+    admin_id = storage.save_admin({"email": ADMIN, "name": "Check", "password_hash": b"hash",
+                                   "plan_id": plan["_id"], "is_active": True})
+    admin = storage.get_admin_by_email(ADMIN)
+    assert str(admin["_id"]) == admin_id and str(storage.get_admin_by_id(admin_id)["_id"]) == admin_id
+    assert storage.get_admin_by_id("missing") is None
+    assert storage.get_plan(admin["plan_id"])["student_limit"] == 30 and str(plan["_id"]) == plan_id
+
+
+def check_submissions(storage, base: datetime, count: int, workers: int) -> list:
+    with ThreadPoolExecutor(workers) as pool:
+        ids = timed(f"{count} concurrent inserts", lambda: list(pool.map(storage.insert_submission, (submission(i, base) for i in range(count)))))
+    assert len(set(ids)) == count, "submission ids must be unique"
+    assert storage.count_submissions(ADMIN, QUIZ) == count
+
+    # Keyset pages must cover every row exactly once, newest first
+    def walk():
+        seen, after = [], None
+        while True:
+            page = storage.list_submission_summaries(ADMIN, QUIZ, 50, after=after)
+            if not page:
+                return seen
+            seen.extend(page)
+            after = (page[-1]["timestamp"], str(page[-1]["_id"]))
+    rows = timed("keyset walk, 50 per page", walk)
+    assert len({str(r["_id"]) for r in rows}) == count
+    assert all((a["timestamp"], str(a["_id"])) > (b["timestamp"], str(b["_id"])) for a, b in zip(rows, rows[1:]))
+    assert "detailed_results" not in rows[0]
+    assert [r["_id"] for r in storage.list_submission_summaries(ADMIN, QUIZ, 50, skip=50)] == [r["_id"] for r in rows[50:100]]
+
+    # A second, older quiz; outbox deliveries of the same ids are skipped the second time
+    older = [dict(submission(i, base - timedelta(days=30)), quiz_json_name=OLD_QUIZ, _id=str(ObjectId())) for i in range(20)]
+    assert storage.deliver_submissions(older[:10]) == [True] * 10
+    assert storage.deliver_submissions(older) == [False] * 10 + [True] * 10
+    extra = storage.insert_submissions([dict(submission(i, base), link_id=LINK) for i in range(count, count + 5)])
+    assert len(extra) == 5 and len(list(storage.iter_link_submissions(LINK))) == 5
+
+    groups, quizzes = timed("quiz groups", lambda: storage.quiz_groups(ADMIN, 10))
+    assert [g["quiz_name"] for g in groups] == [QUIZ, OLD_QUIZ] and quizzes == 2
+    assert groups[0]["total_submissions"] == count + 5 and groups[1]["total_submissions"] == 20
+    after = (groups[0]["latest_submission"], groups[0]["quiz_name"])
+    assert [g["quiz_name"] for g in storage.quiz_groups(ADMIN, 10, after=after)[0]] == [OLD_QUIZ]
+    assert [g["quiz_name"] for g in storage.quiz_groups(ADMIN, 10, skip=1)[0]] == [OLD_QUIZ]
+    assert sorted(storage.submission_quiz_names(ADMIN)) == sorted([QUIZ, OLD_QUIZ])
+    overview, total = storage.submission_overview()
+    assert total == count + 25 and {g["_id"] for g in overview} == {QUIZ, OLD_QUIZ}
+
+    doc = timed("single submission", lambda: storage.get_submission(ids[0]))
+    assert len(doc["detailed_results"]) == 10
+
+    answers = timed("stream answers for rescoring", lambda: list(storage.iter_submission_answers(ADMIN, QUIZ, batch_size=500)))
+    assert len(answers) == count + 5
+    assert all(str(a["_id"]) < str(b["_id"]) for a, b in zip(answers, answers[1:]))
+    resumed = list(storage.iter_submission_answers(ADMIN, QUIZ, after_id=answers[99]["_id"], batch_size=500))
+    assert [a["_id"] for a in resumed] == [a["_id"] for a in answers[100:]]
+    timed("batched update of all rows", lambda: storage.update_submissions([(a["_id"], {"correct_answers": 0, "quiz_version": "check"}) for a in answers]))
+    assert storage.get_submission(ids[0])["correct_answers"] == 0
+
+    # Archiving: only the older quiz is due, oldest first, and deleted rows are gone
+    cutoff = base - timedelta(days=1)
+    assert storage.archive_candidates(cutoff) == [(ADMIN, OLD_QUIZ)]
+    due = storage.find_submissions_before(ADMIN, OLD_QUIZ, cutoff, 100)
+    assert len(due) == 20 and storage.delete_submissions([d["_id"] for d in due]) == 20
+    assert storage.count_submissions(ADMIN, OLD_QUIZ) == 0 and storage.archive_candidates(cutoff) == []
+    return ids
+
+
+def check_exam_sessions(storage, base: datetime):
+    exam_id = f"exam-{base.timestamp():.0f}"
+    storage.insert_exam_sessions([{"exam_id": exam_id, "admin_email": ADMIN, "students": [], "total_students": 0,
+                                   "created_at": base.isoformat()}])
+    assert storage.push_exam_student(exam_id, {"name": "s1", "score": 50.0})
+    assert not storage.push_exam_student("missing", {"name": "s1"})
+    session = storage.get_exam_session(exam_id)
+    assert session["total_students"] == 1 and session["students"][0]["name"] == "s1"
+    assert [s["exam_id"] for s in storage.list_exam_sessions(ADMIN)] == [exam_id]
+    assert exam_id in [s["exam_id"] for s in storage.list_exam_sessions()]
+
+
+def new_link(storage, link_id: str, max_allowed: int):
+    storage.insert_links([{"link_id": link_id, "admin_email": ADMIN, "quiz_id": QUIZ, "max_allowed": max_allowed,
+                           "current_count": 0, "reserved": 0, "students": [], "score_total": 0.0}])
+
+
+def check_links(storage, workers: int):
+    # Link slots: concurrent claims must never exceed the limit or repeat a student
+    new_link(storage, LINK, 25)
+    students = [{"id": f"s{i % 40}", "name": f"s{i % 40}"} for i in range(80)]
+    with ThreadPoolExecutor(workers) as pool:
+        claims = timed("80 concurrent link claims", lambda: list(pool.map(lambda s: storage.claim_link_slot(LINK, s, 50.0)[0], students)))
+    link = storage.get_link(LINK)
+    assert sum(claims) == 25 and link["current_count"] == 25
+    assert len({s["id"] for s in link["students"]}) == 25
+    assert storage.get_link("missing") is None
+
+
+def attempt(link_id: str, i: int, deadline: datetime) -> dict:
+    return {"_id": f"{link_id}:a{i}", "link_id": link_id, "student_id": f"a{i}", "name": f"a{i}", "class_name": "6",
+            "section": "A", "status": "open", "started_at": deadline - timedelta(minutes=30), "deadline": deadline,
+            "progress": None, "saved_at": None}
+
+
+def check_attempts(storage, base: datetime, workers: int):
+    # Slot reservations: 40 starts of 20 students race for 10 slots; repeats return the stored attempt
+    link_id = f"{LINK}-timed"
+    new_link(storage, link_id, 10)
+    starts = [attempt(link_id, i % 20, base + timedelta(minutes=i % 20)) for i in range(40)]
+    with ThreadPoolExecutor(workers) as pool:
+        started = timed("40 concurrent attempt starts", lambda: list(pool.map(storage.start_attempt, starts)))
+    held = {a["_id"] for a in started if a is not None}
+    link = storage.get_link(link_id)
+    assert len(held) == 10 and link["reserved"] == 10 and link["current_count"] == 0
+    assert storage.start_attempt(attempt(link_id, 99, base)) is None
+    first = sorted(held)[0]
+    assert storage.start_attempt(dict(storage.get_attempt(first), status="open"))["_id"] == first
+    assert storage.get_link(link_id)["reserved"] == 10
+
+    assert storage.save_attempt_progress(first, {"answers": [], "shuffled": False}, base)
+    assert storage.get_attempt(first)["progress"] == {"answers": [], "shuffled": False}
+
+    # Concurrent finalizers claiming overlapping batches: each attempt is claimed exactly once
+    due = storage.find_attempts("open", due_before=base + timedelta(hours=1))
+    assert len(due) == 10 and all(a["deadline"] <= b["deadline"] for a, b in zip(due, due[1:]))
+    assert len(storage.find_attempts("open", limit=3)) == 3
+    ids = [a["_id"] for a in due]
+    with ThreadPoolExecutor(workers) as pool:
+        batches = timed("8 concurrent attempt claims", lambda: list(pool.map(
+            lambda k: storage.claim_attempts(ids[k:] + ids[:k], "finalizing"), range(8))))
+    claimed = [a["_id"] for batch in batches for a in batch]
+    assert sorted(claimed) == sorted(ids)
+    assert not storage.save_attempt_progress(first, {"answers": []}, base)
+
+    # Stuck claims are retaken only once their claimed_at is old enough
+    assert storage.claim_attempts(ids, "finalizing", current="finalizing", claimed_before=base - timedelta(days=1)) == []
+    retaken = storage.claim_attempts(ids[:2], "finalizing", current="finalizing", claimed_before=datetime.utcnow() + timedelta(seconds=1))
+    assert len(retaken) == 2
+    assert len(storage.find_attempts("finalizing", claimed_before=datetime.utcnow() + timedelta(seconds=1))) == 10
+
+    # Closing converts the reservations; a retried batch and students without one leave reserved at zero
+    storage.set_attempts_status(ids, "finalized")
+    assert storage.find_attempts("finalizing") == [] and len(storage.find_attempts("finalized")) == 10
+    students = [{"id": a["student_id"], "name": a["name"]} for a in due]
+    storage.record_link_students(link_id, students, [10.0] * 10)
+    storage.record_link_students(link_id, students + [{"id": "late", "name": "late"}], [10.0] * 11)
+    link = storage.get_link(link_id)
+    assert link["current_count"] == 11 and link["reserved"] == 0 and len(link["students"]) == 11
+    assert link["score_total"] == 110.0
+
+
+def check_rollups(storage):
+    key = {"admin_email": ADMIN, "quiz_name": QUIZ, "class_name": "6", "section": "A"}
+    storage.increment_class_rollup(key, 80.0, 8)
+    storage.increment_class_rollup(key, 40.0, 4)
+    (rollup,) = storage.find_class_rollups(ADMIN, QUIZ, "6")
+    assert (rollup["count"], rollup["sum"], rollup["min"], rollup["max"]) == (2, 120.0, 40.0, 80.0)
+    assert rollup["histogram"] == {"8": 1, "4": 1}
+
+    groups = list(timed("class rollup groups", lambda: list(storage.class_rollup_groups(ADMIN, QUIZ, 10.0, 10))))
+    rebuilt = {}
+    for g in groups:
+        r = rebuilt.setdefault((g["class_name"], g["section"]), dict(key, class_name=g["class_name"], section=g["section"],
+                               count=0, sum=0.0, sum_sq=0.0, min=g["min"], max=g["max"], histogram={}))
+        r["count"] += g["count"]
+        r["sum"] += g["sum"]
+        r["sum_sq"] += g["sum_sq"]
+        r["min"], r["max"] = min(r["min"], g["min"]), max(r["max"], g["max"])
+        r["histogram"][str(g["bucket"])] = g["count"]
+    assert sum(r["count"] for r in rebuilt.values()) == storage.count_submissions(ADMIN, QUIZ)
+    storage.replace_class_rollups(ADMIN, QUIZ, list(rebuilt.values()))
+    assert len(storage.find_class_rollups(ADMIN, QUIZ)) == len(rebuilt) == 6
+
+
+def check_rescore_jobs(storage):
+    job = {"_id": str(ObjectId()), "admin_email": ADMIN, "quiz_name": QUIZ, "quiz_version": "v1",
+           "status": "pending", "processed": 0, "changed": 0, "last_id": None}
+    storage.insert_rescore_job(job)
+    assert storage.find_unfinished_rescore_job(ADMIN, QUIZ, "v1", ["pending", "running"])["_id"] == job["_id"]
+    assert storage.find_unfinished_rescore_job(ADMIN, QUIZ, "v2", ["pending", "running"]) is None
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: storage.update_rescore_job(job["_id"], {"status": "running"}, {"processed": 5}), range(8)))
+    stored = storage.get_rescore_job(job["_id"], ADMIN)
+    assert stored["processed"] == 40 and stored["status"] == "running"
+    assert storage.get_rescore_job(job["_id"], "other@quizbuzz.local") is None
+
+
+def check_time_sketches(storage, base: datetime):
+    for worker in ("w1", "w2"):
+        storage.save_time_sketch(ADMIN, QUIZ, "v1", worker, {"total": {"means": [1.0]}}, base)
+    storage.save_time_sketch(ADMIN, QUIZ, "v1", "w1", {"total": {"means": [2.0]}}, base)
+    rows = sorted(storage.find_time_sketches(ADMIN, QUIZ, "v1"), key=lambda r: r["worker_id"])
+    assert [(r["worker_id"], r["sketch"]["total"]["means"]) for r in rows] == [("w1", [2.0]), ("w2", [1.0])]
+    assert storage.find_time_sketches(ADMIN, QUIZ, "v2") == []
+
+
+def check_collusion_reports(storage):
+    storage.save_collusion_report(LINK, ADMIN, {"pairs": [], "students": 1})
+    storage.save_collusion_report(LINK, ADMIN, {"pairs": [], "students": 2})
+    assert storage.get_collusion_report(LINK)["students"] == 2
+    assert storage.get_collusion_report("missing") is None
+
+
+def check(storage, count: int = 2000, workers: int = 16):
+    """Every Storage method, including the concurrent slot claims, attempt reservations and attempt claims"""
+    print(f"🔍 Checking {storage.name} storage with {count} submissions")
+    storage.ensure_indexes()
+    base = datetime.utcnow().replace(microsecond=0)
+
+    check_admins(storage)
+    check_submissions(storage, base, count, workers)
+    check_exam_sessions(storage, base)
+    check_links(storage, workers)
+    check_attempts(storage, base, workers)
+    check_rollups(storage)
+    check_rescore_jobs(storage)
+    check_time_sketches(storage, base)
+    check_collusion_reports(storage)
+
+    print(f"✅ {storage.name} storage passed")
+
+
+def main():
+    load_dotenv()
+    backend = sys.argv[1] if len(sys.argv) > 1 else "sqlite"
+
+    if backend == "sqlite":
+        from storage_sqlite import SQLiteStorage
+        path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(), "check.db")
+        storage = SQLiteStorage(path)
+    elif backend == "mongo":
+        from storage_mongo import MongoStorage
+        storage = MongoStorage.connect(os.environ["MONGODB_URI"], f"quizbuzz_storage_check_{int(time.time())}")
+    else:
+        sys.exit(f"Unknown backend '{backend}'")
+
+    try:
+        check(storage)
+    finally:
+        if backend == "mongo":
+            storage.client.drop_database(storage.db.name)
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,494 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from storage import Storage, Cursor
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Scalar fields read by the submission list endpoints. detailed_results and
+# answers dominate document size, so they are only loaded for a single submission.
+SUBMISSION_SUMMARY_PROJECTION = {
+    "student_name": 1,
+    "student_email": 1,
+    "score": 1,
+    "percentage": 1,
+    "time_spent": 1,
+    "submitted_at": 1,
+    "timestamp": 1,
+    "total_questions": 1,
+    "correct_answers": 1,
+    "wrong_answers": 1,
+    "unanswered": 1,
+    "time_spent_seconds": 1
+}
+
+
+def _object_id(value) -> Optional[ObjectId]:
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+def _keyset_match(sort_field: str, after: Cursor, id_value) -> Dict:
+    """Match rows strictly after the cursor in (sort_field desc, _id desc) order"""
+    return {"$or": [
+        {sort_field: {"$lt": after[0]}},
+        {sort_field: after[0], "_id": {"$lt": id_value}}
+    ]}
+
+
+class MongoStorage(Storage):
+    """Storage on MongoDB. Exam sessions share exam_submissions with submissions, as before."""
+
+    name = "mongo"
+
+    def __init__(self, db, client: Optional[MongoClient] = None):
+        self.db = db
+        self.client = client
+
+    @classmethod
+    def connect(cls, uri: str, database: str) -> "MongoStorage":
+        client = MongoClient(uri)
+        return cls(client[database], client)
+
+    def ensure_indexes(self):
+        self.db.exam_submissions.create_index([
+            ("admin_email", ASCENDING),
+            ("quiz_json_name", ASCENDING),
+            ("timestamp", DESCENDING),
+            ("_id", DESCENDING)
+        ])
+        self.db.exam_submissions.create_index("exam_id", sparse=True)
+        self.db.exam_submissions.create_index("link_id", sparse=True)
+        self.db.quiz_links.create_index("link_id", unique=True)
+        self.db.class_rollups.create_index([
+            ("admin_email", ASCENDING),
+            ("quiz_name", ASCENDING),
+            ("class_name", ASCENDING),
+            ("section", ASCENDING)
+        ], unique=True)
+        self.db.rescore_jobs.create_index([("admin_email", ASCENDING), ("quiz_name", ASCENDING)])
+        self.db.exam_attempts.create_index([("status", ASCENDING), ("deadline", ASCENDING)])
+        self.db.time_sketches.create_index([
+            ("admin_email", ASCENDING),
+            ("quiz_name", ASCENDING),
+            ("quiz_version", ASCENDING),
+            ("worker_id", ASCENDING)
+        ], unique=True)
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+
+    # Admins and plans
+
+    def get_admin_by_email(self, email: str) -> Optional[Dict]:
+        return self.db.admin_users.find_one({"email": email})
+
+    def get_admin_by_id(self, admin_id: str) -> Optional[Dict]:
+        oid = _object_id(admin_id)
+        return self.db.admin_users.find_one({"_id": oid}) if oid else None
+
+    def get_plan(self, plan_id) -> Optional[Dict]:
+        return self.db.plans.find_one({"_id": plan_id})
+
+    def save_plan(self, plan: Dict) -> str:
+        return str(self.db.plans.insert_one(plan).inserted_id)
+
+    def save_admin(self, admin: Dict) -> str:
+        return str(self.db.admin_users.insert_one(admin).inserted_id)
+
+    # Submissions
+
+    def insert_submission(self, doc: Dict) -> str:
+        return str(self.db.exam_submissions.insert_one(doc).inserted_id)
+
+    def insert_submissions(self, docs: List[Dict]) -> List[str]:
+        if not docs:
+            return []
+        return [str(i) for i in self.db.exam_submissions.insert_many(docs, ordered=False).inserted_ids]
+
+    def deliver_submissions(self, docs: List[Dict]) -> List[bool]:
+        if not docs:
+            return []
+        for doc in docs:
+            doc["_id"] = _object_id(doc["_id"]) or doc["_id"]
+        inserted = [True] * len(docs)
+        try:
+            self.db.exam_submissions.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") != DUPLICATE_KEY_ERROR:
+                    raise
+                inserted[error["index"]] = False
+        return inserted
+
+    def get_submission(self, submission_id: str) -> Optional[Dict]:
+        oid = _object_id(submission_id)
+        return self.db.exam_submissions.find_one({"_id": oid}) if oid else None
+
+    def list_submission_summaries(self, admin_email: str, quiz_name: str, limit: int,
+                                  after: Optional[Cursor] = None, skip: int = 0) -> List[Dict]:
+        query = {"quiz_json_name": quiz_name, "admin_email": admin_email}
+        if after:
+            query.update(_keyset_match("timestamp", after, _object_id(after[1])))
+
+        find = self.db.exam_submissions.find(query, SUBMISSION_SUMMARY_PROJECTION).sort([("timestamp", DESCENDING), ("_id", DESCENDING)])
+        if skip:
+            find = find.skip(skip)
+        return list(find.limit(limit))
+
+    def count_submissions(self, admin_email: str, quiz_name: str) -> int:
+        return self.db.exam_submissions.count_documents({"quiz_json_name": quiz_name, "admin_email": admin_email})
+
+    def submission_quiz_names(self, admin_email: str) -> List[str]:
+        return list(self.db.exam_submissions.distinct("quiz_json_name", {"admin_email": admin_email}))
+
+    def quiz_groups(self, admin_email: str, limit: int, after: Optional[Cursor] = None,
+                    skip: int = 0) -> Tuple[List[Dict], int]:
+        # $sort + $first in listing index order runs as a DISTINCT_SCAN: one index key per quiz
+        latest = [group for group in self.db.exam_submissions.aggregate([
+            {"$match": {"admin_email": admin_email}},
+            {"$sort": {"admin_email": ASCENDING, "quiz_json_name": ASCENDING, "timestamp": DESCENDING}},
+            {"$group": {"_id": "$quiz_json_name", "latest_submission": {"$first": "$timestamp"}}}
+        ]) if group["_id"] is not None]  # exam session documents have no quiz_json_name
+        ordered = sorted(((group["latest_submission"], group["_id"]) for group in latest), reverse=True)
+        if after:
+            ordered = [key for key in ordered if key < (after[0], after[1])]
+        else:
+            ordered = ordered[skip:]
+        page = ordered[:limit]
+        if not page:
+            return [], len(latest)
+
+        # Only the page's quizzes are aggregated, each over its own range of the index
+        stats = {group["_id"]: group for group in self.db.exam_submissions.aggregate([
+            {"$match": {"admin_email": admin_email, "quiz_json_name": {"$in": [name for _, name in page]}}},
+            {"$group": {
+                "_id": "$quiz_json_name",
+                "total_submissions": {"$sum": 1},
+                "average_score": {"$avg": "$score"},
+                "first_submission": {"$min": "$timestamp"}
+            }}
+        ])}
+        groups = [{
+            "quiz_name": name,
+            "total_submissions": stats[name]["total_submissions"],
+            "latest_submission": latest_ts,
+            "first_submission": stats[name]["first_submission"],
+            "average_score": stats[name]["average_score"]
+        } for latest_ts, name in page]
+        return groups, len(latest)
+
+    def submission_overview(self) -> Tuple[List[Dict], int]:
+        pipeline = [
+            {
+                "$group": {
+                    "_id": "$quiz_json_name",
+                    "count": {"$sum": 1},
+                    "latest": {"$max": "$timestamp"}
+                }
+            },
+            {"$sort": {"latest": -1}}
+        ]
+        return list(self.db.exam_submissions.aggregate(pipeline)), self.db.exam_submissions.count_documents({})
+
+    def archive_candidates(self, cutoff: datetime) -> List[Tuple[str, str]]:
+        pipeline = [
+            {"$match": {"timestamp": {"$lt": cutoff}}},
+            {"$group": {"_id": {"admin_email": "$admin_email", "quiz_name": "$quiz_json_name"}}}
+        ]
+        return [(g["_id"]["admin_email"], g["_id"]["quiz_name"]) for g in self.db.exam_submissions.aggregate(pipeline)]
+
+    def find_submissions_before(self, admin_email: str, quiz_name: str, cutoff: datetime, limit: int) -> List[Dict]:
+        query = {"admin_email": admin_email, "quiz_json_name": quiz_name, "timestamp": {"$lt": cutoff}}
+        return list(self.db.exam_submissions.find(query).sort([("timestamp", ASCENDING), ("_id", ASCENDING)]).limit(limit))
+
+    def delete_submissions(self, submission_ids: List[str]) -> int:
+        oids = [oid for oid in map(_object_id, submission_ids) if oid]
+        if not oids:
+            return 0
+        return self.db.exam_submissions.delete_many({"_id": {"$in": oids}}).deleted_count
+
+    def iter_submission_answers(self, admin_email: str, quiz_name: str, after_id: Optional[str] = None,
+                                batch_size: int = 500) -> Iterator[Dict]:
+        query = {"quiz_json_name": quiz_name, "admin_email": admin_email, "answers": {"$exists": True}}
+        if after_id is not None:
+            query["_id"] = {"$gt": _object_id(after_id)}
+
+        cursor = self.db.exam_submissions.find(query, {"answers": 1, "correct_answers": 1}).sort("_id", 1).batch_size(batch_size)
+        for doc in cursor:
+            doc["_id"] = str(doc["_id"])
+            yield doc
+
+    def update_submissions(self, updates: List[Tuple[str, Dict]]):
+        ops = [UpdateOne({"_id": _object_id(submission_id)}, {"$set": fields}) for submission_id, fields in updates]
+        if ops:
+            self.db.exam_submissions.bulk_write(ops, ordered=False)
+
+    def iter_link_submissions(self, link_id: str) -> Iterator[Dict]:
+        projection = {"student_name": 1, "class_name": 1, "section": 1, "answers": 1}
+        for doc in self.db.exam_submissions.find({"link_id": link_id, "answers": {"$exists": True}}, projection):
+            doc["_id"] = str(doc["_id"])
+            yield doc
+
+    # Exam sessions
+
+    def insert_exam_sessions(self, sessions: List[Dict]):
+        if sessions:
+            self.db.exam_submissions.insert_many(sessions)
+
+    def push_exam_student(self, exam_id: str, student_data: Dict) -> bool:
+        result = self.db.exam_submissions.update_one(
+            {"exam_id": exam_id},
+            {
+                "$push": {"students": student_data},
+                "$inc": {"total_students": 1}
+            }
+        )
+        return result.modified_count > 0
+
+    def list_exam_sessions(self, admin_email: Optional[str] = None) -> List[Dict]:
+        query = {"exam_id": {"$exists": True}}
+        if admin_email:
+            query["admin_email"] = admin_email
+        return list(self.db.exam_submissions.find(query).sort("created_at", -1))
+
+    def get_exam_session(self, exam_id: str) -> Optional[Dict]:
+        return self.db.exam_submissions.find_one({"exam_id": exam_id})
+
+    # Quiz links
+
+    def insert_links(self, links: List[Dict]):
+        if links:
+            # insert_many adds _id to the caller's dicts; keep those clean
+            self.db.quiz_links.insert_many([dict(link) for link in links])
+
+    def get_link(self, link_id: str) -> Optional[Dict]:
+        return self.db.quiz_links.find_one({"link_id": link_id}, {"_id": 0})
+
+    def claim_link_slot(self, link_id: str, student: Dict, score: float) -> Tuple[bool, Optional[Dict]]:
+        result = self.db.quiz_links.update_one(
+            {
+                "link_id": link_id,
+                "students.id": {"$ne": student["id"]},
+                "$expr": {"$lt": [{"$add": ["$current_count", {"$ifNull": ["$reserved", 0]}]}, "$max_allowed"]}
+            },
+            {
+                "$push": {"students": student},
+                "$inc": {"current_count": 1, "score_total": score}
+            }
+        )
+        return result.modified_count > 0, self.get_link(link_id)
+
+    def record_link_students(self, link_id: str, students: List[Dict], scores: List[float]):
+        # Per student, two conditional updates in one ordered request: the first converts a
+        # reservation, the second (links from before reservations, reserved already 0) only
+        # counts. Whichever applies adds the student, so the other's students.id filter fails:
+        # reserved never goes below zero, as on SQLite
+        ops = []
+        for student, score in zip(students, scores):
+            new = {"link_id": link_id, "students.id": {"$ne": student["id"]}}
+            ops += [
+                UpdateOne(dict(new, reserved={"$gt": 0}), {
+                    "$push": {"students": student},
+                    "$inc": {"current_count": 1, "reserved": -1, "score_total": score}
+                }),
+                UpdateOne(new, {
+                    "$push": {"students": student},
+                    "$inc": {"current_count": 1, "score_total": score}
+                })
+            ]
+        if ops:
+            self.db.quiz_links.bulk_write(ops, ordered=True)
+
+    # Exam attempts
+
+    def start_attempt(self, attempt: Dict) -> Optional[Dict]:
+        existing = self.get_attempt(attempt["_id"])
+        if existing is not None:
+            return existing
+        # Reserve first: a failed insert gives the slot back, and a crash in between leaves it
+        # held rather than a student past the limit
+        reserved = self.db.quiz_links.update_one(
+            {
+                "link_id": attempt["link_id"],
+                "students.id": {"$ne": attempt["student_id"]},
+                "$expr": {"$lt": [{"$add": ["$current_count", {"$ifNull": ["$reserved", 0]}]}, "$max_allowed"]}
+            },
+            {"$inc": {"reserved": 1}}
+        )
+        if not reserved.modified_count:
+            return None
+        try:
+            before = self.db.exam_attempts.find_one_and_update(
+                {"_id": attempt["_id"]},
+                {"$setOnInsert": {k: v for k, v in attempt.items() if k != "_id"}},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except Exception:
+            self.db.quiz_links.update_one({"link_id": attempt["link_id"]}, {"$inc": {"reserved": -1}})
+            raise
+        if before is not None:
+            # A concurrent start of the same attempt inserted it first and holds the slot
+            self.db.quiz_links.update_one({"link_id": attempt["link_id"]}, {"$inc": {"reserved": -1}})
+            return before
+        return self.get_attempt(attempt["_id"])
+
+    def get_attempt(self, attempt_id: str) -> Optional[Dict]:
+        return self.db.exam_attempts.find_one({"_id": attempt_id})
+
+    def save_attempt_progress(self, attempt_id: str, progress: Dict, saved_at: datetime) -> bool:
+        result = self.db.exam_attempts.update_one(
+            {"_id": attempt_id, "status": "open"},
+            {"$set": {"progress": progress, "saved_at": saved_at}}
+        )
+        return result.matched_count > 0
+
+    def claim_attempts(self, attempt_ids: List[str], status: str, current: str = "open",
+                       claimed_before: Optional[datetime] = None) -> List[Dict]:
+        # Tag the claimed attempts with a token, then read back exactly those
+        token = str(ObjectId())
+        query = {"_id": {"$in": attempt_ids}, "status": current}
+        if claimed_before is not None:
+            query["claimed_at"] = {"$not": {"$gte": claimed_before}}
+        self.db.exam_attempts.update_many(
+            query,
+            {"$set": {"status": status, "claim": token, "claimed_at": datetime.utcnow()}}
+        )
+        return list(self.db.exam_attempts.find({"claim": token}))
+
+    def set_attempts_status(self, attempt_ids: List[str], status: str):
+        self.db.exam_attempts.update_many({"_id": {"$in": attempt_ids}}, {"$set": {"status": status}})
+
+    def find_attempts(self, status: str, due_before: Optional[datetime] = None,
+                      claimed_before: Optional[datetime] = None, limit: int = 0) -> List[Dict]:
+        query = {"status": status}
+        if due_before is not None:
+            query["deadline"] = {"$lt": due_before}
+        if claimed_before is not None:
+            query["claimed_at"] = {"$not": {"$gte": claimed_before}}
+        return list(self.db.exam_attempts.find(query).sort("deadline", ASCENDING).limit(limit))
+
+    # Class rollups
+
+    def increment_class_rollup(self, key: Dict, percentage: float, bucket: int):
+        self.db.class_rollups.update_one(key, {
+            "$inc": {
+                "count": 1,
+                "sum": percentage,
+                "sum_sq": percentage * percentage,
+                f"histogram.{bucket}": 1
+            },
+            "$min": {"min": percentage},
+            "$max": {"max": percentage}
+        }, upsert=True)
+
+    def find_class_rollups(self, admin_email: str, quiz_name: Optional[str] = None,
+                           class_name: Optional[str] = None) -> List[Dict]:
+        query = {"admin_email": admin_email}
+        if quiz_name:
+            query["quiz_name"] = quiz_name
+        if class_name:
+            query["class_name"] = class_name
+        return list(self.db.class_rollups.find(query, {"_id": 0}).sort([("quiz_name", 1), ("class_name", 1), ("section", 1)]))
+
+    def class_rollup_groups(self, admin_email: str, quiz_name: Optional[str], bucket_width: float,
+                            buckets: int) -> Iterator[Dict]:
+        match = {"admin_email": admin_email, "class_name": {"$exists": True}, "section": {"$exists": True}}
+        if quiz_name:
+            match["quiz_json_name"] = quiz_name
+        percentage = {"$ifNull": ["$percentage", 0]}
+
+        pipeline = [
+            {"$match": match},
+            {"$project": {"quiz_json_name": 1, "class_name": 1, "section": 1, "percentage": 1}},
+            {"$group": {
+                "_id": {
+                    "quiz_name": "$quiz_json_name",
+                    "class_name": "$class_name",
+                    "section": "$section",
+                    "bucket": {"$min": [{"$floor": {"$divide": [percentage, bucket_width]}}, buckets - 1]}
+                },
+                "count": {"$sum": 1},
+                "sum": {"$sum": percentage},
+                "sum_sq": {"$sum": {"$multiply": [percentage, percentage]}},
+                "min": {"$min": "$percentage"},
+                "max": {"$max": "$percentage"}
+            }}
+        ]
+        for group in self.db.exam_submissions.aggregate(pipeline):
+            row = group.pop("_id")
+            row.update(group)
+            row["bucket"] = int(max(row["bucket"], 0))
+            yield row
+
+    def replace_class_rollups(self, admin_email: str, quiz_name: Optional[str], rollups: List[Dict]):
+        scope = {"admin_email": admin_email}
+        if quiz_name:
+            scope["quiz_name"] = quiz_name
+        self.db.class_rollups.delete_many(scope)
+        if rollups:
+            self.db.class_rollups.insert_many([dict(r) for r in rollups])
+
+    # Rescore jobs
+
+    def insert_rescore_job(self, job: Dict):
+        self.db.rescore_jobs.insert_one(job)
+
+    def get_rescore_job(self, job_id: str, admin_email: Optional[str] = None) -> Optional[Dict]:
+        query = {"_id": job_id}
+        if admin_email:
+            query["admin_email"] = admin_email
+        return self.db.rescore_jobs.find_one(query)
+
+    def find_unfinished_rescore_job(self, admin_email: str, quiz_name: str, quiz_version: str,
+                                    statuses: List[str]) -> Optional[Dict]:
+        return self.db.rescore_jobs.find_one({
+            "admin_email": admin_email,
+            "quiz_name": quiz_name,
+            "quiz_version": quiz_version,
+            "status": {"$in": statuses}
+        })
+
+    def update_rescore_job(self, job_id: str, set_fields: Optional[Dict] = None, inc_fields: Optional[Dict] = None):
+        update = {}
+        if set_fields:
+            update["$set"] = set_fields
+        if inc_fields:
+            update["$inc"] = inc_fields
+        if update:
+            self.db.rescore_jobs.update_one({"_id": job_id}, update)
+
+    # Time-spent sketches
+
+    def save_time_sketch(self, admin_email: str, quiz_name: str, quiz_version: str, worker_id: str,
+                         sketch: Dict, updated_at: datetime):
+        self.db.time_sketches.update_one(
+            {"admin_email": admin_email, "quiz_name": quiz_name, "quiz_version": quiz_version, "worker_id": worker_id},
+            {"$set": {"sketch": sketch, "updated_at": updated_at}},
+            upsert=True
+        )
+
+    def find_time_sketches(self, admin_email: str, quiz_name: str, quiz_version: str) -> List[Dict]:
+        return list(self.db.time_sketches.find(
+            {"admin_email": admin_email, "quiz_name": quiz_name, "quiz_version": quiz_version},
+            {"_id": 0, "worker_id": 1, "sketch": 1, "updated_at": 1}
+        ))
+
+    # Collusion reports
+
+    def save_collusion_report(self, link_id: str, admin_email: str, report: Dict):
+        self.db.collusion_reports.replace_one({"_id": link_id}, {**report, "admin_email": admin_email}, upsert=True)
+
+    def get_collusion_report(self, link_id: str) -> Optional[Dict]:
+        return self.db.collusion_reports.find_one({"_id": link_id}, {"_id": 0})
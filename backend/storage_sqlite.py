@@ -0,0 +1,825 @@
+import json
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+
+from storage import Storage, Cursor, dump_document, load_document
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+# Submission fields kept in their own columns; everything else (detailed_results,
+# answers, ...) lives in the doc JSON and is only read for a single submission.
+SUBMISSION_SUMMARY_COLUMNS = [
+    "student_name", "student_email", "class_name", "section", "link_id",
+    "score", "percentage", "total_questions", "correct_answers", "wrong_answers",
+    "unanswered", "time_spent", "time_spent_seconds", "submitted_at"
+]
+SUBMISSION_COLUMNS = ["id", "admin_email", "quiz_name", "timestamp"] + SUBMISSION_SUMMARY_COLUMNS + ["doc"]
+# Columns added after the first schema version, migrated in place on open
+SUBMISSION_COLUMN_TYPES = {"time_spent_seconds": "INTEGER"}
+LINK_COLUMN_TYPES = {"reserved": "INTEGER NOT NULL DEFAULT 0"}
+ATTEMPT_COLUMN_TYPES = {"claimed_at": "TEXT"}
+SUBMISSION_DOC_KEYS = {"_id", "admin_email", "quiz_json_name", "timestamp", *SUBMISSION_SUMMARY_COLUMNS}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id TEXT PRIMARY KEY,
+    admin_email TEXT NOT NULL,
+    quiz_name TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    student_name TEXT,
+    student_email TEXT,
+    class_name TEXT,
+    section TEXT,
+    link_id TEXT,
+    score REAL,
+    percentage REAL,
+    total_questions INTEGER,
+    correct_answers INTEGER,
+    wrong_answers INTEGER,
+    unanswered INTEGER,
+    time_spent TEXT,
+    time_spent_seconds INTEGER,
+    submitted_at TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_listing ON submissions (admin_email, quiz_name, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS submissions_link ON submissions (link_id) WHERE link_id IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS exam_sessions (
+    id TEXT PRIMARY KEY,
+    exam_id TEXT NOT NULL,
+    admin_email TEXT,
+    created_at TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS exam_sessions_exam_id ON exam_sessions (exam_id);
+CREATE INDEX IF NOT EXISTS exam_sessions_admin ON exam_sessions (admin_email, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS admin_users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    doc TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS plans (
+    id TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS quiz_links (
+    link_id TEXT PRIMARY KEY,
+    admin_email TEXT NOT NULL,
+    max_allowed INTEGER NOT NULL,
+    current_count INTEGER NOT NULL DEFAULT 0,
+    reserved INTEGER NOT NULL DEFAULT 0,
+    score_total REAL NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quiz_links_admin ON quiz_links (admin_email);
+
+CREATE TABLE IF NOT EXISTS link_students (
+    link_id TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (link_id, student_id)
+);
+
+CREATE TABLE IF NOT EXISTS exam_attempts (
+    id TEXT PRIMARY KEY,
+    link_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    deadline TEXT,
+    claim TEXT,
+    claimed_at TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS exam_attempts_due ON exam_attempts (status, deadline);
+CREATE INDEX IF NOT EXISTS exam_attempts_claim ON exam_attempts (claim) WHERE claim IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS class_rollups (
+    admin_email TEXT NOT NULL,
+    quiz_name TEXT NOT NULL,
+    class_name TEXT NOT NULL,
+    section TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    sum REAL NOT NULL DEFAULT 0,
+    sum_sq REAL NOT NULL DEFAULT 0,
+    min REAL,
+    max REAL,
+    histogram TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (admin_email, quiz_name, class_name, section)
+);
+
+CREATE TABLE IF NOT EXISTS rescore_jobs (
+    id TEXT PRIMARY KEY,
+    admin_email TEXT NOT NULL,
+    quiz_name TEXT NOT NULL,
+    quiz_version TEXT NOT NULL,
+    status TEXT NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rescore_jobs_lookup ON rescore_jobs (admin_email, quiz_name, quiz_version, status);
+
+CREATE TABLE IF NOT EXISTS time_sketches (
+    admin_email TEXT NOT NULL,
+    quiz_name TEXT NOT NULL,
+    quiz_version TEXT NOT NULL,
+    worker_id TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    sketch TEXT NOT NULL,
+    PRIMARY KEY (admin_email, quiz_name, quiz_version, worker_id)
+);
+
+CREATE TABLE IF NOT EXISTS collusion_reports (
+    link_id TEXT PRIMARY KEY,
+    admin_email TEXT NOT NULL,
+    doc TEXT NOT NULL
+);
+"""
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=_json_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def _ts(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime(TIMESTAMP_FORMAT) if value else None
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    return datetime.strptime(value, TIMESTAMP_FORMAT) if value else None
+
+
+class _GroupCommitWriter:
+    """
+    Single writer thread for submission inserts. Whatever is queued when it
+    wakes is written in one transaction, so concurrent submits share a commit
+    instead of queueing for the write lock one by one.
+    """
+
+    def __init__(self, storage: "SQLiteStorage", max_batch: int = 256):
+        self.storage = storage
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="sqlite-group-commit", daemon=True)
+        self._thread.start()
+
+    def write(self, rows: List[tuple]):
+        done = threading.Event()
+        item = {"rows": rows, "done": done, "error": None}
+        self._queue.put(item)
+        done.wait()
+        if item["error"] is not None:
+            raise item["error"]
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        conn = self.storage._connect()
+        placeholders = ", ".join("?" for _ in SUBMISSION_COLUMNS)
+        sql = f"INSERT INTO submissions ({', '.join(SUBMISSION_COLUMNS)}) VALUES ({placeholders})"
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._queue.put(None)
+                    break
+                batch.append(nxt)
+
+            try:
+                with conn:
+                    conn.executemany(sql, [row for entry in batch for row in entry["rows"]])
+            except Exception:
+                # One bad row must not fail its neighbours: retry each entry on its own
+                for entry in batch:
+                    try:
+                        with conn:
+                            conn.executemany(sql, entry["rows"])
+                    except Exception as e:
+                        entry["error"] = e
+            for entry in batch:
+                entry["done"].set()
+        conn.close()
+
+
+class SQLiteStorage(Storage):
+    """Embedded storage for single-node installs: one SQLite file in WAL mode"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+        self._writer = _GroupCommitWriter(self)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """Add columns introduced after a database file was created"""
+        for table, column_types in (("submissions", SUBMISSION_COLUMN_TYPES), ("quiz_links", LINK_COLUMN_TYPES),
+                                    ("exam_attempts", ATTEMPT_COLUMN_TYPES)):
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in column_types.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # One connection per thread; sync endpoints run on a threadpool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def close(self):
+        self._writer.close()
+
+    # Admins and plans
+
+    @staticmethod
+    def _doc(row, **extra) -> Optional[Dict]:
+        if row is None:
+            return None
+        doc = json.loads(row["doc"])
+        doc.update(extra)
+        return doc
+
+    def get_admin_by_email(self, email: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT id, doc FROM admin_users WHERE email = ?", (email,)).fetchone()
+        return self._doc(row, _id=row["id"]) if row else None
+
+    def get_admin_by_id(self, admin_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT id, doc FROM admin_users WHERE id = ?", (str(admin_id),)).fetchone()
+        return self._doc(row, _id=row["id"]) if row else None
+
+    def get_plan(self, plan_id) -> Optional[Dict]:
+        row = self.conn.execute("SELECT id, doc FROM plans WHERE id = ?", (str(plan_id),)).fetchone()
+        return self._doc(row, _id=row["id"]) if row else None
+
+    def save_plan(self, plan: Dict) -> str:
+        plan_id = str(plan.get("_id") or ObjectId())
+        body = {k: v for k, v in plan.items() if k != "_id"}
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO plans (id, doc) VALUES (?, ?)", (plan_id, _dumps(body)))
+        return plan_id
+
+    def save_admin(self, admin: Dict) -> str:
+        admin_id = str(admin.get("_id") or ObjectId())
+        body = {k: v for k, v in admin.items() if k != "_id"}
+        if isinstance(body.get("password_hash"), bytes):
+            body["password_hash"] = body["password_hash"].decode("utf-8")
+        body["plan_id"] = str(body.get("plan_id"))
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO admin_users (id, email, doc) VALUES (?, ?, ?)",
+                (admin_id, admin["email"], _dumps(body))
+            )
+        return admin_id
+
+    # Submissions
+
+    @staticmethod
+    def _submission_row(doc: Dict) -> tuple:
+        doc.setdefault("_id", str(ObjectId()))
+        rest = {k: v for k, v in doc.items() if k not in SUBMISSION_DOC_KEYS}
+        return (
+            str(doc["_id"]), doc["admin_email"], doc["quiz_json_name"], _ts(doc.get("timestamp") or datetime.utcnow()),
+            *[doc.get(column) for column in SUBMISSION_SUMMARY_COLUMNS],
+            _dumps(rest)
+        )
+
+    @staticmethod
+    def _summary(row) -> Dict:
+        summary = {column: row[column] for column in SUBMISSION_SUMMARY_COLUMNS if row[column] is not None}
+        summary["_id"] = row["id"]
+        summary["timestamp"] = _parse_ts(row["timestamp"])
+        return summary
+
+    def insert_submission(self, doc: Dict) -> str:
+        self._writer.write([self._submission_row(doc)])
+        return str(doc["_id"])
+
+    def insert_submissions(self, docs: List[Dict]) -> List[str]:
+        if docs:
+            self._writer.write([self._submission_row(doc) for doc in docs])
+        return [str(doc["_id"]) for doc in docs]
+
+    def deliver_submissions(self, docs: List[Dict]) -> List[bool]:
+        placeholders = ", ".join("?" for _ in SUBMISSION_COLUMNS)
+        sql = (f"INSERT INTO submissions ({', '.join(SUBMISSION_COLUMNS)}) VALUES ({placeholders}) "
+               "ON CONFLICT (id) DO NOTHING")
+        with self.conn:
+            return [self.conn.execute(sql, self._submission_row(doc)).rowcount == 1 for doc in docs]
+
+    def get_submission(self, submission_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT * FROM submissions WHERE id = ?", (str(submission_id),)).fetchone()
+        return self._document(row) if row is not None else None
+
+    def _document(self, row) -> Dict:
+        doc = json.loads(row["doc"])
+        doc.update(self._summary(row))
+        doc["admin_email"] = row["admin_email"]
+        doc["quiz_json_name"] = row["quiz_name"]
+        return doc
+
+    def list_submission_summaries(self, admin_email: str, quiz_name: str, limit: int,
+                                  after: Optional[Cursor] = None, skip: int = 0) -> List[Dict]:
+        sql = f"SELECT id, timestamp, {', '.join(SUBMISSION_SUMMARY_COLUMNS)} FROM submissions WHERE admin_email = ? AND quiz_name = ?"
+        params: list = [admin_email, quiz_name]
+        if after:
+            sql += " AND (timestamp < ? OR (timestamp = ? AND id < ?))"
+            params += [_ts(after[0]), _ts(after[0]), after[1]]
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        params += [limit, skip]
+        return [self._summary(row) for row in self.conn.execute(sql, params)]
+
+    def count_submissions(self, admin_email: str, quiz_name: str) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM submissions WHERE admin_email = ? AND quiz_name = ?", (admin_email, quiz_name)
+        ).fetchone()[0]
+
+    def submission_quiz_names(self, admin_email: str) -> List[str]:
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT quiz_name FROM submissions WHERE admin_email = ?", (admin_email,)
+        )]
+
+    def quiz_groups(self, admin_email: str, limit: int, after: Optional[Cursor] = None,
+                    skip: int = 0) -> Tuple[List[Dict], int]:
+        # Skip-scan of the listing index: one seek per quiz for its name and one for its latest timestamp
+        latest = self.conn.execute(
+            """
+            WITH RECURSIVE quizzes(name) AS (
+                SELECT MIN(quiz_name) FROM submissions WHERE admin_email = ?
+                UNION ALL
+                SELECT (SELECT MIN(quiz_name) FROM submissions WHERE admin_email = ? AND quiz_name > quizzes.name)
+                FROM quizzes WHERE quizzes.name IS NOT NULL
+            )
+            SELECT name, (SELECT MAX(timestamp) FROM submissions WHERE admin_email = ? AND quiz_name = quizzes.name)
+            FROM quizzes WHERE name IS NOT NULL
+            """,
+            (admin_email, admin_email, admin_email)
+        ).fetchall()
+        ordered = sorted(((row[1], row[0]) for row in latest), reverse=True)
+        if after:
+            ordered = [key for key in ordered if key < (_ts(after[0]), after[1])]
+        else:
+            ordered = ordered[skip:]
+        page = ordered[:limit]
+        if not page:
+            return [], len(latest)
+
+        stats = {row["quiz_name"]: row for row in self.conn.execute(
+            f"""SELECT quiz_name, COUNT(*) AS total_submissions, MIN(timestamp) AS first_submission,
+                       AVG(score) AS average_score
+                FROM submissions WHERE admin_email = ? AND quiz_name IN ({', '.join('?' for _ in page)})
+                GROUP BY quiz_name""",
+            [admin_email] + [name for _, name in page]
+        )}
+        groups = [{
+            "quiz_name": name,
+            "total_submissions": stats[name]["total_submissions"],
+            "latest_submission": _parse_ts(latest_ts),
+            "first_submission": _parse_ts(stats[name]["first_submission"]),
+            "average_score": stats[name]["average_score"]
+        } for latest_ts, name in page]
+        return groups, len(latest)
+
+    def submission_overview(self) -> Tuple[List[Dict], int]:
+        rows = self.conn.execute(
+            "SELECT quiz_name, COUNT(*), MAX(timestamp) AS latest FROM submissions GROUP BY quiz_name ORDER BY latest DESC"
+        ).fetchall()
+        groups = [{"_id": row[0], "count": row[1], "latest": _parse_ts(row[2])} for row in rows]
+        return groups, sum(g["count"] for g in groups)
+
+    def archive_candidates(self, cutoff: datetime) -> List[Tuple[str, str]]:
+        rows = self.conn.execute(
+            "SELECT DISTINCT admin_email, quiz_name FROM submissions WHERE timestamp < ?", (_ts(cutoff),)
+        ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def find_submissions_before(self, admin_email: str, quiz_name: str, cutoff: datetime, limit: int) -> List[Dict]:
+        rows = self.conn.execute(
+            """SELECT * FROM submissions WHERE admin_email = ? AND quiz_name = ? AND timestamp < ?
+               ORDER BY timestamp, id LIMIT ?""",
+            (admin_email, quiz_name, _ts(cutoff), limit)
+        ).fetchall()
+        return [self._document(row) for row in rows]
+
+    def delete_submissions(self, submission_ids: List[str]) -> int:
+        with self.conn:
+            return self.conn.executemany(
+                "DELETE FROM submissions WHERE id = ?", [(str(i),) for i in submission_ids]
+            ).rowcount
+
+    def iter_submission_answers(self, admin_email: str, quiz_name: str, after_id: Optional[str] = None,
+                                batch_size: int = 500) -> Iterator[Dict]:
+        last_id = after_id or ""
+        while True:
+            rows = self.conn.execute(
+                """SELECT id, correct_answers, json_extract(doc, '$.answers') AS answers FROM submissions
+                   WHERE admin_email = ? AND quiz_name = ? AND id > ? ORDER BY id LIMIT ?""",
+                (admin_email, quiz_name, last_id, batch_size)
+            ).fetchall()
+            for row in rows:
+                yield {
+                    "_id": row["id"],
+                    "correct_answers": row["correct_answers"],
+                    "answers": json.loads(row["answers"]) if row["answers"] else []
+                }
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1]["id"]
+
+    def update_submissions(self, updates: List[Tuple[str, Dict]]):
+        if not updates:
+            return
+        with self.conn:
+            for submission_id, fields in updates:
+                columns = {k: v for k, v in fields.items() if k in SUBMISSION_SUMMARY_COLUMNS}
+                rest = {k: v for k, v in fields.items() if k not in SUBMISSION_DOC_KEYS}
+                assignments = [f"{column} = ?" for column in columns] + ["doc = json_patch(doc, ?)"]
+                self.conn.execute(
+                    f"UPDATE submissions SET {', '.join(assignments)} WHERE id = ?",
+                    (*columns.values(), _dumps(rest), str(submission_id))
+                )
+
+    def iter_link_submissions(self, link_id: str) -> Iterator[Dict]:
+        rows = self.conn.execute(
+            """SELECT id, student_name, class_name, section, json_extract(doc, '$.answers') AS answers
+               FROM submissions WHERE link_id = ?""",
+            (link_id,)
+        )
+        for row in rows:
+            yield {
+                "_id": row["id"],
+                "student_name": row["student_name"],
+                "class_name": row["class_name"],
+                "section": row["section"],
+                "answers": json.loads(row["answers"]) if row["answers"] else []
+            }
+
+    # Exam sessions
+
+    def insert_exam_sessions(self, sessions: List[Dict]):
+        rows = []
+        for session in sessions:
+            session.setdefault("_id", str(ObjectId()))
+            body = {k: v for k, v in session.items() if k != "_id"}
+            rows.append((str(session["_id"]), session["exam_id"], session.get("admin_email"), session.get("created_at"), _dumps(body)))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO exam_sessions (id, exam_id, admin_email, created_at, doc) VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def push_exam_student(self, exam_id: str, student_data: Dict) -> bool:
+        with self.conn:
+            cursor = self.conn.execute(
+                """UPDATE exam_sessions
+                   SET doc = json_set(json_insert(doc, '$.students[#]', json(?)),
+                                      '$.total_students', json_extract(doc, '$.total_students') + 1)
+                   WHERE id = (SELECT id FROM exam_sessions WHERE exam_id = ? LIMIT 1)""",
+                (_dumps(student_data), exam_id)
+            )
+        return cursor.rowcount > 0
+
+    def list_exam_sessions(self, admin_email: Optional[str] = None) -> List[Dict]:
+        if admin_email:
+            rows = self.conn.execute(
+                "SELECT id, doc FROM exam_sessions WHERE admin_email = ? ORDER BY created_at DESC", (admin_email,)
+            )
+        else:
+            rows = self.conn.execute("SELECT id, doc FROM exam_sessions ORDER BY created_at DESC")
+        return [self._doc(row, _id=row["id"]) for row in rows]
+
+    def get_exam_session(self, exam_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT id, doc FROM exam_sessions WHERE exam_id = ? LIMIT 1", (exam_id,)).fetchone()
+        return self._doc(row, _id=row["id"]) if row else None
+
+    # Quiz links
+
+    def insert_links(self, links: List[Dict]):
+        rows = []
+        for link in links:
+            body = {k: v for k, v in link.items() if k not in ("current_count", "reserved", "score_total", "students")}
+            rows.append((link["link_id"], link["admin_email"], link["max_allowed"],
+                         link.get("current_count", 0), link.get("score_total", 0.0), _dumps(body)))
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO quiz_links (link_id, admin_email, max_allowed, current_count, score_total, doc)
+                   VALUES (?, ?, ?, ?, ?, ?)""", rows
+            )
+
+    def get_link(self, link_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT * FROM quiz_links WHERE link_id = ?", (link_id,)).fetchone()
+        if row is None:
+            return None
+        link = json.loads(row["doc"])
+        link.update(max_allowed=row["max_allowed"], current_count=row["current_count"], reserved=row["reserved"],
+                    score_total=row["score_total"])
+        link["students"] = [json.loads(r[0]) for r in self.conn.execute(
+            "SELECT doc FROM link_students WHERE link_id = ? ORDER BY rowid", (link_id,)
+        )]
+        return link
+
+    def claim_link_slot(self, link_id: str, student: Dict, score: float) -> Tuple[bool, Optional[Dict]]:
+        conn = self.conn
+        claimed = False
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                """UPDATE quiz_links SET current_count = current_count + 1, score_total = score_total + ?
+                   WHERE link_id = ? AND current_count + reserved < max_allowed""",
+                (score, link_id)
+            )
+            if cursor.rowcount:
+                conn.execute(
+                    "INSERT INTO link_students (link_id, student_id, doc) VALUES (?, ?, ?)",
+                    (link_id, student["id"], _dumps(student))
+                )
+                claimed = True
+            conn.execute("COMMIT")
+        except sqlite3.IntegrityError:
+            # Student already submitted on this link
+            conn.execute("ROLLBACK")
+            claimed = False
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return claimed, self.get_link(link_id)
+
+    def record_link_students(self, link_id: str, students: List[Dict], scores: List[float]):
+        added = score_total = 0
+        with self.conn:
+            for student, score in zip(students, scores):
+                if self.conn.execute(
+                    "INSERT OR IGNORE INTO link_students (link_id, student_id, doc) VALUES (?, ?, ?)",
+                    (link_id, student["id"], _dumps(student))
+                ).rowcount:
+                    added += 1
+                    score_total += score
+            self.conn.execute(
+                """UPDATE quiz_links SET current_count = current_count + ?, reserved = MAX(reserved - ?, 0),
+                       score_total = score_total + ? WHERE link_id = ?""",
+                (added, added, score_total, link_id)
+            )
+
+    # Exam attempts
+
+    @staticmethod
+    def _attempt(row) -> Dict:
+        # The doc keeps datetimes tagged (started_at, deadline, saved_at), unlike submission docs
+        attempt = load_document(row["doc"])
+        attempt.update(_id=row["id"], status=row["status"])
+        return attempt
+
+    def start_attempt(self, attempt: Dict) -> Optional[Dict]:
+        body = {k: v for k, v in attempt.items() if k not in ("_id", "status")}
+        conn = self.conn
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM exam_attempts WHERE id = ?", (attempt["_id"],)).fetchone()
+            if row is None and conn.execute(
+                """UPDATE quiz_links SET reserved = reserved + 1
+                   WHERE link_id = ? AND current_count + reserved < max_allowed
+                     AND NOT EXISTS (SELECT 1 FROM link_students WHERE link_id = ? AND student_id = ?)""",
+                (attempt["link_id"], attempt["link_id"], attempt["student_id"])
+            ).rowcount:
+                conn.execute(
+                    "INSERT INTO exam_attempts (id, link_id, status, deadline, doc) VALUES (?, ?, ?, ?, ?)",
+                    (attempt["_id"], attempt["link_id"], attempt["status"], _ts(attempt.get("deadline")), dump_document(body))
+                )
+                row = conn.execute("SELECT * FROM exam_attempts WHERE id = ?", (attempt["_id"],)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self._attempt(row) if row is not None else None
+
+    def get_attempt(self, attempt_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT * FROM exam_attempts WHERE id = ?", (attempt_id,)).fetchone()
+        return self._attempt(row) if row is not None else None
+
+    def save_attempt_progress(self, attempt_id: str, progress: Dict, saved_at: datetime) -> bool:
+        patch = dump_document({"progress": progress, "saved_at": saved_at})
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE exam_attempts SET doc = json_patch(doc, ?) WHERE id = ? AND status = 'open'",
+                (patch, attempt_id)
+            ).rowcount > 0
+
+    def claim_attempts(self, attempt_ids: List[str], status: str, current: str = "open",
+                       claimed_before: Optional[datetime] = None) -> List[Dict]:
+        token = str(ObjectId())
+        sql = "UPDATE exam_attempts SET status = ?, claim = ?, claimed_at = ? WHERE id = ? AND status = ?"
+        if claimed_before is not None:
+            sql += " AND (claimed_at IS NULL OR claimed_at < ?)"
+        now = _ts(datetime.utcnow())
+        with self.conn:
+            self.conn.executemany(sql, [
+                (status, token, now, attempt_id, current) + ((_ts(claimed_before),) if claimed_before is not None else ())
+                for attempt_id in attempt_ids
+            ])
+        return [self._attempt(row) for row in self.conn.execute("SELECT * FROM exam_attempts WHERE claim = ?", (token,))]
+
+    def set_attempts_status(self, attempt_ids: List[str], status: str):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE exam_attempts SET status = ? WHERE id = ?", [(status, attempt_id) for attempt_id in attempt_ids]
+            )
+
+    def find_attempts(self, status: str, due_before: Optional[datetime] = None,
+                      claimed_before: Optional[datetime] = None, limit: int = 0) -> List[Dict]:
+        sql = "SELECT * FROM exam_attempts WHERE status = ?"
+        params: list = [status]
+        if due_before is not None:
+            sql += " AND deadline < ?"
+            params.append(_ts(due_before))
+        if claimed_before is not None:
+            sql += " AND (claimed_at IS NULL OR claimed_at < ?)"
+            params.append(_ts(claimed_before))
+        sql += " ORDER BY deadline"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._attempt(row) for row in self.conn.execute(sql, params)]
+
+    # Class rollups
+
+    def increment_class_rollup(self, key: Dict, percentage: float, bucket: int):
+        path = f'$."{bucket}"'
+        with self.conn:
+            self.conn.execute(
+                f"""INSERT INTO class_rollups (admin_email, quiz_name, class_name, section, count, sum, sum_sq, min, max, histogram)
+                    VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, json_object('{bucket}', 1))
+                    ON CONFLICT (admin_email, quiz_name, class_name, section) DO UPDATE SET
+                        count = count + 1,
+                        sum = sum + excluded.sum,
+                        sum_sq = sum_sq + excluded.sum_sq,
+                        min = MIN(min, excluded.min),
+                        max = MAX(max, excluded.max),
+                        histogram = json_set(histogram, '{path}', COALESCE(json_extract(histogram, '{path}'), 0) + 1)""",
+                (key["admin_email"], key["quiz_name"], key["class_name"], key["section"],
+                 percentage, percentage * percentage, percentage, percentage)
+            )
+
+    def find_class_rollups(self, admin_email: str, quiz_name: Optional[str] = None,
+                           class_name: Optional[str] = None) -> List[Dict]:
+        sql = "SELECT * FROM class_rollups WHERE admin_email = ?"
+        params: list = [admin_email]
+        if quiz_name:
+            sql += " AND quiz_name = ?"
+            params.append(quiz_name)
+        if class_name:
+            sql += " AND class_name = ?"
+            params.append(class_name)
+        sql += " ORDER BY quiz_name, class_name, section"
+        rollups = []
+        for row in self.conn.execute(sql, params):
+            rollup = dict(row)
+            rollup["histogram"] = json.loads(rollup["histogram"])
+            rollups.append(rollup)
+        return rollups
+
+    def class_rollup_groups(self, admin_email: str, quiz_name: Optional[str], bucket_width: float,
+                            buckets: int) -> Iterator[Dict]:
+        sql = """
+            SELECT quiz_name, class_name, section,
+                   MIN(CAST(COALESCE(percentage, 0) / ? AS INTEGER), ?) AS bucket,
+                   COUNT(*) AS count,
+                   SUM(COALESCE(percentage, 0)) AS sum,
+                   SUM(COALESCE(percentage, 0) * COALESCE(percentage, 0)) AS sum_sq,
+                   MIN(percentage) AS min,
+                   MAX(percentage) AS max
+            FROM submissions
+            WHERE admin_email = ? AND class_name IS NOT NULL AND section IS NOT NULL
+        """
+        params: list = [bucket_width, buckets - 1, admin_email]
+        if quiz_name:
+            sql += " AND quiz_name = ?"
+            params.append(quiz_name)
+        sql += " GROUP BY quiz_name, class_name, section, bucket"
+        for row in self.conn.execute(sql, params):
+            group = dict(row)
+            group["bucket"] = max(group["bucket"], 0)
+            yield group
+
+    def replace_class_rollups(self, admin_email: str, quiz_name: Optional[str], rollups: List[Dict]):
+        with self.conn:
+            if quiz_name:
+                self.conn.execute("DELETE FROM class_rollups WHERE admin_email = ? AND quiz_name = ?", (admin_email, quiz_name))
+            else:
+                self.conn.execute("DELETE FROM class_rollups WHERE admin_email = ?", (admin_email,))
+            self.conn.executemany(
+                """INSERT INTO class_rollups (admin_email, quiz_name, class_name, section, count, sum, sum_sq, min, max, histogram)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(r["admin_email"], r["quiz_name"], r["class_name"], r["section"], r["count"], r["sum"],
+                  r["sum_sq"], r["min"], r["max"], _dumps(r["histogram"])) for r in rollups]
+            )
+
+    # Rescore jobs
+
+    def _save_job(self, job: Dict):
+        self.conn.execute(
+            """INSERT OR REPLACE INTO rescore_jobs (id, admin_email, quiz_name, quiz_version, status, doc)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (job["_id"], job["admin_email"], job["quiz_name"], job["quiz_version"], job["status"], _dumps(job))
+        )
+
+    def insert_rescore_job(self, job: Dict):
+        with self.conn:
+            self._save_job(job)
+
+    def get_rescore_job(self, job_id: str, admin_email: Optional[str] = None) -> Optional[Dict]:
+        row = self.conn.execute("SELECT admin_email, doc FROM rescore_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or (admin_email and row["admin_email"] != admin_email):
+            return None
+        return json.loads(row["doc"])
+
+    def find_unfinished_rescore_job(self, admin_email: str, quiz_name: str, quiz_version: str,
+                                    statuses: List[str]) -> Optional[Dict]:
+        row = self.conn.execute(
+            f"""SELECT doc FROM rescore_jobs WHERE admin_email = ? AND quiz_name = ? AND quiz_version = ?
+                AND status IN ({', '.join('?' for _ in statuses)}) LIMIT 1""",
+            (admin_email, quiz_name, quiz_version, *statuses)
+        ).fetchone()
+        return json.loads(row["doc"]) if row else None
+
+    def update_rescore_job(self, job_id: str, set_fields: Optional[Dict] = None, inc_fields: Optional[Dict] = None):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT doc FROM rescore_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None:
+                job = json.loads(row["doc"])
+                job.update(set_fields or {})
+                for field, amount in (inc_fields or {}).items():
+                    job[field] = job.get(field, 0) + amount
+                self._save_job(job)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # Time-spent sketches
+
+    def save_time_sketch(self, admin_email: str, quiz_name: str, quiz_version: str, worker_id: str,
+                         sketch: Dict, updated_at: datetime):
+        with self.conn:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO time_sketches (admin_email, quiz_name, quiz_version, worker_id, updated_at, sketch)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (admin_email, quiz_name, quiz_version, worker_id, _ts(updated_at), _dumps(sketch))
+            )
+
+    def find_time_sketches(self, admin_email: str, quiz_name: str, quiz_version: str) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT worker_id, updated_at, sketch FROM time_sketches WHERE admin_email = ? AND quiz_name = ? AND quiz_version = ?",
+            (admin_email, quiz_name, quiz_version)
+        )
+        return [{"worker_id": row["worker_id"], "updated_at": _parse_ts(row["updated_at"]), "sketch": json.loads(row["sketch"])}
+                for row in rows]
+
+    # Collusion reports
+
+    def save_collusion_report(self, link_id: str, admin_email: str, report: Dict):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO collusion_reports (link_id, admin_email, doc) VALUES (?, ?, ?)",
+                (link_id, admin_email, _dumps({**report, "admin_email": admin_email}))
+            )
+
+    def get_collusion_report(self, link_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT doc FROM collusion_reports WHERE link_id = ?", (link_id,)).fetchone()
+        return json.loads(row["doc"]) if row else None
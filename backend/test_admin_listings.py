@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+from conftest import ADMIN, QUIZ
+
+HEADERS = {"X-Admin-Email": ADMIN}
+BASE = datetime(2026, 3, 1, 9, 0, 0)
+
+
+def submission(quiz, i, timestamp, admin=ADMIN):
+    return {"quiz_json_name": quiz, "admin_email": admin, "student_name": f"student {i}", "student_email": f"s{i}@school",
+            "score": float(i % 5 * 20), "percentage": float(i % 5 * 20), "total_questions": 5, "correct_answers": i % 5,
+            "timestamp": timestamp, "detailed_results": [], "answers": []}
+
+
+def walk(client, path, key, limit, **params):
+    pages, cursor = [], None
+    while True:
+        query = dict(params, limit=limit, **({"cursor": cursor} if cursor else {}))
+        body = client.get(path, headers=HEADERS, params=query).json()
+        pages.append(body)
+        cursor = body[key]["next_cursor"] if key else body["next_cursor"]
+        if not cursor:
+            return pages
+
+
+def test_exam_detail_cursor_pages_cover_every_row_once(app, client):
+    # Pairs of submissions share a timestamp, so pages must break ties by id
+    docs = [submission(QUIZ, i, BASE + timedelta(seconds=i // 2)) for i in range(23)]
+    app.storage.insert_submissions(docs)
+    app.storage.insert_submissions([submission("Other", 99, BASE), submission(QUIZ, 98, BASE, admin="other@school")])
+
+    pages = walk(client, f"/admin/exam/{QUIZ}", "quiz_info", 5)
+    rows = [row for page in pages for row in page["students"]]
+    assert len(pages) == 5 and [len(page["students"]) for page in pages] == [5, 5, 5, 5, 3]
+    assert sorted(row["submission_id"] for row in rows) == sorted(str(doc["_id"]) for doc in docs)
+    assert [row["index"] for row in rows] == list(range(23))
+    assert all(page["quiz_info"]["total_submissions"] == 23 and page["quiz_info"]["total_pages"] == 5 for page in pages)
+    assert [page["quiz_info"]["has_more"] for page in pages] == [True] * 4 + [False]
+
+    # Newest first, and the page parameter older clients send lands on the same rows
+    names = [row["student_name"] for row in rows]
+    assert names[:2] in (["student 22", "student 21"], ["student 21", "student 22"])
+    paged = client.get(f"/admin/exam/{QUIZ}", headers=HEADERS, params={"page": 3, "limit": 5}).json()["students"]
+    assert [row["submission_id"] for row in paged] == [row["submission_id"] for row in rows[10:15]]
+    assert [row["index"] for row in paged] == list(range(10, 15))
+
+
+def test_exam_detail_page_is_refreshed_after_a_submission(app, client):
+    from conftest import deliver
+    app.storage.insert_submissions([submission(QUIZ, i, BASE) for i in range(2)])
+    first = client.get(f"/admin/exam/{QUIZ}", headers=HEADERS)
+    assert client.get(f"/admin/exam/{QUIZ}", headers=HEADERS).headers["x-cache"] == "HIT"
+
+    app.submission_outbox.put(submission(QUIZ, 7, BASE + timedelta(minutes=1)))
+    deliver(app)
+    again = client.get(f"/admin/exam/{QUIZ}", headers=HEADERS)
+    assert again.headers["x-cache"] == "MISS" and len(again.json()["students"]) == len(first.json()["students"]) + 1
+
+
+def test_unknown_quiz_and_bad_cursor(app, client):
+    assert client.get("/admin/exam/Nothing", headers=HEADERS).status_code == 404
+    assert client.get(f"/admin/exam/{QUIZ}", headers=HEADERS, params={"cursor": "%%%"}).status_code == 400
+
+
+def test_exam_list_cursor_pages_and_exact_totals(app, client):
+    # Twelve quizzes, each with its latest submission a minute after the previous quiz's
+    for q in range(12):
+        app.storage.insert_submissions([submission(f"Quiz {q:02d}", i, BASE + timedelta(minutes=q, seconds=-i))
+                                        for i in range(q % 3 + 1)])
+    app.storage.insert_submissions([submission("Hidden", 1, BASE + timedelta(days=1), admin="other@school")])
+
+    pages = walk(client, "/admin/exams", None, 5)
+    exams = [exam for page in pages for exam in page["exams"]]
+    assert [exam["quiz_name"] for exam in exams] == [f"Quiz {q:02d}" for q in reversed(range(12))]
+    assert [exam["total_submissions"] for exam in exams] == [q % 3 + 1 for q in reversed(range(12))]
+    assert all(page["total_exams"] == 12 and page["total_pages"] == 3 for page in pages)
+    assert [len(page["exams"]) for page in pages] == [5, 5, 2]
+
+    paged = client.get("/admin/exams", headers=HEADERS, params={"page": 2, "limit": 5}).json()
+    assert [exam["quiz_name"] for exam in paged["exams"]] == [exam["quiz_name"] for exam in exams[5:10]]
+    assert paged["total_exams"] == 12
+
+    empty = client.get("/admin/exams", headers={"X-Admin-Email": "nobody@school"}).json()
+    assert empty["exams"] == [] and empty["total_exams"] == 0 and empty["next_cursor"] is None
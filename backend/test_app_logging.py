@@ -0,0 +1,72 @@
+import json
+import logging
+import queue
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app_logging import (DroppingQueueHandler, JsonFormatter, RequestIdFilter, RequestIdMiddleware, Sampler,
+                         TextFormatter, request_id_var)
+
+
+def record(msg="hello %s", args=("world",), **extra):
+    rec = logging.LogRecord("quizbuzz.test", logging.INFO, __file__, 1, msg, args, None)
+    rec.__dict__.update(extra)
+    return rec
+
+
+def test_json_lines_carry_structured_fields_and_request_id():
+    token = request_id_var.set("req-1")
+    try:
+        rec = record(quiz="Maths", score=80.0)
+        RequestIdFilter().filter(rec)
+    finally:
+        request_id_var.reset(token)
+    entry = json.loads(JsonFormatter().format(rec))
+    assert entry["msg"] == "hello world" and entry["request_id"] == "req-1"
+    assert entry["quiz"] == "Maths" and entry["score"] == 80.0 and entry["level"] == "INFO"
+
+
+def test_json_lines_include_exceptions():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        rec = logging.LogRecord("t", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+    assert "ValueError: boom" in json.loads(JsonFormatter().format(rec))["exc"]
+
+
+def test_text_lines_append_fields():
+    line = TextFormatter().format(record(quiz="Maths"))
+    assert line.endswith("[-] quizbuzz.test: hello world quiz=Maths")
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(2))
+    for _ in range(5):
+        handler.emit(record())
+    assert handler.queue.qsize() == 2 and handler.dropped == 3
+
+
+def test_sampler_rate_and_per_second_cap():
+    assert not any(Sampler(0, 100).allow() for _ in range(100))
+    capped = Sampler(1.0, 5)
+    assert sum(capped.allow() for _ in range(100)) == 5
+
+
+def test_request_id_is_echoed_or_generated():
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.get("/")
+    def handler():
+        return {"request_id": request_id_var.get()}
+
+    client = TestClient(app)
+    response = client.get("/", headers={"X-Request-ID": "abc-123"})
+    assert response.headers["x-request-id"] == "abc-123" and response.json() == {"request_id": "abc-123"}
+
+    generated = client.get("/", headers={"X-Request-ID": "bad id\n"})
+    assert generated.headers["x-request-id"] != "bad id\n"
+    assert generated.json()["request_id"] == generated.headers["x-request-id"]
+    assert request_id_var.get() == "-"
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+
+from archive import SubmissionArchive
+from storage_sqlite import SQLiteStorage
+
+ADMIN = "a@school"
+
+
+def submission(i, month):
+    return {"quiz_json_name": "Maths", "admin_email": ADMIN, "student_name": f"s{i}", "class_name": "6",
+            "section": "A", "score": float(i), "percentage": float(i), "total_questions": 10,
+            "timestamp": datetime(2026, month, 1 + i % 27, 9, 0, i % 60), "answers": [{"questionNumber": 1}]}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "quizbuzz.db"))
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def changes():
+    return []
+
+
+@pytest.fixture
+def archive(tmp_path, changes):
+    return SubmissionArchive(tmp_path / "archive", on_change=lambda admin, quiz: changes.append((admin, quiz)), batch_size=7)
+
+
+def test_old_submissions_move_to_monthly_partitions(storage, archive, changes):
+    ids = storage.insert_submissions([submission(i, 1 + i % 3) for i in range(30)])
+    assert archive.archive(storage, datetime(2026, 3, 1)) == 20
+    assert storage.count_submissions(ADMIN, "Maths") == 10
+    assert changes == [(ADMIN, "Maths")]
+
+    partitions = archive.partitions(ADMIN)
+    assert [(p["month"], p["submissions"]) for p in partitions] == [("2026-02", 10), ("2026-01", 10)]
+    assert archive.partition_path(ADMIN, "Maths", "2026-01").exists()
+    assert archive.stats() == {"submissions": 20, "partitions": 2}
+
+    # A document reads back whole from its member; summaries come from the index alone
+    doc = archive.get(ids[0])
+    assert doc["student_name"] == "s0" and doc["timestamp"] == datetime(2026, 1, 1, 9, 0, 0)
+    assert archive.get(ids[0], admin_email="other@school") is None and archive.get(ids[2]) is None
+    summaries = archive.list_summaries(ADMIN, "Maths", month="2026-01", limit=3)
+    assert len(summaries) == 3 and summaries[0]["timestamp"] > summaries[-1]["timestamp"]
+
+
+def test_restore_puts_documents_back_with_their_ids(storage, archive, changes):
+    ids = storage.insert_submissions([submission(i, 1) for i in range(12)])
+    archive.archive(storage, datetime(2026, 2, 1))
+    assert archive.restore(storage, ADMIN, "Maths") == 12
+    assert storage.count_submissions(ADMIN, "Maths") == 12
+    assert storage.get_submission(ids[5])["student_name"] == "s5"
+    assert archive.partitions(ADMIN) == [] and not archive.partition_path(ADMIN, "Maths", "2026-01").exists()
+    assert changes == [(ADMIN, "Maths"), (ADMIN, "Maths")]
+
+
+def test_copy_left_by_a_crash_before_delete_is_ignored(storage, archive):
+    docs = [submission(i, 1) for i in range(5)]
+    storage.insert_submissions(docs)
+    # First run wrote the member but died before deleting; the rerun writes a second copy
+    archive._write(ADMIN, "Maths", storage.find_submissions_before(ADMIN, "Maths", datetime(2026, 2, 1), 10))
+    assert archive.archive(storage, datetime(2026, 2, 1)) == 5
+    assert archive.stats()["submissions"] == 5
+    assert len(list(archive.iter_documents(ADMIN, "Maths", "2026-01"))) == 5
+    assert archive.restore(storage, ADMIN, "Maths", month="2026-01") == 5
+    assert storage.count_submissions(ADMIN, "Maths") == 5
+
+
+def test_archive_can_be_limited_to_one_admin(storage, archive):
+    storage.insert_submissions([submission(1, 1), dict(submission(2, 1), admin_email="b@school")])
+    assert archive.archive(storage, datetime(2026, 2, 1), admin_email="b@school") == 1
+    assert storage.count_submissions(ADMIN, "Maths") == 1
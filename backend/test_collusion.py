@@ -0,0 +1,76 @@
+import itertools
+import math
+import random
+
+import pytest
+
+from collusion import upper_tail, detect
+from quiz_bank import CompiledQuiz
+
+
+def brute_force_tail(probabilities, observed):
+    total = 0.0
+    for outcome in itertools.product((0, 1), repeat=len(probabilities)):
+        if sum(outcome) >= observed:
+            chance = 1.0
+            for hit, p in zip(outcome, probabilities):
+                chance *= p if hit else 1 - p
+            total += chance
+    return total
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_upper_tail_matches_enumeration(seed):
+    rng = random.Random(seed)
+    probabilities = [rng.uniform(0.05, 0.95) for _ in range(10)]
+    for observed in range(-1, 12):
+        assert upper_tail(probabilities, observed) == pytest.approx(brute_force_tail(probabilities, observed), abs=1e-12)
+
+
+def test_upper_tail_equal_probabilities_is_binomial():
+    n, p = 60, 0.3
+    for observed in (0, 10, 18, 30, 45, 60):
+        binomial = sum(math.comb(n, k) * p ** k * (1 - p) ** (n - k) for k in range(observed, n + 1))
+        assert upper_tail([p] * n, observed) == pytest.approx(binomial, rel=1e-9, abs=1e-300)
+
+
+def test_upper_tail_extremes():
+    assert upper_tail([], 0) == 1.0
+    assert upper_tail([0.5, 0.5], 3) == 0.0
+    assert upper_tail([0.5] * 3, 3) == pytest.approx(0.125)
+    assert upper_tail([0.9] * 50, 1) == pytest.approx(1 - 0.1 ** 50)
+    # Far tails stay tiny rather than picking up rounding error from 1 - P(X < k)
+    assert 0 < upper_tail([0.01] * 100, 40) < 1e-40
+
+
+def make_link(students=40, questions=60, seed=3):
+    rng = random.Random(seed)
+    quiz = CompiledQuiz("q", [{"questionNumber": i + 1, "correct_answer": "A",
+                               "option_with_images_": ["a", "b", "c", "d"]} for i in range(questions)], "v1")
+    submissions = []
+    for s in range(students):
+        answers = [{"questionNumber": i + 1, "selectedOption": 0 if rng.random() < 0.55 else rng.randrange(1, 4)}
+                   for i in range(questions)]
+        submissions.append({"_id": f"s{s}", "student_name": f"student {s}", "answers": answers})
+    return quiz, submissions
+
+
+def test_detect_flags_a_copied_sheet_only():
+    quiz, submissions = make_link()
+    copy = dict(submissions[5], _id="copy", student_name="copier")
+    submissions.append(copy)
+
+    report = detect(quiz, submissions)
+    assert report["submissions"] == 41 and report["possible_pairs"] == 41 * 40 // 2
+    assert report["candidate_pairs"] < report["possible_pairs"] // 4
+    flagged = [{s["submission_id"] for s in pair["students"]} for pair in report["flagged_pairs"]]
+    assert flagged == [{"s5", "copy"}]
+    pair = report["flagged_pairs"][0]
+    assert pair["p_value"] <= report["p_value_threshold"]
+    assert pair["shared_wrong_answers"] == pair["both_wrong"] > pair["expected_shared_wrong"]
+
+
+def test_detect_with_no_submissions():
+    quiz, _ = make_link(students=0)
+    report = detect(quiz, [])
+    assert report["flagged_pairs"] == [] and report["possible_pairs"] == 0
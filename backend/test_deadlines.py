@@ -0,0 +1,85 @@
+import threading
+import time
+
+from deadlines import TimerWheel
+
+
+def wheel(slots=8):
+    w = TimerWheel(lambda due: None, tick=1.0, slots=slots)
+    w._current = 1000  # start the clock at t=1000s
+    return w
+
+
+def test_keys_due_in_the_same_tick_fire_as_one_batch():
+    w = wheel()
+    for i in range(30):
+        w.schedule(f"class-a:{i}", 1005.2)
+    w.schedule("late", 1006.0)
+    assert w.advance(1004.9) == []
+    assert sorted(w.advance(1006.0)) == sorted([f"class-a:{i}" for i in range(30)] + ["late"])
+    assert len(w) == 0
+
+
+def test_batches_follow_tick_boundaries():
+    w = wheel()
+    w.schedule("a", 1001.0)
+    w.schedule("b", 1001.5)
+    w.schedule("c", 1002.0)
+    assert w.advance(1001.0) == ["a"]
+    assert sorted(w.advance(1002.0)) == ["b", "c"]
+
+
+def test_keys_several_laps_ahead_wait_for_their_lap():
+    w = wheel(slots=8)
+    w.schedule("now", 1003)
+    w.schedule("next-lap", 1003 + 8)
+    w.schedule("third-lap", 1003 + 16)
+    assert w.advance(1003) == ["now"]
+    assert w.advance(1010) == []
+    assert w.advance(1011) == ["next-lap"]
+    assert w.advance(1019) == ["third-lap"]
+
+
+def test_past_deadlines_fire_on_the_next_tick():
+    w = wheel()
+    w.schedule("overdue", 900)
+    assert w.advance(1001) == ["overdue"]
+
+
+def test_reschedule_moves_and_cancel_drops():
+    w = wheel()
+    w.schedule("moved", 1002)
+    w.schedule("moved", 1004)
+    w.schedule("cancelled", 1002)
+    w.cancel("cancelled")
+    w.cancel("unknown")
+    assert w.advance(1003) == []
+    assert w.advance(1004) == ["moved"]
+
+
+def test_idle_wheel_jumps_to_now():
+    w = wheel()
+    assert w.advance(10 ** 9) == []
+    w.schedule("soon", 10 ** 9 + 1)
+    assert w.advance(10 ** 9 + 1) == ["soon"]
+
+
+def test_running_wheel_hands_batches_to_the_handler():
+    batches = []
+    fired = threading.Event()
+
+    def on_due(keys):
+        batches.append(sorted(keys))
+        fired.set()
+
+    w = TimerWheel(on_due, tick=0.05)
+    due = time.time() + 0.1
+    for key in ("x", "y", "z"):
+        w.schedule(key, due)
+    w.start()
+    try:
+        assert fired.wait(2)
+    finally:
+        w.stop()
+    assert batches == [["x", "y", "z"]]
+    assert w.stats() == {"scheduled": 0, "fired": 3, "batches": 1}
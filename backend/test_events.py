@@ -0,0 +1,66 @@
+import asyncio
+import json
+import threading
+
+from events import EventBus, admin_topic, format_sse, link_topic
+
+
+def test_publish_reaches_subscribers_of_the_topic_only():
+    async def scenario():
+        bus = EventBus()
+        admin = bus.subscribe(admin_topic("a@school"))
+        link = bus.subscribe(link_topic("L1"))
+        bus.publish(admin_topic("a@school"), {"type": "submission", "n": 1})
+        assert await admin.get(1) == {"type": "submission", "n": 1}
+        assert await link.get(0.05) is None
+
+    asyncio.run(scenario())
+
+
+def test_publish_from_worker_threads():
+    async def scenario():
+        bus = EventBus()
+        sub = bus.subscribe("t")
+        threads = [threading.Thread(target=bus.publish, args=("t", {"n": i})) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        received = [await sub.get(1) for _ in range(10)]
+        assert sorted(event["n"] for event in received) == list(range(10))
+
+    asyncio.run(scenario())
+
+
+def test_full_buffer_drops_oldest_events():
+    async def scenario():
+        bus = EventBus(max_buffer=3)
+        sub = bus.subscribe("t")
+        for i in range(5):
+            bus.publish("t", {"n": i})
+        await asyncio.sleep(0)
+        assert [(await sub.get(1))["n"] for _ in range(3)] == [2, 3, 4]
+        assert sub.dropped == 2
+
+    asyncio.run(scenario())
+
+
+def test_unsubscribe_removes_empty_topics():
+    async def scenario():
+        bus = EventBus()
+        sub = bus.subscribe("a", "b")
+        assert bus.subscriber_count() == 1
+        bus.unsubscribe(sub)
+        assert bus.subscriber_count() == 0
+        bus.publish("a", {"n": 1})
+
+    asyncio.run(scenario())
+
+
+def test_format_sse_frame():
+    frame = format_sse({"type": "stats", "count": 2})
+    event, data, end = frame.split("\n", 2)
+    assert event == "event: stats"
+    assert json.loads(data[len("data: "):]) == {"type": "stats", "count": 2}
+    assert end == "\n"
+    assert format_sse({}).startswith("event: message\n")
@@ -0,0 +1,161 @@
+from datetime import datetime
+
+from conftest import ADMIN, QUIZ, deliver
+
+HEADERS = {"X-Admin-Email": ADMIN}
+KEY = "ABCDA"
+
+
+def new_link(client, **options):
+    response = client.post("/admin/generate-link", headers=HEADERS, json=dict({"quiz_id": QUIZ, "shuffle": False}, **options))
+    assert response.status_code == 200
+    return response.json()["link_id"]
+
+
+def student(name):
+    return {"name": name, "class_name": "6", "section": "A"}
+
+
+def listed(letters):
+    """Answer list for letters in quiz order, "-" for unanswered"""
+    return [{"questionNumber": i, "selectedOption": "ABCD".index(letter), "timeSpent": 5.0}
+            for i, letter in enumerate(letters, start=1) if letter != "-"]
+
+
+def stored(app):
+    """Full submission documents of the quiz, once the outbox has delivered them"""
+    deliver(app)
+    return app.storage.find_submissions_before(ADMIN, QUIZ, datetime(9999, 1, 1), 100)
+
+
+def submit(client, link_id, name, **body):
+    return client.post(f"/api/quiz/{link_id}/submit",
+                       json=dict(student(name), link_id=link_id, totalTimeSpent="1m 0s", **body))
+
+
+def test_link_admits_up_to_the_plan_limit_once_per_student(app, client):
+    link_id = new_link(client)
+    for i, name in enumerate(["asha", "bala", "chitra"]):
+        response = submit(client, link_id, name, answers=listed(KEY))
+        assert response.status_code == 200 and response.json()["remaining_slots"] == 2 - i
+    assert response.json()["score_breakdown"]["correct_answers"] == 5
+
+    assert submit(client, link_id, "asha", answers=listed(KEY)).status_code == 409
+    assert submit(client, link_id, "dev", answers=listed(KEY)).status_code == 403
+    assert client.get(f"/api/quiz/{link_id}").status_code == 403
+
+    deliver(app)
+    assert app.storage.count_submissions(ADMIN, QUIZ) == 3
+    assert app.storage.get_link(link_id)["current_count"] == 3
+
+
+def test_packed_answers_score_like_the_answer_list(app, client):
+    link_id = new_link(client)
+    letters = "AB-DC"
+    by_list = submit(client, link_id, "asha", answers=listed(letters)).json()
+    by_packed = submit(client, link_id, "bala", packed={"selected": letters, "times": [5.0] * 5}).json()
+    assert by_packed["score_breakdown"] == by_list["score_breakdown"]
+    assert by_packed["score_breakdown"]["correct_answers"] == 3 and by_packed["score_breakdown"]["unanswered"] == 1
+
+    rejected = submit(client, link_id, "chitra", packed={"selected": "ABX"})
+    assert rejected.status_code == 422 and rejected.json()["detail"].startswith("Invalid packed answers")
+
+
+def test_bulk_links_are_capped_at_the_plan_and_fail_as_a_whole(app, client):
+    response = client.post("/admin/generate-links", headers=HEADERS, json={"links": [
+        {"quiz_id": QUIZ, "class_name": "6", "section": "A", "max_students": 2},
+        {"quiz_id": QUIZ, "class_name": "6", "section": "B", "max_students": 50}
+    ]})
+    assert response.status_code == 200
+    links = response.json()["links"]
+    assert [(link["section"], link["max_allowed"]) for link in links] == [("A", 2), ("B", 3)]
+    assert len({link["exam_id"] for link in links}) == 2
+    assert app.storage.get_link(links[0]["link_id"])["class_name"] == "6"
+    assert client.get(f"/api/quiz/{links[1]['link_id']}").json()["max_allowed"] == 3
+
+    failed = client.post("/admin/generate-links", headers=HEADERS, json={"links": [
+        {"quiz_id": QUIZ}, {"quiz_id": "No Such Quiz"}
+    ]})
+    assert failed.status_code == 404
+    assert client.post("/admin/generate-links", headers=HEADERS, json={"links": []}).status_code == 400
+
+
+def test_shuffled_answers_map_back_and_plain_ones_do_not(app, client):
+    link_id = new_link(client, shuffle=True)
+    view = client.get(f"/api/quiz/{link_id}", params=student("asha")).json()
+    assert view["shuffled"] and not client.get(f"/api/quiz/{link_id}").json()["shuffled"]
+
+    # Picking every served key, by question number and by served position, is full marks
+    served = view["questions"]
+    answers = [{"questionNumber": q["questionNumber"], "selectedOption": "ABCD".index(q["correct_answer"]), "timeSpent": 1.0}
+               for q in served]
+    assert submit(client, link_id, "asha", answers=answers, shuffled=True).json()["score_breakdown"]["percentage"] == 100
+    view = client.get(f"/api/quiz/{link_id}", params=student("bala")).json()
+    packed = {"selected": "".join(q["correct_answer"] for q in view["questions"])}
+    assert submit(client, link_id, "bala", packed=packed, shuffled=True).json()["score_breakdown"]["percentage"] == 100
+
+    # A client that was served the plain quiz sends shuffled=False and is scored as it is
+    assert submit(client, link_id, "chitra", answers=listed(KEY)).json()["score_breakdown"]["percentage"] == 100
+    assert sorted(doc["shuffled"] for doc in stored(app)) == [False, True, True]
+
+
+def test_timed_attempt_reserves_a_slot_and_is_submitted_at_its_deadline(app, client, monkeypatch):
+    link_id = new_link(client, duration_minutes=30)
+    started = client.post(f"/api/quiz/{link_id}/start", json=student("asha")).json()
+    assert started["timed"] and 1790 <= started["seconds_left"] <= 1800
+    assert client.post(f"/api/quiz/{link_id}/start", json=student("asha")).json()["deadline"] == started["deadline"]
+    for name in ("bala", "chitra"):
+        assert client.post(f"/api/quiz/{link_id}/start", json=student(name)).status_code == 200
+    assert client.post(f"/api/quiz/{link_id}/start", json=student("dev")).status_code == 403
+    # A student holding a slot can still load the quiz on a full link
+    assert client.get(f"/api/quiz/{link_id}", params=student("asha")).status_code == 200
+
+    saved = client.post(f"/api/quiz/{link_id}/progress", json=dict(student("asha"), answers=listed("AB---")))
+    assert saved.json()["saved"] == 2
+    assert submit(client, link_id, "bala", answers=listed(KEY)).status_code == 200
+
+    app.finalize_attempts([f"{link_id}:asha_6_A"])
+    assert submit(client, link_id, "asha", answers=listed(KEY)).status_code == 409
+    monkeypatch.setattr(app, "DEADLINE_GRACE_SECONDS", -3600)  # every deadline is now overdue
+    app.finalize_overdue_attempts()
+
+    docs = {doc["student_name"]: doc for doc in stored(app)}
+    assert sorted(docs) == ["asha", "bala", "chitra"]
+    assert docs["asha"]["auto_submitted"] and docs["asha"]["correct_answers"] == 2
+    assert docs["chitra"]["unanswered"] == 5 and not docs["bala"].get("auto_submitted")
+    link = app.storage.get_link(link_id)
+    assert link["current_count"] == 3 and link["reserved"] == 0
+
+
+def test_attempt_that_fails_to_score_is_retried(app, client, monkeypatch):
+    link_id = new_link(client, duration_minutes=30)
+    client.post(f"/api/quiz/{link_id}/start", json=student("asha"))
+    attempt = f"{link_id}:asha_6_A"
+
+    def unreadable(name):
+        raise OSError("quiz file unreadable")
+
+    load_quiz = app.load_quiz
+    monkeypatch.setattr(app, "load_quiz", unreadable)
+    app.finalize_attempts([attempt])
+    assert app.storage.get_attempt(attempt)["status"] == "failed"
+
+    monkeypatch.setattr(app, "load_quiz", load_quiz)
+    monkeypatch.setattr(app, "ATTEMPT_RETRY_SECONDS", -60)
+    app.retry_stuck_attempts()
+    assert app.storage.get_attempt(attempt)["status"] == "finalized"
+    assert deliver(app) == 1 and app.storage.get_link(link_id)["current_count"] == 1
+
+
+def test_submit_committed_to_the_outbox_succeeds_when_bookkeeping_fails(app, client, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("counter unavailable")
+
+    monkeypatch.setattr(app, "bump_submission_count", broken)
+    link_id = new_link(client)
+    assert submit(client, link_id, "asha", answers=listed(KEY)).status_code == 200
+    assert client.post("/quiz/submit", json={"studentName": "asha", "studentEmail": "asha@school", "quizName": QUIZ,
+                                             "answers": listed(KEY), "totalTimeSpent": "00:01:00",
+                                             "submittedAt": "2026-03-01T09:00:00"}).status_code == 200
+    deliver(app)
+    assert app.storage.count_submissions(ADMIN, QUIZ) == 1
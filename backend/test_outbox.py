@@ -0,0 +1,112 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from outbox import SubmissionOutbox
+from storage_sqlite import SQLiteStorage
+
+
+def doc(i):
+    return {"quiz_json_name": "q", "admin_email": "a@school", "student_name": f"s{i}", "score": float(i),
+            "percentage": float(i), "timestamp": datetime(2026, 1, 1, 10, 0, i), "answers": []}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "quizbuzz.db"))
+    yield storage
+    storage.close()
+
+
+class FlakyStorage:
+    """Stores the batch, then fails as a timed-out write that actually succeeded would"""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def deliver_submissions(self, docs):
+        self.storage.deliver_submissions(docs)
+        raise TimeoutError("no reply from storage")
+
+
+def test_delivery_runs_the_hook_once_and_clears(tmp_path, storage):
+    hooked = []
+    outbox = SubmissionOutbox(tmp_path / "outbox.db", on_delivered=lambda d: hooked.append(d["student_name"]))
+    keys = [outbox.put(doc(i)) for i in range(3)]
+    assert outbox.stats()["pending"] == 3
+
+    assert outbox.drain(storage) == 3
+    assert hooked == ["s0", "s1", "s2"] and outbox.stats()["pending"] == 0
+    assert [storage.get_submission(key)["student_name"] for key in keys] == ["s0", "s1", "s2"]
+    assert storage.get_submission(keys[0])["timestamp"] == datetime(2026, 1, 1, 10, 0, 0)
+
+
+def test_replayed_batch_stores_nothing_twice(tmp_path, storage):
+    outbox = SubmissionOutbox(tmp_path / "outbox.db")
+    docs = [doc(i) for i in range(4)]
+    outbox.put_many(docs)
+    outbox.put_many(docs)  # a retried put is skipped by key
+    assert outbox.stats()["pending"] == 4
+
+    storage.deliver_submissions([dict(d) for d in docs[:2]])  # stored by an earlier, interrupted replay
+    assert outbox.drain(storage) == 4
+    assert storage.count_submissions("a@school", "q") == 4
+
+
+def test_hook_runs_for_a_delivery_cut_short_before_it(tmp_path, storage):
+    hooked = []
+    outbox = SubmissionOutbox(tmp_path / "outbox.db", on_delivered=lambda d: hooked.append(d["student_name"]))
+    outbox.put(doc(1))
+    with pytest.raises(TimeoutError):
+        outbox.replay_once(FlakyStorage(storage))
+    assert hooked == [] and outbox.stats()["max_attempts"] == 1
+
+    # The next replay finds the submission stored already; the row was sent, so the hook is still owed
+    assert outbox.replay_once(storage) == 1
+    assert hooked == ["s1"] and outbox.stats()["pending"] == 0
+    assert storage.count_submissions("a@school", "q") == 1
+
+
+def test_duplicate_on_first_send_is_only_cleared(tmp_path, storage):
+    hooked = []
+    outbox = SubmissionOutbox(tmp_path / "outbox.db", on_delivered=lambda d: hooked.append(d["student_name"]))
+    first = doc(1)
+    outbox.put(first)
+    storage.deliver_submissions([dict(first)])
+    assert outbox.replay_once(storage) == 1
+    assert hooked == [] and outbox.stats()["pending"] == 0
+
+
+def test_pending_rows_survive_a_restart(tmp_path, storage):
+    path = tmp_path / "outbox.db"
+    SubmissionOutbox(path).put(doc(1))
+    reopened = SubmissionOutbox(path)
+    assert reopened.stats()["pending"] == 1
+    assert reopened.drain(storage) == 1
+
+
+def test_outbox_from_before_the_sent_column_is_migrated(tmp_path, storage):
+    path = tmp_path / "outbox.db"
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE outbox (seq INTEGER PRIMARY KEY AUTOINCREMENT, submission_key TEXT NOT NULL UNIQUE,
+                    created_at TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, doc TEXT NOT NULL)""")
+    conn.commit()
+    conn.close()
+    outbox = SubmissionOutbox(path)
+    outbox.put(doc(1))
+    assert outbox.drain(storage) == 1
+
+
+def test_background_replayer_delivers(tmp_path, storage):
+    outbox = SubmissionOutbox(tmp_path / "outbox.db")
+    outbox.start(storage)
+    try:
+        outbox.put(doc(1))
+        for _ in range(100):
+            if storage.count_submissions("a@school", "q"):
+                break
+            outbox._stop.wait(0.02)
+    finally:
+        outbox.stop()
+    assert storage.count_submissions("a@school", "q") == 1
@@ -0,0 +1,74 @@
+import io
+import json
+
+import pytest
+
+from quiz_bank import NO_KEY, CompiledQuiz, QuizRepository, QuizValidationError, iter_json_array
+
+
+def question(number, answer="A", options=("one", "two", "three", "four")):
+    return {"questionNumber": number, "questionText": f"Question {number}", "question_images": [],
+            "option_with_images_": list(options), "correct_answer": answer}
+
+
+@pytest.fixture
+def repository(tmp_path):
+    (tmp_path / "quiz").mkdir()
+    (tmp_path / "images").mkdir()
+    return QuizRepository([tmp_path / "quiz"], tmp_path / "images")
+
+
+def test_iter_json_array_across_chunk_boundaries():
+    items = [question(i) for i in range(1, 40)] + [12345, "text", [1, 2]]
+    raw = json.dumps(items).encode("utf-8")
+    assert list(iter_json_array(io.BytesIO(raw), chunk_size=7)) == items
+    assert list(iter_json_array(io.BytesIO(b"\xef\xbb\xbf [ ] "), chunk_size=1)) == []
+
+
+@pytest.mark.parametrize("raw", [b"{}", b"[1, 2", b"[1 2]", b"[1] x", b"[1,]"])
+def test_iter_json_array_rejects_malformed(raw):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.BytesIO(raw), chunk_size=2))
+
+
+def test_compiled_key_codes():
+    quiz = CompiledQuiz("q", [question(1, "B"), question(2, 3), question(3, "x")], "v1")
+    assert quiz.answer_key == ["B", "D", None]
+    assert quiz.key_codes == bytes([2, 4, NO_KEY])
+    assert quiz.position == {1: 0, 2: 1, 3: 2} and len(quiz) == 3
+
+
+def test_upload_reports_every_error(repository):
+    bad = [question(1), question(1), {"questionNumber": "3", "option_with_images_": ["a"], "correct_answer": "E"},
+           dict(question(4, "D", ("a", "b"))), dict(question(5), question_images=["missing.png"])]
+    with pytest.raises(QuizValidationError) as raised:
+        repository.compile_upload("Unit Quiz", io.BytesIO(json.dumps(bad).encode("utf-8")))
+    errors = "\n".join(raised.value.errors)
+    assert "Question 1: duplicate questionNumber" in errors
+    assert "questionNumber must be an integer" in errors
+    assert "questionText is missing" in errors
+    assert "must list 2 to 4 options" in errors
+    assert "correct_answer D has no matching option" in errors
+    assert "image 'missing.png' not found" in errors
+
+
+def test_upload_rejects_bad_names_and_empty_quizzes(repository):
+    with pytest.raises(QuizValidationError):
+        repository.compile_upload("../escape", io.BytesIO(b"[]"))
+    with pytest.raises(QuizValidationError) as raised:
+        repository.compile_upload("Empty", io.BytesIO(b"[]"))
+    assert raised.value.errors == ["Quiz has no questions"]
+
+
+def test_publish_then_load_is_cached_until_the_file_changes(repository):
+    questions = [question(1), question(2, "C")]
+    published = repository.publish("Unit Quiz", questions)
+    assert repository.load("Unit Quiz") is published
+    assert repository.available() == ["Unit Quiz"]
+
+    path = repository.find_path("Unit Quiz")
+    path.write_text(json.dumps([question(1, "D")]))
+    reloaded = repository.load("Unit Quiz")
+    assert reloaded is not published and reloaded.answer_key == ["D"]
+    assert reloaded.version != published.version
+    assert repository.load("Missing") is None
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+from quiz_bank import CompiledQuiz
+from rescore import get_job, public_job, run_rescore_job, start_or_resume_job
+from storage_sqlite import SQLiteStorage
+
+ADMIN = "a@school"
+
+
+def quiz(key, version):
+    return CompiledQuiz("Maths", [{"questionNumber": i, "option_with_images_": ["a", "b", "c", "d"], "correct_answer": letter}
+                                  for i, letter in enumerate(key, start=1)], version)
+
+
+def submission(i, picks):
+    answers = [{"questionNumber": q, "selectedOption": pick, "timeSpent": 1.0} for q, pick in enumerate(picks, start=1)]
+    return {"quiz_json_name": "Maths", "admin_email": ADMIN, "student_name": f"s{i}", "class_name": "6", "section": "A",
+            "timestamp": datetime(2026, 1, 1, 9, 0, i), "answers": answers, "correct_answers": None}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "quizbuzz.db"))
+    storage.ensure_indexes()
+    yield storage
+    storage.close()
+
+
+def test_job_rescores_every_submission_in_batches(storage):
+    # Student i picks A on the first i % 4 questions and D after
+    storage.insert_submissions([submission(i, [0] * (i % 4) + [3] * (3 - i % 4)) for i in range(11)])
+    old, new = quiz("DDD", "v1"), quiz("AAA", "v2")
+    completed = []
+    job = start_or_resume_job(storage, ADMIN, new)
+    assert job["total"] == 11 and start_or_resume_job(storage, ADMIN, new)["_id"] == job["_id"]
+    assert start_or_resume_job(storage, ADMIN, old)["_id"] != job["_id"]
+
+    run_rescore_job(storage, job["_id"], new, batch_size=4, on_complete=lambda: completed.append(1))
+    done = public_job(get_job(storage, job["_id"], ADMIN))
+    assert (done["status"], done["processed"], done["changed"], done["progress"]) == ("completed", 11, 11, 100.0)
+    assert completed == [1] and get_job(storage, job["_id"], "other@school") is None
+
+    rows = list(storage.iter_submission_answers(ADMIN, "Maths"))
+    assert sorted(row["correct_answers"] for row in rows) == sorted(i % 4 for i in range(11))
+    doc = storage.get_submission(rows[0]["_id"])
+    assert doc["quiz_version"] == "v2" and doc["total_questions"] == 3
+
+
+def test_failed_job_resumes_from_its_checkpoint(storage):
+    storage.insert_submissions([submission(i, [0, 0, 0]) for i in range(6)])
+    key = quiz("AAA", "v2")
+    job = start_or_resume_job(storage, ADMIN, key)
+    updates = storage.update_submissions
+    calls = []
+
+    def fail_second_batch(batch):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        updates(batch)
+
+    storage.update_submissions = fail_second_batch
+    run_rescore_job(storage, job["_id"], key, batch_size=2)
+    failed = get_job(storage, job["_id"], ADMIN)
+    assert failed["status"] == "failed" and failed["processed"] == 2 and failed["error"] == "connection lost"
+
+    storage.update_submissions = updates
+    assert start_or_resume_job(storage, ADMIN, key)["_id"] == job["_id"]
+    run_rescore_job(storage, job["_id"], key, batch_size=2)
+    resumed = get_job(storage, job["_id"], ADMIN)
+    assert resumed["status"] == "completed" and resumed["processed"] == 6
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from response_cache import ResponseCache
+
+TAG = ("a@school", "Maths")
+
+
+def loader(payload, calls, tag=TAG):
+    def load():
+        calls.append(1)
+        return tag, payload
+    return load
+
+
+def test_second_read_is_a_hit_until_the_quiz_changes():
+    cache, calls = ResponseCache(1 << 20), []
+    first = cache.get_or_load(("exam", 1), loader({"n": 1}, calls))
+    second = cache.get_or_load(("exam", 1), loader({"n": 2}, calls))
+    assert first.headers["x-cache"] == "MISS" and second.headers["x-cache"] == "HIT"
+    assert json.loads(second.body) == {"n": 1} and len(calls) == 1
+
+    cache.invalidate("a@school", "Physics")
+    assert cache.get_or_load(("exam", 1), loader({"n": 3}, calls)).headers["x-cache"] == "HIT"
+    cache.invalidate(*TAG)
+    assert json.loads(cache.get_or_load(("exam", 1), loader({"n": 4}, calls)).body) == {"n": 4}
+    assert cache.stats()["endpoints"]["exam"] == {"hits": 2, "misses": 1, "stale": 1, "hit_rate": 0.5}
+
+
+def test_write_during_a_load_is_not_cached_as_fresh():
+    cache, calls = ResponseCache(1 << 20), []
+
+    def racing_load():
+        calls.append(1)
+        cache.invalidate(*TAG)  # a submission lands while the page is being built
+        return TAG, {"n": len(calls)}
+
+    cache.get_or_load(("exam", 1), racing_load)
+    assert cache.get_or_load(("exam", 1), loader({"n": 9}, calls)).headers["x-cache"] == "MISS"
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache, calls = ResponseCache(60), []
+    for key in ("a", "b", "c"):
+        cache.get_or_load(("exam", key), loader({"body": "x" * 10}, calls))
+    cache.get_or_load(("exam", "a"), loader({}, calls))  # touch a
+    cache.get_or_load(("exam", "d"), loader({"body": "x" * 10}, calls))
+    assert cache.stats()["bytes"] <= 60 and cache.stats()["evictions"] >= 1
+    assert cache.get_or_load(("exam", "a"), loader({}, calls)).headers["x-cache"] == "HIT"
+    assert cache.get_or_load(("exam", "b"), loader({}, calls)).headers["x-cache"] == "MISS"
+
+
+def test_oversized_bodies_and_errors_are_not_cached():
+    cache, calls = ResponseCache(10), []
+    cache.get_or_load(("exam", 1), loader({"body": "x" * 50}, calls))
+    assert cache.stats()["entries"] == 0
+
+    def missing():
+        raise HTTPException(status_code=404)
+    with pytest.raises(HTTPException):
+        cache.get_or_load(("exam", 2), missing)
+    assert cache.stats()["entries"] == 0
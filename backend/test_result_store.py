@@ -0,0 +1,57 @@
+import json
+
+from quiz_bank import CompiledQuiz
+from result_store import ResultStore, pack_sheet, unpack_sheet
+from scoring import align_answers
+
+QUIZ = CompiledQuiz("q", [{"questionNumber": i, "questionText": f"Q{i}", "option_with_images_": ["a", "b", "c", "d"],
+                           "correct_answer": "B"} for i in range(1, 4)], "v1")
+
+
+def sheet_for(*answers):
+    return align_answers(QUIZ, [{"questionNumber": n, "selectedOption": o, "timeSpent": t, "isMarked": m}
+                                for n, o, t, m in answers])
+
+
+def add(store, name, sheet, score):
+    store.append(QUIZ, sheet, student_name=name, student_email=f"{name}@school", score=score, correct=1,
+                 answered=2, time_spent_seconds=75, submitted_at="2026-01-01T10:00:00")
+
+
+def test_pack_round_trip_keeps_codes_marks_and_times():
+    sheet = sheet_for((1, 1, 2.5, True), (3, 9, 4, False))
+    restored = unpack_sheet(pack_sheet(sheet), sheet.invalid)
+    assert restored.codes == sheet.codes and restored.marked == sheet.marked
+    assert restored.times == [2.5, 0.0, 4.0] and restored.invalid == {2: 9}
+
+
+def test_results_rebuild_the_student_result_shape():
+    store = ResultStore(10)
+    add(store, "asha", sheet_for((1, 1, 3, True), (2, 0, 5, False)), 33.3)
+    (row,) = store.results(lambda name: QUIZ)
+    assert row["studentName"] == "asha" and row["quizName"] == "q" and row["timeSpent"] == "00:01:15"
+    assert row["score"] == 33.3 and row["totalQuestions"] == 3
+    assert [d["status"] for d in row["detailedResults"]] == ["CORRECT", "WRONG", "UNANSWERED"]
+    assert row["detailedResults"][0]["isMarked"] is True
+
+
+def test_full_store_evicts_oldest_to_the_archive(tmp_path):
+    archive = tmp_path / "archive.jsonl"
+    store = ResultStore(2, archive)
+    for i, score in enumerate((10.0, 20.0, 30.0)):
+        add(store, f"s{i}", sheet_for((1, 1, 1, False), (3, 7, 2, True)), score)
+
+    assert len(store) == 2 and store.average_score() == 25.0
+    assert [r["studentName"] for r in store.results(lambda name: QUIZ)] == ["s1", "s2"]
+    assert [r["studentName"] for r in store.results(lambda name: QUIZ, limit=1)] == ["s2"]
+    (evicted,) = [json.loads(line) for line in archive.read_text().splitlines()]
+    assert evicted["studentName"] == "s0" and evicted["answers"] == "B-?" and evicted["marked"] == [2]
+
+
+def test_changed_quiz_drops_details_rather_than_misaligning():
+    store = ResultStore(3)
+    add(store, "s", sheet_for((1, 1, 1, False)), 10.0)
+    shorter = CompiledQuiz("q", QUIZ.questions[:2], "v2")
+    assert store.results(lambda name: shorter)[0]["detailedResults"] == []
+    store.clear()
+    assert len(store) == 0 and store.average_score() == 0
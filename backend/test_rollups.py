@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from rollups import HISTOGRAM_BUCKETS, bucket_for, format_rollup
+
+
+def test_bucket_for_clamps_to_the_histogram():
+    assert [bucket_for(p) for p in (-5, 0, 9.99, 10, 55, 99.9, 100, 250)] == [0, 0, 0, 1, 5, 9, 9, 9]
+
+
+def test_format_rollup_statistics():
+    scores = [40.0, 60.0, 100.0]
+    doc = {"quiz_name": "q", "class_name": "6", "section": "A", "count": len(scores), "sum": sum(scores),
+           "sum_sq": sum(s * s for s in scores), "min": 40.0, "max": 100.0, "histogram": {"4": 1, "6": 1, "9": 1}}
+    rollup = format_rollup(doc)
+    assert (rollup["count"], rollup["mean"], rollup["variance"], rollup["std_dev"]) == (3, 66.67, 622.22, 24.94)
+    assert len(rollup["histogram"]) == HISTOGRAM_BUCKETS
+    assert rollup["histogram"][9] == {"range": "90-100", "count": 1}
+    assert sum(b["count"] for b in rollup["histogram"]) == 3
+
+
+def test_format_rollup_never_reports_negative_variance():
+    doc = {"quiz_name": "q", "class_name": "6", "section": "A", "count": 3, "sum": 3 * 33.3,
+           "sum_sq": 3 * 33.3 * 33.3 - 1e-9, "histogram": {}}
+    assert format_rollup(doc)["variance"] == 0
+    assert format_rollup({"quiz_name": "q", "class_name": "6", "section": "A"})["mean"] == 0
+
+
+def test_rebuild_matches_the_incremental_rollups(tmp_path):
+    from rollups import query_rollups, rebuild_rollups, record_submission
+    from storage_sqlite import SQLiteStorage
+
+    storage = SQLiteStorage(str(tmp_path / "quizbuzz.db"))
+    storage.ensure_indexes()
+    docs = [{"quiz_json_name": "q", "admin_email": "a@school", "class_name": "6", "section": "AB"[i % 2],
+             "percentage": float(i * 9 % 101), "timestamp": datetime(2026, 1, 1, 9, 0, i)} for i in range(20)]
+    storage.insert_submissions(docs)
+    for doc in docs:
+        record_submission(storage, doc)
+    incremental = query_rollups(storage, "a@school", "q")
+    assert [(r["section"], r["count"]) for r in incremental] == [("A", 10), ("B", 10)]
+
+    assert rebuild_rollups(storage, "a@school", "q") == 2
+    assert query_rollups(storage, "a@school", "q") == incremental
+    assert query_rollups(storage, "a@school", class_name="7") == []
+    storage.close()
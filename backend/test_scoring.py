@@ -0,0 +1,51 @@
+import random
+
+from quiz_bank import INVALID_ANSWER, NO_ANSWER, CompiledQuiz
+from scoring import align_answers, score_sheet, sheet_answers, tally, tally_batch
+
+
+def make_quiz(keys):
+    questions = [{"questionNumber": i, "questionText": f"Q{i}", "option_with_images_": ["a", "b", "c", "d"],
+                  "correct_answer": key} for i, key in enumerate(keys, start=1)]
+    return CompiledQuiz("unit", questions, "v1")
+
+
+def test_align_answers_by_question_number():
+    quiz = make_quiz(["A", "B", "C"])
+    sheet = align_answers(quiz, [
+        {"questionNumber": 3, "selectedOption": 2, "timeSpent": 4, "isMarked": True},
+        {"questionNumber": 3, "selectedOption": 0},  # later duplicates lose
+        {"questionNumber": 9, "selectedOption": 1},  # unknown question
+        {"questionNumber": 1, "selectedOption": 7}
+    ])
+    assert list(sheet.codes) == [INVALID_ANSWER, NO_ANSWER, 3]
+    assert sheet.invalid == {0: 7}
+    assert sheet.times == [0, 0.0, 4] and list(sheet.marked) == [0, 0, 1]
+    assert sheet_answers(quiz, sheet) == [
+        {"questionNumber": 1, "selectedOption": 7, "timeSpent": 0, "isMarked": False},
+        {"questionNumber": 3, "selectedOption": 2, "timeSpent": 4, "isMarked": True}
+    ]
+
+
+def test_score_sheet_counts_and_details():
+    quiz = make_quiz(["A", "B", "C", "x"])
+    sheet = align_answers(quiz, [{"questionNumber": 1, "selectedOption": 0}, {"questionNumber": 2, "selectedOption": 0},
+                                 {"questionNumber": 4, "selectedOption": 0}])
+    score = score_sheet(quiz, sheet)
+    assert (score["correct"], score["wrong"], score["unanswered"], score["percentage"]) == (1, 2, 1, 25.0)
+    assert [d["status"] for d in score["details"]] == ["CORRECT", "WRONG", "UNANSWERED", "WRONG"]
+    assert score["details"][1]["correctLetter"] == "B" and score["details"][1]["selectedLetter"] == "A"
+
+
+def test_tally_batch_matches_per_sheet_tally():
+    rng = random.Random(7)
+    for size in (0, 1, 7, 100):
+        quiz = make_quiz([rng.choice(["A", "B", "C", "D", None]) for _ in range(size)])
+        batch = [bytearray(rng.choice([0, 1, 2, 3, 4, 5]) for _ in range(size)) for _ in range(300)]
+        assert tally_batch(quiz, batch) == [tally(quiz.key_codes, codes) for codes in batch]
+    assert tally_batch(make_quiz(["A"]), []) == []
+
+
+def test_unkeyed_questions_never_count_as_correct():
+    quiz = make_quiz([None, None])
+    assert tally_batch(quiz, [bytearray([1, 5]), bytearray([0, 0])]) == [(0, 2, 0), (0, 0, 2)]
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from quiz_bank import QuizRepository
+from search_index import QuestionSearchIndex, tokenize
+
+
+def write_quiz(directory, name, texts):
+    questions = [{"questionNumber": i, "questionText": text, "option_with_images_": ["alpha", "beta", "leaf.png"],
+                  "correct_answer": "A"} for i, text in enumerate(texts, start=1)]
+    (directory / f"{name}.json").write_text(json.dumps(questions))
+
+
+@pytest.fixture
+def quiz_dir(tmp_path):
+    (tmp_path / "quiz").mkdir()
+    return tmp_path / "quiz"
+
+
+@pytest.fixture
+def index(quiz_dir, tmp_path):
+    write_quiz(quiz_dir, "Biology", ["Where does photosynthesis happen in a plant?", "What is the unit of life?"])
+    write_quiz(quiz_dir, "Physics", ["What is the SI unit of force?", "Light travels as a photon stream"])
+    index = QuestionSearchIndex(QuizRepository([quiz_dir], tmp_path / "images"), refresh_interval=0)
+    assert index.refresh(force=True) == 2
+    return index
+
+
+def test_tokenize_normalises_and_drops_stop_words():
+    assert tokenize("The Ｕnit of FORCE, in_SI") == ["unit", "force", "si"]
+
+
+def test_every_term_must_match(index):
+    results = index.search("unit force")
+    assert [(r["quiz_name"], r["questionNumber"]) for r in results] == [("Physics", 1)]
+    assert index.search("unit banana") == []
+
+
+def test_last_term_matches_as_prefix(index):
+    assert {r["quiz_name"] for r in index.search("photo")} == {"Biology", "Physics"}
+    assert index.search("photo", prefix=False) == []
+    assert [r["quiz_name"] for r in index.search("photo", quiz_name="Physics")] == ["Physics"]
+
+
+def test_image_options_are_not_indexed(index):
+    assert index.search("leaf") == []
+    assert len(index.search("alpha", limit=3)) == 3
+
+
+def test_refresh_reindexes_changed_and_removed_files(index, quiz_dir):
+    write_quiz(quiz_dir, "Physics", ["Momentum is mass times velocity"])
+    (quiz_dir / "Biology.json").unlink()
+    assert index.refresh(force=True) == 2
+    assert index.search("unit") == []
+    assert [r["quiz_name"] for r in index.search("momentum")] == ["Physics"]
+    assert index.stats()["quizzes"] == 1 and index.stats()["questions"] == 1
+
+
+def test_unreadable_files_are_skipped_until_they_change(index, quiz_dir):
+    (quiz_dir / "Broken.json").write_text("{not json")
+    assert index.refresh(force=True) == 0
+    assert index.stats()["quizzes"] == 2
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from quiz_bank import CompiledQuiz, OPTION_LETTERS
+from scoring import align_answers, score_sheet
+from shuffle import QuizPermutation, student_seed
+from wire_format import decode_packed
+
+
+def make_quiz():
+    questions = []
+    for i in range(1, 31):
+        count = 2 + i % 3  # two to four options
+        questions.append({"questionNumber": i, "questionText": f"Q{i}",
+                          "option_with_images_": [f"q{i} option {k}" for k in range(count)],
+                          "correct_answer": OPTION_LETTERS[i % count]})
+    return CompiledQuiz("q", questions, "v1")
+
+
+QUIZ = make_quiz()
+
+
+def test_seed_is_stable_and_per_student():
+    assert student_seed("L1", "asha_6_A") == student_seed("L1", "asha_6_A")
+    assert len({student_seed("L1", f"s{i}") for i in range(100)} | {student_seed("L2", "s0")}) == 101
+
+
+def test_served_view_is_a_permutation_with_a_consistent_key():
+    permutation = QuizPermutation(QUIZ, student_seed("L1", "asha"))
+    served = permutation.questions()
+    assert sorted(q["questionNumber"] for q in served) == list(range(1, 31))
+    assert [q["questionNumber"] for q in served] != list(range(1, 31))
+    for question in served:
+        original = QUIZ.by_number[question["questionNumber"]]
+        assert sorted(question["option_with_images_"]) == sorted(original["option_with_images_"])
+        # The served key names the same option text as the original key
+        served_text = question["option_with_images_"][OPTION_LETTERS.index(question["correct_answer"])]
+        original_text = original["option_with_images_"][OPTION_LETTERS.index(original["correct_answer"])]
+        assert served_text == original_text
+    assert QUIZ.questions[0]["option_with_images_"][0] == "q1 option 0"  # the shared quiz is untouched
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_round_trip_scores_the_option_text_the_student_picked(seed):
+    rng = random.Random(seed)
+    permutation = QuizPermutation(QUIZ, student_seed("L1", f"student-{seed}"))
+    served = permutation.questions()
+
+    # The student picks option texts on their screen; packed answers are by served position
+    picks = [rng.randrange(-1, len(q["option_with_images_"])) for q in served]
+    selected = "".join("-" if k < 0 else OPTION_LETTERS[k] for k in picks)
+    times = [float(p) for p in range(len(served))]
+    sheet = permutation.unshuffle(decode_packed(QUIZ, selected, times))
+
+    for position, (question, k) in enumerate(zip(served, picks)):
+        q = QUIZ.position[question["questionNumber"]]
+        assert sheet.times[q] == position
+        if k < 0:
+            assert sheet.codes[q] == 0
+        else:
+            picked_text = question["option_with_images_"][k]
+            assert QUIZ.questions[q]["option_with_images_"][sheet.codes[q] - 1] == picked_text
+
+    # Answer lists keyed by questionNumber only need the option mapping, and agree with the packed path
+    listed = permutation.map_options(align_answers(QUIZ, [
+        {"questionNumber": question["questionNumber"], "selectedOption": k}
+        for question, k in zip(served, picks) if k >= 0
+    ]))
+    assert listed.codes == sheet.codes
+    correct_served = sum(1 for question, k in zip(served, picks) if k >= 0 and OPTION_LETTERS[k] == question["correct_answer"])
+    assert score_sheet(QUIZ, sheet)["correct"] == correct_served
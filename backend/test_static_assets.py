@@ -0,0 +1,85 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from static_assets import IMMUTABLE_CACHE, REVALIDATE_CACHE, StaticAssetTable, accepted_encodings, brotli
+
+SCRIPT = ("console.log('quizz-buzz');\n" * 200).encode("utf-8")
+
+
+@pytest.fixture
+def client(tmp_path):
+    (tmp_path / "static" / "js").mkdir(parents=True)
+    (tmp_path / "static" / "js" / "main.3f2a9c1b.js").write_bytes(SCRIPT)
+    (tmp_path / "index.html").write_bytes(b"<!doctype html><div id=root></div>")
+    table = StaticAssetTable(tmp_path)
+    assert table.load() == 2
+
+    app = FastAPI()
+
+    @app.get("/{path:path}")
+    def serve(path: str, request: Request):
+        asset = table.get(path)
+        if asset is None:
+            raise HTTPException(status_code=404)
+        return table.respond(asset, request)
+
+    return TestClient(app)
+
+
+def test_accepted_encodings_parses_quality_values():
+    assert accepted_encodings("gzip;q=0.5, br, identity;q=x") == {"gzip": 0.5, "br": 1.0, "identity": 0.0}
+    assert accepted_encodings("") == {}
+
+
+def test_hashed_files_are_immutable_and_precompressed(client):
+    response = client.get("/static/js/main.3f2a9c1b.js", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE
+    assert response.headers["content-encoding"] == "gzip" and response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert response.content == SCRIPT  # decoded by the client
+    assert response.headers["content-type"] == "application/javascript; charset=utf-8"
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli not installed")
+def test_brotli_is_preferred_when_accepted(client):
+    response = client.get("/static/js/main.3f2a9c1b.js", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+
+
+def test_identity_when_no_encoding_is_accepted(client):
+    response = client.get("/static/js/main.3f2a9c1b.js", headers={"Accept-Encoding": "identity, gzip;q=0"})
+    assert "content-encoding" not in response.headers
+    assert response.content == SCRIPT
+    assert response.headers["etag"].count("-") == 0
+
+
+def test_matching_etag_gets_304_per_encoding(client):
+    first = client.get("/static/js/main.3f2a9c1b.js", headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["etag"]
+    again = client.get("/static/js/main.3f2a9c1b.js", headers={"Accept-Encoding": "gzip", "If-None-Match": f'"other", {etag}'})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+
+    # The gzip variant's tag does not validate the identity body
+    plain = client.get("/static/js/main.3f2a9c1b.js", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert plain.status_code == 200 and plain.content == SCRIPT
+    assert client.get("/index.html", headers={"If-None-Match": "*"}).status_code == 304
+
+
+def test_small_unhashed_files_revalidate_uncompressed(client):
+    response = client.get("/index.html", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["cache-control"] == REVALIDATE_CACHE
+    assert "content-encoding" not in response.headers and "vary" not in response.headers
+    assert client.get("/missing.js").status_code == 404
+
+
+def test_gzip_variant_is_deterministic(tmp_path):
+    (tmp_path / "app.css").write_bytes(SCRIPT)
+    table = StaticAssetTable(tmp_path)
+    table.load()
+    asset = table.get("/app.css")
+    assert gzip.decompress(asset.variants["gzip"]) == SCRIPT
+    assert StaticAssetTable(tmp_path).load() == 1 and table.stats()["files"] == 1
@@ -0,0 +1,18 @@
+import pytest
+
+import storage_check
+from storage_sqlite import SQLiteStorage
+
+
+def test_sqlite_storage_passes_the_storage_check(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "check.db"))
+    try:
+        storage_check.check(storage, count=300, workers=8)
+    finally:
+        storage.close()
+
+
+def test_mongo_storage_passes_the_storage_check():
+    mongomock = pytest.importorskip("mongomock")
+    from storage_mongo import MongoStorage
+    storage_check.check(MongoStorage(mongomock.MongoClient().db), count=300, workers=8)
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from quiz_bank import CompiledQuiz
+from time_sketches import WORKER_ID, TDigest, TimeSketchRecorder, format_duration, parse_duration, time_report
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def rank_error(values, estimate, q):
+    """How far, as a fraction of the data, the estimate's rank is from q"""
+    below = sum(1 for v in values if v < estimate)
+    return abs(below / len(values) - q)
+
+
+@pytest.mark.parametrize("distribution", ["uniform", "lognormal", "bimodal"])
+def test_quantiles_stay_within_rank_error(distribution):
+    rng = random.Random(35)
+    draw = {
+        "uniform": lambda: rng.uniform(0, 600),
+        "lognormal": lambda: rng.lognormvariate(3, 1),
+        "bimodal": lambda: rng.gauss(20, 3) if rng.random() < 0.7 else rng.gauss(240, 30)
+    }[distribution]
+    values = [draw() for _ in range(20000)]
+    digest = TDigest()
+    for value in values:
+        digest.add(value)
+
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        assert rank_error(values, digest.quantile(q), q) < 0.01, q
+    assert digest.quantile(0) == pytest.approx(min(values))
+    assert digest.quantile(1) == pytest.approx(max(values))
+    assert len(digest.means) < 300
+
+
+def test_merged_worker_digests_match_one_digest():
+    rng = random.Random(1)
+    values = [rng.expovariate(1 / 30) for _ in range(12000)]
+    parts = [TDigest() for _ in range(4)]
+    for i, value in enumerate(values):
+        parts[i % 4].add(value)
+
+    merged = TDigest()
+    for part in parts:
+        merged.merge(TDigest.from_dict(part.to_dict()))
+    assert merged.total == len(values)
+    for q in (0.5, 0.9):
+        assert rank_error(values, merged.quantile(q), q) < 0.01
+        assert merged.quantile(q) == pytest.approx(exact_quantile(values, q), rel=0.05)
+
+
+def test_empty_and_single_value_digests():
+    assert TDigest().quantile(0.5) is None
+    digest = TDigest()
+    digest.add(42.0)
+    assert digest.quantile(0.1) == digest.quantile(0.9) == 42.0
+
+
+@pytest.mark.parametrize("value, seconds", [("01:02:03", 3723), ("05:30", 330), ("45", 45), (90.7, 90),
+                                            ("", None), ("1:x", None), ("-1:00", None), (True, None), ("1:2:3:4", None)])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+def test_format_duration():
+    assert format_duration(3723) == "01:02:03" and format_duration(-5) == "00:00:00"
+
+
+def test_worker_id_has_a_random_part():
+    # A restarted container keeps its hostname and pid; the random part keeps it off its predecessor's row
+    suffix = WORKER_ID.rsplit("-", 1)[1]
+    assert len(suffix) == 12 and int(suffix, 16) >= 0
+
+
+class FakeSketchStorage:
+    def __init__(self):
+        self.rows = {}
+
+    def save_time_sketch(self, admin_email, quiz_name, quiz_version, worker_id, sketch, updated_at):
+        self.rows[(admin_email, quiz_name, quiz_version, worker_id)] = sketch
+
+    def find_time_sketches(self, admin_email, quiz_name, quiz_version):
+        return [{"worker_id": key[3], "sketch": sketch} for key, sketch in self.rows.items()
+                if key[:3] == (admin_email, quiz_name, quiz_version)]
+
+
+def test_recorders_merge_across_workers():
+    quiz = CompiledQuiz("q", [{"questionNumber": 1}, {"questionNumber": 2}], "v1")
+    storage = FakeSketchStorage()
+    first, second = TimeSketchRecorder("w1"), TimeSketchRecorder("w2")
+    for seconds in range(1, 11):
+        first.record("a@school", quiz, [seconds, 0], seconds * 10)
+        second.record("a@school", quiz, [seconds + 10, 5], None)
+    assert first.flush(storage) == 1 and first.flush(storage) == 0
+    second.flush(storage)
+
+    report = time_report(first.merged(storage, "a@school", "q", "v1"), quiz)
+    assert report["quiz"]["count"] == 10
+    assert [q["count"] for q in report["questions"]] == [20, 10]
+    assert report["questions"][0]["min_seconds"] == 1 and report["questions"][0]["max_seconds"] == 20
+    assert report["questions"][1]["median_seconds"] == 5
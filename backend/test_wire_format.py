@@ -0,0 +1,64 @@
+import base64
+import random
+
+import pytest
+
+from quiz_bank import CompiledQuiz, OPTION_LETTERS
+from scoring import align_answers, sheet_answers
+from wire_format import PackedAnswerError, decode_packed
+
+QUIZ = CompiledQuiz("q", [{"questionNumber": i * 10, "option_with_images_": ["a", "b", "c", "d"], "correct_answer": "A"}
+                          for i in range(1, 21)], "v1")
+
+
+def encode(codes, times, marked):
+    """Client side of the format: positions in quiz order"""
+    selected = "".join("-" if code == 0 else OPTION_LETTERS[code - 1] for code in codes)
+    bits = sum(1 << pos for pos, flag in enumerate(marked) if flag)
+    bitmap = base64.b64encode(bits.to_bytes((len(codes) + 7) // 8, "little")).decode("ascii")
+    return selected, list(times), bitmap
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_packed_round_trip_matches_the_answer_list(seed):
+    rng = random.Random(seed)
+    codes = [rng.randrange(0, 5) for _ in QUIZ.questions]
+    times = [round(rng.uniform(0, 90), 1) if code else 0.0 for code in codes]
+    # The answer list has no entry for an unanswered question, so only answered ones carry a mark
+    marked = [bool(code) and rng.random() < 0.3 for code in codes]
+
+    selected, packed_times, bitmap = encode(codes, times, marked)
+    packed = decode_packed(QUIZ, selected, packed_times, bitmap)
+    assert list(packed.codes) == codes and packed.times == times and list(packed.marked) == [int(m) for m in marked]
+
+    # The same answers through the StudentAnswer list give the same sheet and the same stored answers
+    listed = align_answers(QUIZ, sheet_answers(QUIZ, packed))
+    assert listed.codes == packed.codes and listed.marked == packed.marked
+    assert sheet_answers(QUIZ, listed) == sheet_answers(QUIZ, packed)
+
+    as_integers = decode_packed(QUIZ, [code - 1 for code in codes], packed_times, bitmap)
+    assert as_integers.codes == packed.codes
+
+
+def test_optional_fields_default_to_zero():
+    sheet = decode_packed(QUIZ, "-" * 20)
+    assert sheet.times == [0.0] * 20 and not any(sheet.marked) and not any(sheet.codes)
+
+
+@pytest.mark.parametrize("selected, times, marked", [
+    ("A" * 19, None, None),
+    ("A" * 19 + "E", None, None),
+    ("A" * 19 + "é", None, None),
+    ([0] * 19 + [4], None, None),
+    ([0] * 19 + [True], None, None),
+    ({"1": "A"}, None, None),
+    ("A" * 20, [1] * 19, None),
+    ("A" * 20, [1] * 19 + [-1], None),
+    ("A" * 20, [1] * 19 + ["x"], None),
+    ("A" * 20, None, "not base64!"),
+    ("A" * 20, None, base64.b64encode(b"\x00\x00").decode()),
+    ("A" * 20, None, base64.b64encode(b"\x00\x00\x10").decode()),
+])
+def test_invalid_packed_answers_are_rejected(selected, times, marked):
+    with pytest.raises(PackedAnswerError):
+        decode_packed(QUIZ, selected, times, marked)
@@ -0,0 +1,279 @@
+import logging
+import math
+import socket
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from quiz_bank import CompiledQuiz
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPRESSION = 100
+QUANTILES = (0.5, 0.9)
+
+# Each process writes only its own sketch rows; readers merge every worker's row.
+# Random per process: a restarted container keeps its hostname and pid, and reusing
+# the id would let the fresh, empty digests overwrite the row holding the old ones
+WORKER_ID = f"{socket.gethostname()}-{uuid.uuid4().hex[:12]}"
+
+
+def parse_duration(value) -> Optional[int]:
+    """Seconds from totalTimeSpent ("HH:MM:SS", "MM:SS" or a number); None if unparseable"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if value >= 0 else None
+    if not isinstance(value, str) or not value.strip():
+        return None
+    parts = value.strip().split(":")
+    if len(parts) > 3:
+        return None
+    try:
+        numbers = [float(part) for part in parts]
+    except ValueError:
+        return None
+    if any(n < 0 for n in numbers):
+        return None
+    seconds = 0.0
+    for n in numbers:
+        seconds = seconds * 60 + n
+    return int(seconds)
+
+
+def format_duration(seconds: int) -> str:
+    """totalTimeSpent-style "HH:MM:SS" for a server-measured duration"""
+    seconds = max(int(seconds), 0)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning): a few hundred weighted centroids that answer
+    quantile queries with small error, concentrated at the tails. Two digests
+    merge by recompressing their centroids, so per-worker sketches combine
+    into one without revisiting raw values.
+    """
+
+    __slots__ = ("compression", "means", "weights", "total", "min", "max", "_buffer")
+
+    def __init__(self, compression: int = DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[tuple] = []
+
+    def add(self, value: float, weight: float = 1.0):
+        self._buffer.append((value, weight))
+        self.total += weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self._buffer) >= self.compression * 5:
+            self._compress()
+
+    def merge(self, other: "TDigest"):
+        other._compress()
+        self._buffer.extend(zip(other.means, other.weights))
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inverse(self, k: float) -> float:
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        means, weights = [], []
+        cur_mean, cur_weight = points[0]
+        seen = 0.0
+        limit = self.total * self._k_inverse(self._k(0) + 1)
+        for mean, weight in points[1:]:
+            if seen + cur_weight + weight <= limit:
+                # Weighted running mean keeps the centroid exact for its members
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                seen += cur_weight
+                limit = self.total * self._k_inverse(self._k(min(seen / self.total, 1.0)) + 1)
+                cur_mean, cur_weight = mean, weight
+        means.append(cur_mean)
+        weights.append(cur_weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q: float) -> Optional[float]:
+        self._compress()
+        if not self.means:
+            return None
+        if len(self.means) == 1:
+            return self.means[0]
+
+        index = q * self.total
+        means, weights = self.means, self.weights
+        # Tails interpolate towards the exact extremes
+        if index < weights[0] / 2:
+            return self.min + (means[0] - self.min) * index / (weights[0] / 2)
+        if index > self.total - weights[-1] / 2:
+            tail = self.total - index
+            return self.max - (self.max - means[-1]) * tail / (weights[-1] / 2)
+
+        cumulative = weights[0] / 2
+        for i in range(len(means) - 1):
+            step = (weights[i] + weights[i + 1]) / 2
+            if cumulative + step >= index:
+                return means[i] + (means[i + 1] - means[i]) * (index - cumulative) / step
+            cumulative += step
+        return means[-1]
+
+    def to_dict(self) -> Dict:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "means": [round(m, 3) for m in self.means],
+            "weights": self.weights,
+            "min": self.min if self.means else None,
+            "max": self.max if self.means else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TDigest":
+        digest = cls(data.get("compression", DEFAULT_COMPRESSION))
+        digest.means = list(data.get("means", []))
+        digest.weights = list(data.get("weights", []))
+        digest.total = float(sum(digest.weights))
+        if digest.means:
+            digest.min = data["min"]
+            digest.max = data["max"]
+        return digest
+
+
+def summarize(digest: TDigest) -> Dict:
+    return {
+        "count": int(digest.total),
+        "median_seconds": _rounded(digest.quantile(0.5)),
+        "p90_seconds": _rounded(digest.quantile(0.9)),
+        "min_seconds": _rounded(digest.min if digest.total else None),
+        "max_seconds": _rounded(digest.max if digest.total else None)
+    }
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+class _QuizSketch:
+    """This worker's digests for one (admin, quiz, version)"""
+
+    __slots__ = ("questions", "total", "dirty")
+
+    def __init__(self):
+        self.questions: Dict[str, TDigest] = {}
+        self.total = TDigest()
+        self.dirty = False
+
+    def to_doc(self) -> Dict:
+        return {
+            "questions": {number: digest.to_dict() for number, digest in self.questions.items()},
+            "total": self.total.to_dict()
+        }
+
+
+class TimeSketchRecorder:
+    """
+    Per-question and per-quiz time-spent sketches, keyed by quiz version so
+    a changed question set starts fresh. Submits update in-memory digests;
+    flush() upserts this worker's cumulative digests, one row per worker, so
+    writes never contend and replays are idempotent.
+    """
+
+    def __init__(self, worker_id: str = WORKER_ID):
+        self.worker_id = worker_id
+        self._sketches: Dict[tuple, _QuizSketch] = {}
+        self._lock = threading.Lock()
+
+    def record(self, admin_email: str, quiz: CompiledQuiz, times: List[float], total_seconds: Optional[int]):
+        """times is aligned to quiz.questions (see scoring.AnswerSheet); zero means not visited"""
+        key = (admin_email, quiz.name, quiz.version)
+        with self._lock:
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                sketch = self._sketches[key] = _QuizSketch()
+            for question, seconds in zip(quiz.questions, times):
+                if seconds and seconds > 0:
+                    number = str(question.get("questionNumber"))
+                    digest = sketch.questions.get(number)
+                    if digest is None:
+                        digest = sketch.questions[number] = TDigest()
+                    digest.add(float(seconds))
+            if total_seconds is not None:
+                sketch.total.add(float(total_seconds))
+            sketch.dirty = True
+
+    def flush(self, storage) -> int:
+        """Persist changed sketches; returns the number of rows written"""
+        with self._lock:
+            pending = [(key, sketch.to_doc()) for key, sketch in self._sketches.items() if sketch.dirty]
+            for key, _ in pending:
+                self._sketches[key].dirty = False
+
+        written = 0
+        for (admin_email, quiz_name, quiz_version), doc in pending:
+            try:
+                storage.save_time_sketch(admin_email, quiz_name, quiz_version, self.worker_id, doc, datetime.utcnow())
+                written += 1
+            except Exception as e:
+                with self._lock:
+                    self._sketches[(admin_email, quiz_name, quiz_version)].dirty = True
+                logger.warning("Could not save time sketch for '%s': %s", quiz_name, e)
+        return written
+
+    def merged(self, storage, admin_email: str, quiz_name: str, quiz_version: str) -> _QuizSketch:
+        """All workers' sketches for a quiz version merged, using live state for this worker"""
+        merged = _QuizSketch()
+        docs = []
+        if storage is not None:
+            docs = [row["sketch"] for row in storage.find_time_sketches(admin_email, quiz_name, quiz_version)
+                    if row["worker_id"] != self.worker_id]
+        with self._lock:
+            local = self._sketches.get((admin_email, quiz_name, quiz_version))
+            if local is not None:
+                docs.append(local.to_doc())
+
+        for doc in docs:
+            for number, data in doc.get("questions", {}).items():
+                merged.questions.setdefault(number, TDigest()).merge(TDigest.from_dict(data))
+            merged.total.merge(TDigest.from_dict(doc.get("total", {})))
+        return merged
+
+
+def time_report(sketch: _QuizSketch, quiz: Optional[CompiledQuiz]) -> Dict:
+    """Median/p90 per question (in quiz order when the version is current) and for the whole quiz"""
+    numbers = [str(q.get("questionNumber")) for q in quiz.questions] if quiz else sorted(sketch.questions, key=_number_order)
+    questions = []
+    for number in numbers:
+        digest = sketch.questions.get(number)
+        questions.append({"question_number": _number_value(number), **summarize(digest or TDigest())})
+    return {"quiz": summarize(sketch.total), "questions": questions}
+
+
+def _number_value(number: str):
+    return int(number) if number.lstrip("-").isdigit() else number
+
+
+def _number_order(number: str):
+    value = _number_value(number)
+    return (0, value, "") if isinstance(value, int) else (1, 0, value)
@@ -0,0 +1,90 @@
+import base64
+import binascii
+from array import array
+from typing import List, Optional
+
+from quiz_bank import CompiledQuiz, OPTION_LETTERS
+from scoring import AnswerSheet
+
+# Packed submissions list answers by position in the quiz as served, not by
+# question number:
+#   selected  "AC-D..." (A-D, "-" for unanswered) or [0, 2, -1, 3, ...] (-1 unanswered)
+#   times     optional [seconds, ...] of the same length
+#   marked    optional base64 bitmap, bit i (LSB first in byte i // 8) = question i marked
+UNANSWERED_CHAR = "-"
+_REJECT = 0xFF
+
+# Byte translation table for the string form: letters map to answer codes, anything else is rejected
+_SELECTED_TABLE = bytearray([_REJECT] * 256)
+_SELECTED_TABLE[ord(UNANSWERED_CHAR)] = 0
+for _code, _letter in enumerate(OPTION_LETTERS, start=1):
+    _SELECTED_TABLE[ord(_letter)] = _code
+_SELECTED_TABLE = bytes(_SELECTED_TABLE)
+
+
+class PackedAnswerError(ValueError):
+    """Raised when a packed submission does not match the quiz it was sent for"""
+
+
+def _decode_selected(selected, size: int) -> bytearray:
+    if not isinstance(selected, (str, list)):
+        raise PackedAnswerError("selected must be a string or a list of integers")
+    if len(selected) != size:
+        raise PackedAnswerError(f"selected has {len(selected)} entries, the quiz has {size} questions")
+    if isinstance(selected, str):
+        if not selected.isascii():
+            raise PackedAnswerError("selected may only contain A-D and '-'")
+        codes = selected.encode("ascii").translate(_SELECTED_TABLE)
+        if _REJECT in codes:
+            raise PackedAnswerError("selected may only contain A-D and '-'")
+        return bytearray(codes)
+    # type() rather than isinstance() so booleans are rejected too
+    if size and not (all(type(value) is int for value in selected)
+                     and -1 <= min(selected) and max(selected) < len(OPTION_LETTERS)):
+        raise PackedAnswerError(f"selected options must be integers from -1 to {len(OPTION_LETTERS) - 1}")
+    return bytearray(value + 1 for value in selected)
+
+
+def _decode_times(times, size: int) -> List[float]:
+    if times is None:
+        return [0.0] * size
+    if not isinstance(times, list) or len(times) != size:
+        raise PackedAnswerError(f"times must be a list of {size} numbers")
+    try:
+        values = array("d", times)
+    except TypeError:
+        raise PackedAnswerError("times must be a list of numbers")
+    if size and min(values) < 0:
+        raise PackedAnswerError("times cannot be negative")
+    return values.tolist()
+
+
+def _decode_marked(marked: Optional[str], size: int) -> bytearray:
+    flags = bytearray(size)
+    if not marked:
+        return flags
+    try:
+        bitmap = base64.b64decode(marked, validate=True)
+    except (binascii.Error, ValueError):
+        raise PackedAnswerError("marked must be a base64 bitmap")
+    if len(bitmap) != (size + 7) // 8:
+        raise PackedAnswerError(f"marked must be {(size + 7) // 8} bytes for {size} questions")
+    bits = int.from_bytes(bitmap, "little")
+    while bits:
+        low = bits & -bits
+        pos = low.bit_length() - 1
+        if pos >= size:
+            raise PackedAnswerError("marked has bits set past the last question")
+        flags[pos] = 1
+        bits ^= low
+    return flags
+
+
+def decode_packed(quiz: CompiledQuiz, selected, times=None, marked: Optional[str] = None) -> AnswerSheet:
+    """Validate a packed submission against the quiz and return it as an AnswerSheet"""
+    size = len(quiz)
+    sheet = AnswerSheet(0)
+    sheet.codes = _decode_selected(selected, size)
+    sheet.times = _decode_times(times, size)
+    sheet.marked = _decode_marked(marked, size)
+    return sheet
@@ -24,6 +24,8 @@ interface QuizInfo {
   page: number;
   limit: number;
   total_pages: number;
+  next_cursor: string | null;
+  has_more: boolean;
 }
 
 const ExamDetails: React.FC = () => {
@@ -33,6 +35,8 @@ const ExamDetails: React.FC = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [currentPage, setCurrentPage] = useState(1);
+  // cursors[n] is the continuation token that loads page n + 1
+  const [cursors, setCursors] = useState<(string | null)[]>([null]);
   const navigate = useNavigate();
 
   // Get API base URL from environment - use current domain for tunnels
@@ -59,7 +63,9 @@ const ExamDetails: React.FC = () => {
       
       console.log('🔍 Fetching quiz details for:', quizName);
       
-      const response = await fetch(`${API_BASE_URL}/admin/exam/${quizName}?page=${currentPage}&limit=50`, {
+      const cursor = cursors[currentPage - 1];
+      const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`${API_BASE_URL}/admin/exam/${quizName}?page=${currentPage}&limit=50${cursorParam}`, {
         method: 'GET',
         headers: {
           'Content-Type': 'application/json',
@@ -71,6 +77,13 @@ const ExamDetails: React.FC = () => {
         const data = await response.json();
         setQuizInfo(data.quiz_info);
         setStudents(data.students);
+        if (data.quiz_info.next_cursor) {
+          setCursors(prev => {
+            const next = prev.slice(0, currentPage);
+            next[currentPage] = data.quiz_info.next_cursor;
+            return next;
+          });
+        }
       } else {
         throw new Error('Failed to fetch quiz submissions');
       }
@@ -241,7 +254,7 @@ const ExamDetails: React.FC = () => {
               </span>
               <button
                 onClick={() => setCurrentPage(currentPage + 1)}
-                disabled={currentPage === quizInfo.total_pages}
+                disabled={!quizInfo.has_more}
                 className="bg-white/20 hover:bg-white/30 disabled:opacity-50 text-white px-4 py-2 rounded-lg transition-colors"
               >
                 Next →
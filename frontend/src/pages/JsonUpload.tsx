@@ -1,13 +1,6 @@
 import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 
-interface QuizData {
-  questionNumber: number;
-  questionText: string;
-  question_images?: string[];
-  option_with_images_: string[];
-}
-
 const JsonUpload: React.FC = () => {
   const [jsonFile, setJsonFile] = useState<File | null>(null);
   const [isLoading, setIsLoading] = useState(false);
@@ -31,23 +24,39 @@ const JsonUpload: React.FC = () => {
     setIsLoading(true);
     
     try {
-      const text = await jsonFile.text();
-      const questions: QuizData[] = JSON.parse(text);
-      
-      // Validate JSON structure
-      if (!Array.isArray(questions) || questions.length === 0) {
-        throw new Error('Invalid JSON format');
+      const adminContext = localStorage.getItem('adminContext');
+      if (!adminContext) {
+        navigate('/admin-login');
+        return;
       }
+      const admin = JSON.parse(adminContext);
 
-      // Store in localStorage for frontend-only approach
+      // The server validates and publishes the quiz; it reports every problem at once
       const quizName = jsonFile.name.replace('.json', '');
-      const existingQuizzes = JSON.parse(localStorage.getItem('quizzes') || '{}');
-      existingQuizzes[quizName] = questions;
-      localStorage.setItem('quizzes', JSON.stringify(existingQuizzes));
-      alert(`✅ Quiz "${quizName}" uploaded successfully! (${questions.length} questions)`);
+      const formData = new FormData();
+      formData.append('file', jsonFile);
+      formData.append('quiz_name', quizName);
+
+      const response = await fetch('/admin/quiz-upload', {
+        method: 'POST',
+        headers: {
+          'X-Admin-Email': admin.email,
+        },
+        body: formData,
+      });
+      const result = await response.json();
+
+      if (!response.ok) {
+        const errors: string[] = result.detail?.errors || [result.detail || 'Upload failed'];
+        alert(`❌ Quiz "${quizName}" was not uploaded:\n\n${errors.slice(0, 20).join('\n')}` +
+          (errors.length > 20 ? `\n...and ${errors.length - 20} more` : ''));
+        return;
+      }
+
+      alert(`✅ Quiz "${quizName}" uploaded successfully! (${result.total_questions} questions)`);
       navigate('/select-quiz');
     } catch (error) {
-      alert('Error parsing JSON file. Please check the format.');
+      alert('Error uploading JSON file. Please try again.');
       console.error('Upload error:', error);
     } finally {
       setIsLoading(false);
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate, useParams } from 'react-router-dom';
 
 interface QuizQuestion {
@@ -71,13 +71,16 @@ const QuizPage: React.FC = () => {
     }
   }, [navigate, link_id]);
 
-  const loadQuizByLink = async () => {
+  // With the student's details, shuffle links serve this student's own question and option order
+  const loadQuizByLink = async (student?: { name: string; class_name: string; section: string }) => {
     try {
-      const response = await fetch(`/api/quiz/${link_id}`);
+      const query = student ? `?${new URLSearchParams(student).toString()}` : '';
+      const response = await fetch(`/api/quiz/${link_id}${query}`);
       
       if (!response.ok) {
+        const error = await response.json().catch(() => null);
         if (response.status === 403) {
-          alert('Maximum student limit reached for this quiz');
+          alert(error?.detail || 'Maximum student limit reached for this quiz');
         } else if (response.status === 404) {
           alert('Quiz link not found');
         } else {
@@ -119,6 +122,58 @@ const QuizPage: React.FC = () => {
     const s = seconds % 60;
     return `${h.toString().padStart(2, '0')}:${m.toString().padStart(2, '0')}:${s.toString().padStart(2, '0')}`;
   };
+  // Compact submission: one character per question in quiz order ("-" when unanswered),
+  // parallel times and a base64 bitmap of questions marked for review
+  const packAnswers = () => {
+    const bitmap = new Uint8Array(Math.ceil(questions.length / 8));
+    questions.forEach((q, i) => {
+      if (markedForReview.has(q.questionNumber)) bitmap[i >> 3] |= 1 << (i & 7);
+    });
+    return {
+      selected: questions.map(q => answers[q.questionNumber] || '-').join(''),
+      times: questions.map(q => (answers[q.questionNumber] ? 10 : 0)),
+      marked: btoa(String.fromCharCode(...Array.from(bitmap)))
+    };
+  };
+
+  // Timed links: the server keeps the latest answers, so an attempt left open is still scored at its deadline
+  const packRef = useRef(packAnswers);
+  packRef.current = packAnswers;
+  useEffect(() => {
+    if (!linkData?.timed || !studentInfo || showStudentForm) return;
+    const autosave = setInterval(() => {
+      fetch(`/api/quiz/${link_id}/progress`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ...studentInfo, packed: packRef.current(), shuffled: !!linkData.shuffled })
+      }).catch(() => {});
+    }, 30000);
+    return () => clearInterval(autosave);
+  }, [linkData, studentInfo, showStudentForm, link_id]);
+
+  // The server fixes the deadline when the attempt starts; the countdown follows it
+  const startAttempt = async (student: { name: string; class_name: string; section: string }) => {
+    try {
+      const response = await fetch(`/api/quiz/${link_id}/start`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(student)
+      });
+      const data = await response.json().catch(() => ({}));
+      if (!response.ok) {
+        alert(data.detail || 'Failed to start the exam');
+        navigate('/');
+        return;
+      }
+      if (data.seconds_left != null) {
+        setTimeLeft(data.seconds_left);
+      }
+    } catch (err) {
+      alert('Failed to connect to server');
+      navigate('/');
+    }
+  };
+
   const handleAnswerSelect = (questionNumber: number, option: string) => {
     const wasAnswered = answers[questionNumber];
     setAnswers(prev => ({
@@ -169,12 +224,8 @@ const QuizPage: React.FC = () => {
         name: studentInfo.name,
         class_name: studentInfo.class_name,
         section: studentInfo.section,
-        answers: Object.entries(answers).map(([qNum, option]) => ({
-          questionNumber: parseInt(qNum),
-          selectedOption: option.charCodeAt(0) - 65,
-          timeSpent: 10,
-          isMarked: markedForReview.has(parseInt(qNum))
-        })),
+        packed: packAnswers(),
+        shuffled: !!linkData?.shuffled,
         totalTimeSpent: formatTime(10 * 60 - timeLeft)
       };
 
@@ -188,8 +239,9 @@ const QuizPage: React.FC = () => {
         });
 
         if (!response.ok) {
+          const error = await response.json().catch(() => null);
           if (response.status === 409) {
-            alert('You have already submitted this quiz');
+            alert(error?.detail || 'You have already submitted this quiz');
           } else if (response.status === 403) {
             alert('Maximum student limit reached');
           } else {
@@ -283,7 +335,7 @@ const QuizPage: React.FC = () => {
             )}
           </div>
 
-          <form onSubmit={(e) => {
+          <form onSubmit={async (e) => {
             e.preventDefault();
             const formData = new FormData(e.target as HTMLFormElement);
             const studentData = {
@@ -298,7 +350,14 @@ const QuizPage: React.FC = () => {
             }
 
             setStudentInfo(studentData);
+            // Wait for this student's own order so the questions never reorder under them
+            if (linkData?.shuffle) {
+              await loadQuizByLink(studentData);
+            }
             setShowStudentForm(false);
+            if (linkData?.timed) {
+              startAttempt(studentData);
+            }
           }} className="space-y-4">
             <div>
               <label className="block text-sm font-medium text-gray-700 mb-1">
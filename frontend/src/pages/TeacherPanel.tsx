@@ -43,7 +43,7 @@ const TeacherPanel: React.FC = () => {
   const navigate = useNavigate();
 
   useEffect(() => {
-    fetch(`${window.location.origin}/teacher/results`)
+    fetch(`${window.location.origin}/teacher/results?limit=1`)
       .then(res => res.json())
       .then(data => {
         if (data.results && data.results.length > 0) {